@@ -2,10 +2,30 @@
 
 import subprocess
 import json
+import datetime
+from file_search import FileSearch, MAX_RESULTS
+from calendar_store import format_event_time
+from system_status import parse_pmset
+from app_catalog import AppCatalog, launch_command
+
+# Upper bound on any helper process, so a wedged osascript/mdfind can't hold a tool worker forever
+SUBPROCESS_TIMEOUT_S = 8
+
+# Streams Spotlight (or locate) results; entry scripts can attach a FileIndex (see file_search.py)
+file_search = FileSearch()
+
+# Installed apps, scanned on first use and rescanned when an app folder changes (see app_catalog.py)
+app_catalog = AppCatalog()
+
+# Entry scripts can attach a started CalendarStore to answer from memory (see calendar_store.py)
+calendar_store = None
+
+# Entry scripts can attach a started SystemMonitor so status tools don't fork (see system_status.py)
+system_monitor = None
 
 def open_application(app_name: str) -> str:
     """
-    Opens a specified application on macOS using AppleScript.
+    Opens a specified application (with `open -a` on macOS, gtk-launch on Linux).
 
     Args:
         app_name (str): The name of the application to open (e.g., "Google Chrome", "Spotify").
@@ -13,20 +33,25 @@ def open_application(app_name: str) -> str:
     Returns:
         str: A confirmation or error message.
     """
+    # Resolve what Whisper heard ("spot ify", "google chrome.") to an installed app before spawning anything.
+    # A name the catalog doesn't know is tried as heard: the app may live outside the scanned folders.
+    app = app_catalog.resolve(app_name)
+    target = app.target if app else app_name.strip().rstrip(".")
+    display_name = app.name if app else target
     try:
-        # Sanitize app_name to prevent command injection, although AppleScript is generally safe.
-        clean_app_name = app_name.replace('"', '')
-        script = f'tell application "{clean_app_name}" to activate'
-        subprocess.run(["osascript", "-e", script], check=True, capture_output=True)
-        return f"Opening {clean_app_name} for you, sir."
-    except subprocess.CalledProcessError:
-        return f"My apologies, I was unable to find or open the application named {app_name}."
+        subprocess.run(launch_command(target), check=True, capture_output=True, timeout=SUBPROCESS_TIMEOUT_S)
+        return f"Opening {display_name} for you, sir."
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return f"My apologies, I was unable to find or open the application named {display_name}."
+    except subprocess.TimeoutExpired:
+        return f"{display_name} is taking too long to open, sir."
     except Exception as e:
         return f"An unexpected error occurred: {e}"
 
 def search_files_on_mac(query: str) -> str:
     """
-    Searches for files on macOS using the 'mdfind' command.
+    Searches for files, using the built-in file index if one is attached and
+    ready, and otherwise streaming the first results from 'mdfind' (Spotlight).
 
     Args:
         query (str): The search term for the files.
@@ -35,13 +60,12 @@ def search_files_on_mac(query: str) -> str:
         str: A summary of the top 5 search results or a not-found message.
     """
     try:
-        # mdfind is the command-line interface for Spotlight search.
-        result = subprocess.check_output(["mdfind", query], text=True).strip()
-        if not result:
+        # Only the first few results are read; the search tool is stopped after that.
+        results = file_search.search(query, limit=MAX_RESULTS)
+        if not results:
             return f"I couldn't find any files matching '{query}', sir."
         
-        # Return the top 5 results for a concise response.
-        first_five_results = "\n".join(result.splitlines()[:5])
+        first_five_results = "\n".join(results)
         return f"I found the following files related to '{query}':\n{first_five_results}"
     except Exception as e:
         return f"An error occurred during the file search: {e}"
@@ -53,6 +77,13 @@ def get_calendar_events() -> str:
     Returns:
         str: A summary of today's calendar events.
     """
+    if calendar_store is not None and calendar_store.ready.is_set():
+        events = calendar_store.today()
+        if not events:
+            return "You have no events on your calendar for today, sir."
+        events = "\n- ".join(f"{event.title} {format_event_time(event)}" for event in events)
+        return f"Here are your events for today:\n- {events}"
+
     # AppleScript to get today's events from the user's primary calendar.
     script = """
     set today to current date
@@ -69,7 +100,7 @@ def get_calendar_events() -> str:
     end tell
     """
     try:
-        result = subprocess.check_output(["osascript", "-e", script], text=True).strip()
+        result = subprocess.check_output(["osascript", "-e", script], text=True, timeout=SUBPROCESS_TIMEOUT_S).strip()
         if not result:
             return "You have no events on your calendar for today, sir."
         else:
@@ -78,18 +109,60 @@ def get_calendar_events() -> str:
     except Exception as e:
         return f"I had trouble accessing your calendar. The error was: {e}"
 
+def get_next_event() -> str:
+    """
+    Finds the next upcoming event on the calendar.
+
+    Returns:
+        str: The title and start time of the next event, or a message if there is none.
+    """
+    if calendar_store is None or not calendar_store.ready.is_set():
+        return "My apologies, sir. Your calendar hasn't finished loading yet."
+    event = calendar_store.next_event()
+    if event is None:
+        return "You have nothing else coming up on your calendar, sir."
+    day = "today" if event.start.date() == datetime.date.today() else event.start.strftime("on %A, %B %d")
+    return f"Your next event is {event.title}, {day} {format_event_time(event)}."
+
 def get_battery_level() -> str:
     """
-    Checks the current battery level and charging status on macOS using 'pmset'.
+    Reports the battery level and charging status, from the system monitor's
+    latest snapshot if one is attached, otherwise by asking 'pmset'.
 
     Returns:
         str: A human-readable string describing the battery status.
     """
     try:
-        # 'pmset -g batt' is the command to get power management settings, specifically battery.
-        result = subprocess.check_output(["pmset", "-g", "batt"], text=True)
-        level = result.split('\t')[1].split(';')[0]
-        status = result.split(';')[1].strip()
-        return f"The current battery is at {level}, and is currently {status}."
+        if system_monitor is not None and system_monitor.ready.is_set():
+            snapshot = system_monitor.snapshot
+            level, status = snapshot.battery_percent, snapshot.charging_state
+        else:
+            # 'pmset -g batt' is the command to get power management settings, specifically battery.
+            result = subprocess.check_output(["pmset", "-g", "batt"], text=True, timeout=SUBPROCESS_TIMEOUT_S)
+            level, status, _ = parse_pmset(result)
+        if level is None:
+            return "This machine doesn't seem to have a battery, sir."
+        return f"The current battery is at {level}%, and is currently {status or 'in an unknown state'}."
     except Exception as e:
         return f"My apologies, I was unable to retrieve the battery status."
+
+def get_system_status() -> str:
+    """
+    Reports CPU load and memory use from the system monitor's latest snapshot.
+
+    Returns:
+        str: A human-readable summary of the system's load.
+    """
+    if system_monitor is None or not system_monitor.ready.is_set():
+        return "My apologies, sir. System monitoring isn't running."
+    snapshot = system_monitor.snapshot
+    parts = []
+    if snapshot.cpu_percent is not None:
+        parts.append(f"the processor is {snapshot.cpu_percent:.0f}% busy")
+    elif snapshot.load_avg is not None:
+        parts.append(f"the load average is {snapshot.load_avg:.1f}")
+    if snapshot.memory_percent is not None:
+        parts.append(f"memory is {snapshot.memory_percent:.0f}% used")
+    if not parts:
+        return "I couldn't read the system's load, sir."
+    return f"Currently {' and '.join(parts)}, sir."
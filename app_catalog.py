@@ -0,0 +1,229 @@
+# app_catalog.py
+
+import os
+import re
+import sys
+import time
+import glob
+from collections import defaultdict, namedtuple
+
+MAC_APP_DIRS = ["/Applications", "/Applications/Utilities", "/System/Applications",
+                "/System/Applications/Utilities", os.path.expanduser("~/Applications")]
+LINUX_DESKTOP_DIRS = ["/usr/share/applications", "/usr/local/share/applications",
+                      "/var/lib/flatpak/exports/share/applications", os.path.expanduser("~/.local/share/applications")]
+MIN_MATCH_SCORE = 0.5      # Below this, the spoken name isn't any installed app
+STALE_CHECK_S = 30         # How often resolve() checks whether the app folders changed
+
+App = namedtuple("App", "name target")  # Display name, and what the launcher is given (name, or .desktop id)
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+def app_key(name):
+    """Lowercase letters and digits only, so "Spot ify", "spotify." and "Spotify" agree."""
+    return _NON_ALNUM_RE.sub("", name.lower())
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def scan_mac_apps(dirs=MAC_APP_DIRS):
+    apps = []
+    for directory in dirs:
+        for path in glob.glob(os.path.join(directory, "*.app")):
+            name = os.path.basename(path)[:-4]
+            apps.append(App(name, name))
+    return apps
+
+def parse_desktop_file(path):
+    """Returns the App for a .desktop file, or None if it's hidden or not an application."""
+    name, hidden, in_entry = None, False, False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_entry = line == "[Desktop Entry]"
+                elif in_entry and "=" in line:
+                    key, value = line.split("=", 1)
+                    if key == "Name" and name is None:
+                        name = value.strip()
+                    elif key in ("NoDisplay", "Hidden") and value.strip().lower() == "true":
+                        hidden = True
+                    elif key == "Type" and value.strip() != "Application":
+                        hidden = True
+    except OSError:
+        return None
+    if not name or hidden:
+        return None
+    return App(name, os.path.basename(path)[:-len(".desktop")])
+
+def scan_desktop_apps(dirs=LINUX_DESKTOP_DIRS):
+    apps = []
+    for directory in dirs:
+        for path in glob.glob(os.path.join(directory, "*.desktop")):
+            app = parse_desktop_file(path)
+            if app:
+                apps.append(app)
+    return apps
+
+def default_sources():
+    if sys.platform == "darwin":
+        return MAC_APP_DIRS, scan_mac_apps
+    return LINUX_DESKTOP_DIRS, scan_desktop_apps
+
+def launch_command(target):
+    """
+    The command that opens an app: `open -a` with the app's name on macOS,
+    gtk-launch with its .desktop id elsewhere (what App.target holds on each).
+    """
+    if sys.platform == "darwin":
+        return ["open", "-a", target]
+    return ["gtk-launch", target]
+
+class AppCatalog:
+    """
+    The installed applications, indexed for fuzzy lookup by spoken name.
+
+    Resolution tries the normalized name first, then a trigram index, scored
+    with the Dice coefficient (plus a bonus when the spoken name is a whole
+    word of the app's name, so "chrome" finds "Google Chrome"). The catalog is
+    rescanned lazily when one of the application folders changes.
+    """
+
+    def __init__(self, dirs=None, scanner=None, min_score=MIN_MATCH_SCORE):
+        default_dirs, default_scanner = default_sources()
+        self.dirs = default_dirs if dirs is None else dirs
+        self.scanner = scanner or default_scanner
+        self.min_score = min_score
+        # (apps, key -> app, trigram -> apps, per-app trigram count, per-app name words),
+        # swapped in whole by build() so lookups from tool threads never see a half-built index
+        self._index = ([], {}, {}, [], [])
+        self._dir_mtimes = None
+        self._checked_at = 0.0
+
+    def _mtimes(self):
+        mtimes = []
+        for directory in self.dirs:
+            try:
+                mtimes.append(os.stat(directory).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def build(self, apps=None):
+        """Scans the application folders (or takes a given list of Apps) and indexes them."""
+        self._dir_mtimes = self._mtimes()
+        self._checked_at = time.monotonic()
+        apps = sorted(set(self.scanner(self.dirs) if apps is None else apps))
+        by_key, by_trigram, gram_counts, words = {}, defaultdict(list), [], []
+        for i, app in enumerate(apps):
+            key = app_key(app.name)
+            by_key.setdefault(key, i)
+            grams = trigrams(key)
+            for gram in grams:
+                by_trigram[gram].append(i)
+            gram_counts.append(len(grams))
+            words.append(frozenset(_NON_ALNUM_RE.split(app.name.lower())) - {""})
+        self._index = (apps, by_key, dict(by_trigram), gram_counts, words)
+        return self
+
+    @property
+    def apps(self):
+        return self._index[0]
+
+    def refresh_if_stale(self):
+        """Rescans if an application folder changed since the last scan (checked at most every STALE_CHECK_S)."""
+        now = time.monotonic()
+        if self._dir_mtimes is not None and now - self._checked_at < STALE_CHECK_S:
+            return False
+        self._checked_at = now
+        if self._dir_mtimes is not None and self._mtimes() == self._dir_mtimes:
+            return False
+        self.build()
+        return True
+
+    def match(self, spoken):
+        """
+        Scores installed apps against a spoken name.
+
+        Returns:
+            tuple: (App, score) for the best match, or (None, 0.0).
+        """
+        apps, by_key, by_trigram, gram_counts, words = self._index
+        key = app_key(spoken)
+        if not key:
+            return None, 0.0
+        exact = by_key.get(key)
+        if exact is not None:
+            return apps[exact], 1.0
+        grams = trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in by_trigram.get(gram, ()):
+                shared[i] += 1
+        spoken_words = frozenset(_NON_ALNUM_RE.split(spoken.lower())) - {""}
+        best, best_score = None, 0.0
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + gram_counts[i])
+            if score < 0.8 and spoken_words <= words[i]:
+                score = 0.8
+            if score > best_score or (score == best_score and len(apps[i].name) < len(best.name)):
+                best, best_score = apps[i], score
+        return best, best_score
+
+    def resolve(self, spoken):
+        """Returns the installed App the user most likely meant, or None."""
+        self.refresh_if_stale()
+        app, score = self.match(spoken)
+        return app if score >= self.min_score else None
+
+    def __len__(self):
+        return len(self.apps)
+
+# --- Benchmark over a synthetic catalog (python3 app_catalog.py [num_apps]) ---
+
+if __name__ == "__main__":
+    import random
+
+    num_apps = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    rng = random.Random(0)
+    real_apps = ["Spotify", "Google Chrome", "Safari", "Visual Studio Code", "Calculator", "System Settings",
+                 "WhatsApp", "Microsoft Word", "Microsoft Excel", "Activity Monitor", "Photoshop", "Slack",
+                 "zoom.us", "Notes", "Terminal", "Firefox", "Finder", "Preview", "Xcode", "Discord"]
+    syllables = ["ta", "ri", "po", "lex", "mon", "qua", "zen", "dor", "vi", "sto", "nex", "pla", "cor", "bit", "sun"]
+    suffixes = ["", " Pro", " Studio", " Helper", " Lite", " Player", " Editor", " Sync"]
+    names = set(real_apps)
+    while len(names) < num_apps:
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+        names.add(word + rng.choice(suffixes))
+    catalog = AppCatalog(dirs=[]).build([App(name, name) for name in names])
+
+    # What Whisper tends to hand over: split words, stray punctuation, partial names, small misspellings
+    spoken_names = [
+        ("spot ify", "Spotify"), ("google chrome.", "Google Chrome"), ("Chrome", "Google Chrome"),
+        ("visual studio code", "Visual Studio Code"), ("the calculator", "Calculator"), ("whats app", "WhatsApp"),
+        ("Microsoft word", "Microsoft Word"), ("activity monitor.", "Activity Monitor"), ("zoom", "zoom.us"),
+        ("fire fox", "Firefox"), ("spotifi", "Spotify"), ("safary", "Safari"), ("system settings", "System Settings"),
+        ("discord.", "Discord"), ("x code", "Xcode"), ("photo shop", "Photoshop"),
+        ("banana phone", None), ("quantum toaster", None),
+    ]
+    correct = 0
+    for spoken, expected in spoken_names:
+        app = catalog.resolve(spoken)
+        ok = (app.name if app else None) == expected
+        correct += ok
+        if not ok:
+            print(f"  miss: {spoken!r} -> {app} (expected {expected}, score {catalog.match(spoken)[1]:.2f})")
+    print(f"{len(catalog)} apps: {correct}/{len(spoken_names)} spoken names resolved correctly")
+
+    repeats = 200
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for spoken, _ in spoken_names:
+            catalog.resolve(spoken)
+    per_lookup = (time.perf_counter() - t0) / (repeats * len(spoken_names)) * 1e6
+    print(f"Resolution: {per_lookup:.0f} us per lookup")
+
+    t0 = time.perf_counter()
+    installed = AppCatalog().build()
+    print(f"This machine: {len(installed)} installed apps scanned in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -0,0 +1,166 @@
+# audio_capture.py
+
+import threading
+import numpy as np
+import pyaudio
+
+RING_BUFFER_SECONDS = 30 # How much microphone history is kept in memory
+READ_TIMEOUT_S = 1.0     # How long a reader waits for new audio before giving up
+
+class RingBuffer:
+    """
+    A preallocated int16 ring buffer with a single writer and any number of readers.
+
+    The writer copies samples in and then publishes them by advancing `write_pos`,
+    a monotonically increasing sample count. Readers never take a lock on the data;
+    they only compare their own position against `write_pos`.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.write_pos = 0
+        self._data_ready = threading.Condition()
+
+    def write(self, pcm):
+        """Appends raw int16 PCM. Only ever called from the capture thread."""
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        total = len(samples)
+        if total > self.capacity:
+            samples = samples[-self.capacity:]
+        start = (self.write_pos + total - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.write_pos += total # Publish only after the copy is complete
+        with self._data_ready:
+            self._data_ready.notify_all()
+
+    def wait_for(self, position, timeout):
+        """Blocks until at least `position` samples have been written. Returns False on timeout."""
+        with self._data_ready:
+            return self._data_ready.wait_for(lambda: self.write_pos >= position, timeout)
+
+    def copy(self, position, num_samples):
+        """Returns samples [position, position + num_samples) as bytes."""
+        return self.view(position, num_samples).tobytes()
+
+    def view(self, position, num_samples):
+        """
+        Returns samples [position, position + num_samples) as an int16 array: a view
+        into the buffer (no copy) unless the range wraps around its end.
+        """
+        start = position % self.capacity
+        end = start + num_samples
+        if end <= self.capacity:
+            return self.buffer[start:end]
+        return np.concatenate((self.buffer[start:], self.buffer[:end - self.capacity]))
+
+class RingReader:
+    """
+    One consumer's cursor into the capture ring buffer.
+
+    It mimics the parts of a PyAudio input stream the rest of Jarvis uses
+    (`read`, `is_active`, `start_stream`, `stop_stream`), so the wake-word loop
+    and `record_command_vad` can read from it without changes.
+    """
+
+    def __init__(self, ring, position):
+        self.ring = ring
+        self.position = position
+        self.dropped_samples = 0
+
+    def available(self):
+        """Number of samples written that this reader has not consumed yet."""
+        return self.ring.write_pos - self.position
+
+    def read(self, num_samples, exception_on_overflow=False):
+        """
+        Reads the next `num_samples` samples, waiting for the capture thread if needed.
+
+        If the reader fell so far behind that its data was overwritten, it skips
+        ahead to the oldest audio still in the buffer.
+        """
+        return self._read(num_samples, exception_on_overflow, self.ring.copy)
+
+    def read_view(self, num_samples, exception_on_overflow=False):
+        """
+        Like read(), but returns an int16 array viewing the ring buffer instead of
+        new bytes. For frames that are processed straight away (the wake word
+        loop): the view is only valid until the writer comes round again, one
+        RING_BUFFER_SECONDS later.
+        """
+        return self._read(num_samples, exception_on_overflow, self.ring.view)
+
+    def _read(self, num_samples, exception_on_overflow, fetch):
+        while True:
+            if not self.ring.wait_for(self.position + num_samples, READ_TIMEOUT_S):
+                raise IOError("No audio received from the capture thread.")
+            oldest = self.ring.write_pos - self.ring.capacity
+            if self.position < oldest:
+                self._overrun(oldest, exception_on_overflow)
+                continue
+            pcm = fetch(self.position, num_samples)
+            # The writer may have lapped us while copying; if so the copy is torn.
+            if self.position < self.ring.write_pos - self.ring.capacity:
+                self._overrun(self.ring.write_pos - self.ring.capacity, exception_on_overflow)
+                continue
+            self.position += num_samples
+            return pcm
+
+    def _overrun(self, oldest, exception_on_overflow):
+        if exception_on_overflow:
+            raise IOError("Capture ring buffer overrun.")
+        self.dropped_samples += oldest - self.position
+        self.position = oldest
+
+    def rewind(self, num_samples):
+        """Moves the cursor back in time, limited to what the buffer still holds."""
+        oldest = max(0, self.ring.write_pos - self.ring.capacity)
+        self.position = max(oldest, self.position - num_samples)
+
+    # PyAudio stream compatibility: the capture stream itself is never stopped.
+    def is_active(self): return True
+    def start_stream(self): pass
+    def stop_stream(self): pass
+
+class AudioCapture:
+    """
+    Owns the microphone. A single PyAudio callback-mode stream runs for the life of
+    the process and writes into a ring buffer; consumers read at their own cursors.
+    """
+
+    def __init__(self, pa, sample_rate, frames_per_buffer, buffer_seconds=RING_BUFFER_SECONDS):
+        self.pa = pa
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.ring = RingBuffer(int(sample_rate * buffer_seconds))
+        self.stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.ring.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    def start(self):
+        """Opens the input stream and starts capturing."""
+        self.stream = self.pa.open(rate=self.sample_rate, channels=1, format=pyaudio.paInt16,
+                                   input=True, frames_per_buffer=self.frames_per_buffer,
+                                   stream_callback=self._callback)
+        self.stream.start_stream()
+        return self
+
+    def reader(self):
+        """Returns a new reader positioned at the live edge of the capture."""
+        return RingReader(self.ring, self.ring.write_pos)
+
+    def reader_at(self, position):
+        """Returns a new reader starting at an earlier point in the capture (e.g. the wake word)."""
+        reader = RingReader(self.ring, self.ring.write_pos)
+        reader.rewind(self.ring.write_pos - position)
+        return reader
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
@@ -0,0 +1,117 @@
+# barge_in.py
+
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+from vad import frame_features, SPEECH_TO_NOISE_RATIO, MIN_SPEECH_RMS, MAX_SPECTRAL_FLATNESS, MAX_ZERO_CROSSING_RATE
+
+BARGE_IN_FRAMES = 3        # Consecutive speech frames (~100 ms) that count as the user talking over Jarvis
+LEAD_IN_S = 0.3            # Audio before the detected speech kept for the command, so the first syllable isn't lost
+ECHO_WINDOW_S = 0.3        # Playback this recent may still be arriving at the microphone
+INITIAL_ECHO_GAIN = 0.5    # Microphone level / playback level, assumed until it has been measured
+MAX_ECHO_GAIN = 4.0
+ECHO_MARGIN = 3.0          # The user must be this much louder than Jarvis's own voice at the mic (~10 dB)
+ECHO_GAIN_ATTACK = 0.3     # How quickly the measured gain follows a louder echo...
+ECHO_GAIN_RELEASE = 0.05   # ...and a quieter one (~1 s from the initial guess to a quiet room)
+
+class BargeInMonitor:
+    """
+    Listens to the capture while Jarvis is speaking, and flags when the user
+    talks over it or says the wake word, so playback can stop and the command
+    can be recorded from where the user started.
+
+    Echo suppression: what is being played is the reference. Its level over the
+    last ECHO_WINDOW_S, times the measured speaker-to-microphone gain, is how
+    loud Jarvis's own voice should be at the microphone; only speech that is
+    ECHO_MARGIN louder than that (and above the room's noise floor) counts.
+    """
+
+    def __init__(self, capture, frame_length, wake_engine=None, vad=None):
+        self.capture = capture
+        self.frame_length = frame_length
+        self.wake_engine = wake_engine
+        self.vad = vad   # Its learned noise floor is the baseline; it isn't fed from here
+        self.echo_gain = INITIAL_ECHO_GAIN
+        self.interrupted = threading.Event()
+        self.position = None      # Ring buffer position the command should be recorded from
+        self.reason = None        # "speech" or "wake word"
+        self.detected_at = None
+        self._reference = deque() # (time, rms) of recently played blocks
+        self._lock = threading.Lock()
+        self._stop = None
+        self._listener = None
+
+    def begin(self):
+        """Starts listening from the live edge (called as playback starts)."""
+        self.end()
+        self.interrupted.clear()
+        self.position = self.reason = self.detected_at = None
+        with self._lock:
+            self._reference.clear()
+        self._stop = threading.Event()
+        self._listener = threading.Thread(target=self._listen, args=(self.capture.reader(), self._stop), daemon=True)
+        self._listener.start()
+
+    def end(self):
+        """Stops listening (called when playback finishes or is cut off)."""
+        if self._listener is not None:
+            self._stop.set()
+            self._listener.join(timeout=1.0)
+            self._listener = None
+
+    def take(self):
+        """Returns where the interrupting command starts, and clears the interruption."""
+        position = self.position
+        self.interrupted.clear()
+        self.position = None
+        return position
+
+    def playing(self, audio):
+        """Records what is being played right now (float32 samples), as the echo reference."""
+        rms = float(np.sqrt(np.mean(np.square(audio)))) * 32768 if len(audio) else 0.0
+        with self._lock:
+            self._reference.append((time.perf_counter(), rms))
+
+    def _echo_reference(self):
+        cutoff = time.perf_counter() - ECHO_WINDOW_S
+        with self._lock:
+            while self._reference and self._reference[0][0] < cutoff:
+                self._reference.popleft()
+            return max((rms for _, rms in self._reference), default=0.0)
+
+    def _trigger(self, position, reason):
+        self.position = max(0, position)
+        self.reason = reason
+        self.detected_at = time.perf_counter()
+        self.interrupted.set()
+        print(f"...interrupted ({reason}).")
+
+    def _listen(self, reader, stop):
+        run = 0
+        lead_in = int(LEAD_IN_S * self.capture.sample_rate)
+        while not stop.is_set():
+            try:
+                frame = reader.read_view(self.frame_length, exception_on_overflow=False)
+            except IOError:
+                return
+            if self.wake_engine is not None and self.wake_engine.detect(frame) >= 0:
+                return self._trigger(reader.position, "wake word")
+
+            rms, zcr, flatness = (float(v[0]) for v in frame_features(frame[None, :]))
+            reference = self._echo_reference()
+            noise_floor = self.vad.noise_floor if self.vad is not None else MIN_SPEECH_RMS / SPEECH_TO_NOISE_RATIO
+            threshold = max(MIN_SPEECH_RMS, noise_floor * SPEECH_TO_NOISE_RATIO,
+                            reference * self.echo_gain * ECHO_MARGIN)
+            if rms > threshold and flatness < MAX_SPECTRAL_FLATNESS and zcr < MAX_ZERO_CROSSING_RATE:
+                run += 1
+                if run >= BARGE_IN_FRAMES:
+                    return self._trigger(reader.position - run * self.frame_length - lead_in, "speech")
+                continue
+            run = 0
+            if reference > MIN_SPEECH_RMS: # Learn the echo gain only while something audible is playing
+                ratio = min(MAX_ECHO_GAIN, rms / reference)
+                rate = ECHO_GAIN_ATTACK if ratio > self.echo_gain else ECHO_GAIN_RELEASE
+                self.echo_gain += rate * (ratio - self.echo_gain)
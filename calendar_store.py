@@ -0,0 +1,310 @@
+# calendar_store.py
+
+import os
+import bisect
+import datetime
+import threading
+import subprocess
+from collections import namedtuple
+
+CALENDAR_REFRESH_S = 120     # Background refresh interval
+CALENDAR_WINDOW_DAYS = 14    # How far ahead (and behind) the AppleScript source loads events
+SOURCE_TIMEOUT_S = 60        # A slow Calendar.app dump is fine off the voice loop, a hung one isn't
+
+Event = namedtuple("Event", "start end title")
+
+class EventIndex:
+    """
+    An immutable interval index: events sorted by start time, plus the longest
+    duration. Every event overlapping [a, b) starts in [a - longest, b), so a
+    window query is two bisects and a short scan.
+    """
+
+    def __init__(self, events):
+        self.events = sorted(events)
+        self.starts = [event.start for event in self.events]
+        self.longest = max((event.end - event.start for event in self.events), default=datetime.timedelta(0))
+
+    def between(self, window_start, window_end):
+        """Returns the events overlapping [window_start, window_end), by start time."""
+        lo = bisect.bisect_left(self.starts, window_start - self.longest)
+        hi = bisect.bisect_left(self.starts, window_end)
+        return [e for e in self.events[lo:hi] if e.end > window_start or e.start >= window_start]
+
+    def next_after(self, moment):
+        """Returns the first event starting at or after `moment`, or None."""
+        i = bisect.bisect_left(self.starts, moment)
+        return self.events[i] if i < len(self.events) else None
+
+    def __len__(self):
+        return len(self.events)
+
+# --- Sources ---
+# A source's load() returns a list of Events, or None if nothing changed since the last load.
+
+def _parse_ics_datetime(value, params):
+    if "VALUE=DATE" in params or len(value) == 8:
+        return datetime.datetime.strptime(value[:8], "%Y%m%d")
+    if value.endswith("Z"):
+        utc = datetime.datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=datetime.timezone.utc)
+        return utc.astimezone().replace(tzinfo=None) # Naive local time, like everything else here
+    return datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S") # TZID= times are taken as local
+
+def parse_ics(text):
+    """
+    Parses the VEVENTs of an iCalendar file into Events.
+
+    Recurring events (RRULE) only contribute their first occurrence.
+    """
+    # Unfold continuation lines (RFC 5545: a line starting with a space continues the previous one)
+    lines = text.replace("\r\n", "\n").replace("\n ", "").replace("\n\t", "").split("\n")
+    events, current = [], None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            current = {}
+        elif line == "END:VEVENT" and current is not None:
+            if "DTSTART" in current:
+                start = current["DTSTART"]
+                end = current.get("DTEND") or start + (datetime.timedelta(days=1) if current.get("all_day") else datetime.timedelta(0))
+                events.append(Event(start, end, current.get("SUMMARY", "Untitled event")))
+            current = None
+        elif current is not None and ":" in line:
+            name_and_params, value = line.split(":", 1)
+            name, _, params = name_and_params.partition(";")
+            try:
+                if name in ("DTSTART", "DTEND"):
+                    current[name] = _parse_ics_datetime(value.strip(), params)
+                    if name == "DTSTART" and ("VALUE=DATE" in params or len(value.strip()) == 8):
+                        current["all_day"] = True
+                elif name == "SUMMARY":
+                    current[name] = value.replace("\\,", ",").replace("\\;", ";").replace("\\n", " ").strip()
+            except ValueError:
+                continue
+    return events
+
+class IcsSource:
+    """Events from a local .ics file, re-parsed only when the file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self.mtime:
+            return None
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            events = parse_ics(f.read())
+        self.mtime = mtime
+        return events
+
+def parse_applescript_events(output):
+    """
+    Parses AppleScriptSource's dump: one event per line, "start<TAB>end<TAB>title",
+    each time as "year month day seconds-since-midnight" in local time.
+    """
+    events = []
+    for line in output.splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        try:
+            start, end = (_parse_applescript_time(part) for part in parts[:2])
+        except ValueError:
+            continue
+        events.append(Event(start, end, parts[2].strip()))
+    return events
+
+def _parse_applescript_time(value):
+    year, month, day, seconds = (int(field) for field in value.split())
+    return datetime.datetime(year, month, day) + datetime.timedelta(seconds=seconds)
+
+class AppleScriptSource:
+    """
+    Events from Calendar.app, dumped by one AppleScript for a window around today.
+
+    Dates are sent as numbers (year, month, day, seconds since midnight) so
+    parsing doesn't depend on the system's date format or locale. They are
+    absolute, so an unchanged calendar gives the same output and isn't re-parsed.
+    """
+
+    def __init__(self, window_days=CALENDAR_WINDOW_DAYS, timeout_s=SOURCE_TIMEOUT_S):
+        self.window_days = window_days
+        self.timeout_s = timeout_s
+        self.last_output = None
+
+    def script(self):
+        return f"""
+        on stamp(aDate)
+            return ((year of aDate) as text) & " " & (((month of aDate) as integer) as text) & " " & ((day of aDate) as text) & " " & ((time of aDate) as text)
+        end stamp
+
+        set nowDate to current date
+        set fromDate to nowDate - ({self.window_days} * days)
+        set toDate to nowDate + ({self.window_days} * days)
+        set eventLines to {{}}
+        tell application "Calendar"
+            tell calendar 1
+                set theEvents to (every event whose start date is greater than or equal to fromDate and start date is less than toDate)
+                repeat with anEvent in theEvents
+                    set the end of eventLines to my stamp(start date of anEvent) & tab & my stamp(end date of anEvent) & tab & (summary of anEvent)
+                end repeat
+            end tell
+        end tell
+        set AppleScript's text item delimiters to linefeed
+        return eventLines as text
+        """
+
+    def load(self):
+        output = subprocess.check_output(["osascript", "-e", self.script()], text=True, timeout=self.timeout_s)
+        if output == self.last_output:
+            return None
+        self.last_output = output
+        return parse_applescript_events(output)
+
+# --- The store ---
+
+class CalendarStore:
+    """
+    Answers calendar questions from an in-memory EventIndex that a background
+    thread keeps current, so the calendar tool never waits on Calendar.app.
+
+    Each refresh builds a new index and swaps it in, so readers never see a
+    half-built one and don't need a lock.
+    """
+
+    def __init__(self, source, refresh_s=CALENDAR_REFRESH_S):
+        self.source = source
+        self.refresh_s = refresh_s
+        self.index = EventIndex([])
+        self.ready = threading.Event()
+        self.last_refresh = None
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def refresh(self):
+        """
+        Reloads the source. Returns True if the events changed.
+
+        ready is set only once an index built from the source is in place, so
+        a reader never takes the empty initial index for an empty calendar.
+        """
+        events = self.source.load()
+        self.last_refresh = datetime.datetime.now()
+        if events is None:
+            return False # Unchanged: the index in place (if any) is still current
+        self.index = EventIndex(events)
+        self.ready.set()
+        return True
+
+    def start(self):
+        """Loads the events and keeps refreshing them on a background thread."""
+        if self._refresher is not None:
+            return self
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Calendar refresh failed: {e}")
+                if self._stop.wait(self.refresh_s):
+                    break
+
+        self._refresher = threading.Thread(target=run, daemon=True)
+        self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def between(self, window_start, window_end):
+        return self.index.between(window_start, window_end)
+
+    def on_day(self, day=None):
+        """Returns the events on a date (today by default)."""
+        day = day or datetime.date.today()
+        midnight = datetime.datetime.combine(day, datetime.time())
+        return self.index.between(midnight, midnight + datetime.timedelta(days=1))
+
+    def today(self):
+        return self.on_day()
+
+    def next_event(self, after=None):
+        return self.index.next_after(after or datetime.datetime.now())
+
+def format_event_time(event):
+    if event.start.time() == datetime.time() and event.end - event.start >= datetime.timedelta(days=1):
+        return "all day"
+    return "at " + event.start.strftime("%I:%M %p").lstrip("0")
+
+# --- Benchmark with a synthetic .ics file (python3 calendar_store.py [num_events]) ---
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    import tempfile
+
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(0)
+    now = datetime.datetime.now().replace(second=0, microsecond=0)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for i in range(num_events):
+        start = now + datetime.timedelta(minutes=30 * rng.randint(-24 * 365, 24 * 365))
+        end = start + datetime.timedelta(minutes=rng.choice([15, 30, 60, 90]))
+        lines += ["BEGIN:VEVENT", f"UID:event-{i}", f"DTSTART:{start:%Y%m%dT%H%M%S}", f"DTEND:{end:%Y%m%dT%H%M%S}",
+                  f"SUMMARY:{rng.choice(['Standup', 'Design review', '1:1', 'Lunch', 'Planning'])} #{i}", "END:VEVENT"]
+    lines += ["BEGIN:VEVENT", f"DTSTART;VALUE=DATE:{now:%Y%m%d}", "SUMMARY:Company offsite", "END:VEVENT", "END:VCALENDAR"]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ics", delete=False) as f:
+        f.write("\r\n".join(lines))
+        ics_path = f.name
+    try:
+        store = CalendarStore(IcsSource(ics_path))
+        t0 = time.perf_counter(); store.refresh(); load_s = time.perf_counter() - t0
+        t0 = time.perf_counter(); changed = store.refresh(); unchanged_s = time.perf_counter() - t0
+        print(f"{len(store.index)} events: load {load_s * 1000:.0f} ms, "
+              f"unchanged refresh {unchanged_s * 1e6:.0f} us (changed={changed})")
+
+        def per_call_us(fn, repeats=2000):
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                result = fn()
+            return (time.perf_counter() - t0) / repeats * 1e6, result
+
+        us, events = per_call_us(store.today)
+        print(f"today():        {us:7.1f} us  ({len(events)} events, first: {events[0].title} {format_event_time(events[0])})")
+        us, event = per_call_us(store.next_event)
+        print(f"next_event():   {us:7.1f} us  ({event.title} {format_event_time(event)})")
+        week = (now, now + datetime.timedelta(days=7))
+        us, events = per_call_us(lambda: store.between(*week))
+        print(f"next 7 days:    {us:7.1f} us  ({len(events)} events)")
+
+        # Cross-check the index against a linear scan
+        for _ in range(200):
+            a = now + datetime.timedelta(hours=rng.randint(-9000, 9000))
+            b = a + datetime.timedelta(hours=rng.randint(1, 200))
+            expected = sorted(e for e in store.index.events if e.start < b and (e.end > a or e.start >= a))
+            assert store.between(a, b) == expected
+        print("Window queries match a linear scan.")
+
+        dump = "2026 3 29 34200\t2026 3 29 36000\tStandup\n2026 3 30 0\t2026 3 31 0\tOffsite\nnot an event"
+        assert parse_applescript_events(dump) == [
+            Event(datetime.datetime(2026, 3, 29, 9, 30), datetime.datetime(2026, 3, 29, 10, 0), "Standup"),
+            Event(datetime.datetime(2026, 3, 30), datetime.datetime(2026, 3, 31), "Offsite")]
+        print("Calendar.app dump parses to absolute times.")
+
+        class UnchangedSource: # A source with nothing new, as on a refresh before any load succeeded
+            def load(self): return None
+        empty = CalendarStore(UnchangedSource())
+        assert not empty.refresh() and not empty.ready.is_set()
+        class SlowSource: # ready must stay unset while the first load is still running
+            def load(self):
+                assert not slow.ready.is_set()
+                return [Event(now, now + datetime.timedelta(hours=1), "Standup")]
+        slow = CalendarStore(SlowSource())
+        assert slow.refresh() and slow.ready.is_set() and len(slow.index) == 1
+        print("ready is only set once the index is loaded.")
+    finally:
+        os.remove(ics_path)
@@ -0,0 +1,156 @@
+# command_profile.py
+#
+# Whisper decoding options for spoken commands. By default every transcribe()
+# first runs a language-detection pass, may re-decode up to five more times at
+# rising temperatures, and knows nothing of the words Jarvis expects ("Spotify"
+# comes out as "spot if i"). The command profile pins English, bounds the
+# temperature schedule and primes the decoder with an initial prompt built from
+# the tool registry, the installed apps and the words of recent commands.
+#
+# Benchmark against the default decoding on recorded commands (see stt_benchmark.py):
+#   python3 command_profile.py recordings/ --model base --apps Spotify Xcode "Visual Studio Code"
+
+import re
+import threading
+from collections import deque
+
+from app_catalog import app_key
+
+COMMAND_LANGUAGE = "en"            # Pinned, so no language-detection pass
+COMMAND_TEMPERATURES = (0.0, 0.4)  # Greedy, and at most one retry if it looks broken (Whisper's default has six steps)
+PROMPT_MAX_WORDS = 80              # Whisper keeps at most ~224 prompt tokens; a short prompt also decodes faster
+RECENT_WORDS = 30                  # Words from recent commands kept in the prompt
+MIN_RECENT_WORD_LENGTH = 4         # Shorter words are mostly function words (and misrecognition fragments)
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+TOOL_NAME_NOISE = frozenset({"get", "on", "mac"}) # "get_battery_level" is said "battery level"
+COMMON_WORDS = frozenset({"what", "what's", "when", "where", "which", "that", "this", "there", "have", "with", "from",
+                          "your", "about", "please", "could", "would", "jarvis", "thanks", "thank", "goodbye",
+                          "open", "launch", "start", "search", "find", "show", "check", "tell"})
+
+class CommandProfile:
+    """
+    Builds transcribe() options for commands. options() is called once per
+    command; the prompt is only rebuilt when the app catalog was rescanned or a
+    new word was remembered.
+    """
+
+    def __init__(self, tools, app_catalog=None, language=COMMAND_LANGUAGE, temperatures=COMMAND_TEMPERATURES,
+                 max_words=PROMPT_MAX_WORDS):
+        self.tool_phrases = [" ".join(w for w in name.split("_") if w not in TOOL_NAME_NOISE) for name in tools]
+        self.app_catalog = app_catalog
+        self.language = language
+        self.temperatures = temperatures
+        self.max_words = max_words
+        self.recent = deque(maxlen=RECENT_WORDS) # Most recent last
+        self._lock = threading.Lock()
+        self._prompt = None
+        self._prompt_apps = None
+
+    def remember(self, text):
+        """Adds the distinctive words of an answered command to the prompt's recent vocabulary."""
+        new = [w for w in _WORD_RE.findall(text.lower().replace("’", "'"))
+               if len(w) >= MIN_RECENT_WORD_LENGTH and w not in COMMON_WORDS]
+        with self._lock:
+            for word in new:
+                if word in self.recent:
+                    self.recent.remove(word)
+                self.recent.append(word)
+            if new:
+                self._prompt = None
+
+    def _app_names(self, recent):
+        """Apps named in recent commands first, then the rest shortest first (short names get mangled most)."""
+        apps = self.app_catalog.apps if self.app_catalog is not None else []
+        recent_keys = {app_key(word) for word in recent}
+        mentioned = [app.name for app in apps if app_key(app.name) in recent_keys or
+                     any(app_key(w) in recent_keys for w in app.name.split())]
+        mentioned_set = set(mentioned)
+        return mentioned + sorted((app.name for app in apps if app.name not in mentioned_set), key=len)
+
+    def prompt(self):
+        """The initial prompt: tool phrases, recent words, then app names, up to max_words."""
+        apps = self.app_catalog.apps if self.app_catalog is not None else None
+        with self._lock:
+            if self._prompt is not None and apps is self._prompt_apps:
+                return self._prompt
+            recent = list(reversed(self.recent))
+        budget = self.max_words
+        parts, seen = [], set()
+        for phrase in ["Jarvis"] + self.tool_phrases + recent + self._app_names(recent):
+            size = len(phrase.split())
+            if phrase.lower() in seen or size > budget:
+                if budget < 2: break
+                continue
+            parts.append(phrase)
+            seen.add(phrase.lower())
+            budget -= size
+        prompt = ", ".join(parts) + "."
+        with self._lock:
+            self._prompt, self._prompt_apps = prompt, apps
+        return prompt
+
+    def options(self):
+        """Keyword arguments for transcribe() (any backend in stt.py)."""
+        return {"language": self.language, "temperature": self.temperatures, "initial_prompt": self.prompt()}
+
+# --- Benchmark: default decoding vs the command profile (python3 command_profile.py recordings/) ---
+
+if __name__ == "__main__":
+    import os
+    import time
+    import argparse
+    import numpy as np
+    from app_catalog import AppCatalog, App
+    from stt import load_backend, STT_BACKENDS, DEFAULT_BACKEND
+    from stt_benchmark import load_corpus, word_errors, words
+    from final import AVAILABLE_TOOLS
+
+    parser = argparse.ArgumentParser(description="Compare default Whisper decoding with the command profile.")
+    parser.add_argument("corpus", help="Directory of .wav commands with same-named .txt references")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(STT_BACKENDS))
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--apps", nargs="*", default=[], help="App names to add to the installed ones for the prompt")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per command and profile")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No .wav files in {args.corpus}")
+    catalog = AppCatalog()
+    catalog.build(sorted(set(catalog.scanner(catalog.dirs)) | {App(name, name) for name in args.apps}))
+    profile = CommandProfile(AVAILABLE_TOOLS, catalog)
+
+    # Each step adds one part of the profile, so its effect can be seen on its own
+    profiles = [
+        ("default", {}),
+        ("english", {"language": COMMAND_LANGUAGE}),
+        ("english + temperatures", {"language": COMMAND_LANGUAGE, "temperature": COMMAND_TEMPERATURES}),
+        ("command profile", profile.options()),
+    ]
+    print(f"{len(corpus)} commands, {len(catalog)} apps; prompt ({len(profile.prompt().split())} words):\n  {profile.prompt()}")
+
+    backend = load_backend(args.backend, args.model, args.threads)
+    backend.transcribe(np.zeros(16000, dtype=np.float32), language=COMMAND_LANGUAGE) # Warm-up
+    app_words = {app_key(w) for app in catalog.apps for w in app.name.split()} | {app_key(a.name) for a in catalog.apps}
+    print(f"\n{'profile':<24} {'p50 ms':>8} {'p95 ms':>8} {'WER':>7} {'app names':>10}")
+    for name, options in profiles:
+        latencies, errors, total, app_hits, app_refs = [], 0, 0, 0, 0
+        for _, audio, reference in corpus:
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                text = backend.transcribe(audio, **options)["text"].strip()
+                latencies.append(time.perf_counter() - t0)
+            if reference:
+                e, n = word_errors(reference, text)
+                errors, total = errors + e, total + n
+                said = {app_key(w) for w in words(text)} | {app_key(text)}
+                for word in words(reference):
+                    if app_key(word) in app_words:
+                        app_refs += 1
+                        app_hits += app_key(word) in said
+        wer = f"{errors / total:.1%}" if total else "-"
+        apps_found = f"{app_hits}/{app_refs}" if app_refs else "-"
+        print(f"{name:<24} {np.percentile(latencies, 50) * 1000:>8.0f} {np.percentile(latencies, 95) * 1000:>8.0f} "
+              f"{wer:>7} {apps_found:>10}")
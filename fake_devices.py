@@ -0,0 +1,547 @@
+# fake_devices.py
+#
+# Stand-ins for the microphone, Porcupine, Whisper, TTS, Gemini and the
+# speakers, so final.py's pipeline can be run end to end on a headless box with
+# no audio devices, API keys or network, and timed reproducibly.
+#
+# The scripted microphone plays tones instead of speech: the wake word is one
+# frequency and every scripted phrase gets its own, which the stub wake engine
+# and the scripted Whisper decode back. The simulated user takes turns: each
+# command starts once Jarvis has answered the previous one and gone quiet.
+#
+#   python3 fake_devices.py --conversations 5
+#   python3 fake_devices.py --corpus recordings/ --whisper base   # real Whisper on recorded commands
+
+import re
+import time
+import threading
+from types import SimpleNamespace
+from collections import namedtuple
+
+import numpy as np
+import pyaudio
+
+from intent_router import normalize_command
+from llm_client import LLMClient, ScriptedStreamBackend
+from wake_word import WakeDetector
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512          # Porcupine's frame length
+NOISE_RMS = 30.0            # Background hiss under everything the microphone "hears"
+TONE_AMPLITUDE = 4000
+WAKE_TONE_HZ = 2000
+WAKE_SECONDS = 0.4
+FIRST_PHRASE_HZ = 300       # Phrase i is a tone at FIRST_PHRASE_HZ + i * PHRASE_STEP_HZ
+PHRASE_STEP_HZ = 25
+SECONDS_PER_WORD = 0.3      # How long a scripted phrase lasts (and how long the fake TTS talks)
+TURN_GAP_S = 0.6            # The simulated user waits this long after Jarvis stops talking
+TURN_TIMEOUT_S = 20.0       # ...or this long at most, if Jarvis never answers
+TAIL_SECONDS = 3.0          # Background noise after the script, before the microphone goes dead
+VOICE_HZ = 180              # The fake TTS's "voice", when it isn't silent (below every phrase tone)
+
+class ToneCode:
+    """Assigns each scripted phrase a tone, and recovers the phrase from a recording of it."""
+
+    def __init__(self, phrases=()):
+        self.phrases = []
+        for phrase in phrases:
+            self.frequency(phrase)
+
+    def frequency(self, phrase):
+        if phrase not in self.phrases:
+            if FIRST_PHRASE_HZ + len(self.phrases) * PHRASE_STEP_HZ >= WAKE_TONE_HZ - PHRASE_STEP_HZ:
+                raise ValueError("Too many distinct phrases for the tone code")
+            self.phrases.append(phrase)
+        return FIRST_PHRASE_HZ + self.phrases.index(phrase) * PHRASE_STEP_HZ
+
+    def decode(self, audio, sample_rate=SAMPLE_RATE):
+        """Returns the phrase whose tone dominates `audio`, or None (wake tone, or nothing scripted)."""
+        spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio))))
+        peak_hz = np.argmax(spectrum[1:]) + 1
+        peak_hz = peak_hz * sample_rate / len(audio)
+        index = int(round((peak_hz - FIRST_PHRASE_HZ) / PHRASE_STEP_HZ))
+        if abs(peak_hz - WAKE_TONE_HZ) < PHRASE_STEP_HZ or not 0 <= index < len(self.phrases):
+            return None
+        return self.phrases[index]
+
+def tone(frequency, seconds, sample_rate=SAMPLE_RATE, amplitude=TONE_AMPLITUDE):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    ramp = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01) if len(t) else t # 10 ms fades, no clicks
+    return (amplitude * ramp * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+# One stretch of the script. `waits`: it only starts once Jarvis has answered whatever came before.
+# `interrupt_after_s`: instead, it starts this long after Jarvis starts answering (barge-in).
+Segment = namedtuple("Segment", "kind text samples waits interrupt_after_s", defaults=(None,))
+
+class Script:
+    """What the scripted microphone hears: pauses, wake words and commands, in order."""
+
+    def __init__(self, code=None, sample_rate=SAMPLE_RATE, noise_rms=NOISE_RMS, seed=0):
+        self.code = code or ToneCode()
+        self.sample_rate = sample_rate
+        self.noise_rms = noise_rms
+        self.seed = seed
+        self.segments = []
+
+    def pause(self, seconds):
+        self.segments.append(Segment("pause", None, np.zeros(int(seconds * self.sample_rate), np.float32), False))
+        return self
+
+    def wake(self, waits=True):
+        self.segments.append(Segment("wake", None, tone(WAKE_TONE_HZ, WAKE_SECONDS, self.sample_rate), waits))
+        return self
+
+    def say(self, text, seconds=None, waits=True, interrupt_after_s=None):
+        """A command as a tone (decoded by ScriptedWhisper), optionally talking over Jarvis's answer."""
+        seconds = seconds or max(0.6, SECONDS_PER_WORD * len(text.split()))
+        samples = tone(self.code.frequency(text), seconds, self.sample_rate)
+        self.segments.append(Segment("say", text, samples, waits and interrupt_after_s is None, interrupt_after_s))
+        return self
+
+    def play(self, audio, text, waits=True):
+        """A recorded command (float32 at the script's rate), for runs with the real Whisper."""
+        self.segments.append(Segment("say", text, np.asarray(audio, np.float32) * 32767, waits))
+        return self
+
+    def conversation(self, commands, waits_for_ack=True):
+        """Wake word, then each command in turn (end with "goodbye" to go back to standby)."""
+        self.wake()
+        for i, command in enumerate(commands):
+            self.say(command, waits=waits_for_ack or i > 0)
+        return self
+
+# What happened to a segment during a run: wall-clock (perf_counter) times of its first and last audio.
+Cue = namedtuple("Cue", "kind text start end interrupting")
+
+class ScriptedInputStream:
+    """
+    A PyAudio input stream that plays a Script in real time (or `speed` times
+    faster), in callback mode like the real capture stream, or via read().
+    """
+
+    def __init__(self, pa, script, sample_rate, frames_per_buffer, stream_callback=None):
+        if sample_rate != script.sample_rate:
+            raise ValueError(f"Script is at {script.sample_rate} Hz, stream opened at {sample_rate} Hz")
+        self.pa = pa
+        self.script = script
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = stream_callback
+        self.cues = []
+        self.started_at = None
+        self.finished = threading.Event()
+        self._rng = np.random.default_rng(script.seed)
+        self._delivered = 0
+        self._last_delivery = None
+        self._chunks = self._generate()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frames(self, samples):
+        n = self.frames_per_buffer
+        padded = np.zeros(-(-len(samples) // n) * n, np.float32)
+        padded[:len(samples)] = samples
+        for i in range(0, len(padded), n):
+            noisy = padded[i:i + n] + self._rng.normal(0, self.script.noise_rms, n) + self.pa.take_echo(n)
+            yield np.clip(noisy, -32768, 32767).astype(np.int16).tobytes()
+
+    def _silence(self):
+        return self._frames(np.zeros(self.frames_per_buffer, np.float32))
+
+    def _generate(self):
+        for segment in self.script.segments:
+            if segment.waits and self.cues:
+                deadline = time.perf_counter() + TURN_TIMEOUT_S
+                while not self.pa.sink.quiet_after(self.cues[-1].end, TURN_GAP_S) and time.perf_counter() < deadline:
+                    yield from self._silence()
+            elif segment.interrupt_after_s is not None and self.cues:
+                deadline = time.perf_counter() + TURN_TIMEOUT_S
+                while time.perf_counter() < deadline:
+                    answered = self.pa.sink.first_write_after(self.cues[-1].end)
+                    if answered is not None and time.perf_counter() >= answered + segment.interrupt_after_s:
+                        break
+                    yield from self._silence()
+            start = None
+            for chunk in self._frames(segment.samples):
+                yield chunk
+                start = start or self._last_delivery
+            if segment.kind != "pause":
+                self.cues.append(Cue(segment.kind, segment.text, start, self._last_delivery,
+                                     segment.interrupt_after_s is not None))
+        for _ in range(int(TAIL_SECONDS * self.sample_rate / self.frames_per_buffer)):
+            yield from self._silence()
+
+    def _next_chunk(self):
+        """The next buffer, paced to real time. None once the script (and its tail) has played."""
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.finished.set()
+            return None
+        self._delivered += self.frames_per_buffer
+        delay = self.started_at + self._delivered / self.sample_rate / self.pa.speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_delivery = time.perf_counter()
+        return chunk
+
+    def _run(self):
+        while not self._stop.is_set():
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            self.callback(chunk, self.frames_per_buffer, {}, 0)
+
+    def start_stream(self):
+        if self.callback is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def read(self, num_frames, exception_on_overflow=True):
+        if num_frames != self.frames_per_buffer:
+            raise ValueError("Scripted streams read one buffer at a time")
+        chunk = self._next_chunk()
+        if chunk is None:
+            raise IOError("The script has finished.")
+        return chunk
+
+    def is_active(self):
+        return not self.finished.is_set()
+
+    def stop_stream(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop_stream()
+
+class NullSink:
+    """Discards speech, keeping only when each buffer started and finished playing."""
+
+    def __init__(self):
+        self.writes = []    # (start, end, num_samples, sample_rate)
+        self._playing = 0
+        self._lock = threading.Lock()
+
+    def _begin(self):
+        with self._lock:
+            self._playing += 1
+
+    def _end(self, start, audio, sample_rate):
+        with self._lock:
+            self._playing -= 1
+            self.writes.append((start, time.perf_counter(), len(audio), sample_rate))
+
+    def keep(self, audio, sample_rate):
+        pass
+
+    def first_write_after(self, t):
+        """When speech next started playing after time t, or None."""
+        with self._lock:
+            return min((start for start, _, _, _ in self.writes if start >= t), default=None)
+
+    def stopped_after(self, t, gap_s=0.1):
+        """When playback going on at time t stopped (the first gap of gap_s or more), or None if nothing was playing."""
+        with self._lock:
+            writes = sorted((start, end) for start, end, _, _ in self.writes if end >= t)
+        if not writes or writes[0][0] > t:
+            return None
+        stopped = writes[0][1]
+        for start, end in writes[1:]:
+            if start - stopped >= gap_s:
+                break
+            stopped = max(stopped, end)
+        return stopped
+
+    def quiet_after(self, t, gap_s):
+        """True once something has been played since t, and nothing has for gap_s seconds."""
+        with self._lock:
+            if self._playing or not self.writes or self.writes[-1][0] < t:
+                return False
+            return time.perf_counter() - self.writes[-1][1] >= gap_s
+
+class CaptureSink(NullSink):
+    """Keeps everything Jarvis said, e.g. to listen to a run or check the replies."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def keep(self, audio, sample_rate):
+        self.chunks.append((audio.copy(), sample_rate))
+
+    def audio(self):
+        """Everything played, as float32 at the first chunk's rate (all TTS output shares one rate)."""
+        return np.concatenate([chunk for chunk, _ in self.chunks]) if self.chunks else np.zeros(0, np.float32)
+
+class SinkStream:
+    """A PyAudio output stream that plays into a sink, taking as long as the audio lasts."""
+
+    def __init__(self, pa, sample_rate, format):
+        self.pa = pa
+        self.sample_rate = sample_rate
+        self.dtype = np.float32 if format == pyaudio.paFloat32 else np.int16
+
+    def write(self, data, num_frames=None, exception_on_underflow=False):
+        audio = np.frombuffer(data, dtype=self.dtype)
+        start = time.perf_counter()
+        self.pa.sink._begin()
+        try:
+            self.pa.sink.keep(audio, self.sample_rate)
+            self.pa.add_echo(audio, self.sample_rate)
+            time.sleep(len(audio) / self.sample_rate / self.pa.speed)
+        finally:
+            self.pa.sink._end(start, audio, self.sample_rate)
+
+    def is_active(self): return True
+    def start_stream(self): pass
+    def stop_stream(self): pass
+    def close(self): pass
+
+class FakePyAudio:
+    """
+    A PyAudio stand-in: input streams play the script, output streams play into
+    the sink. Pass it to run_pipeline() and to voice_io.set_output_device().
+
+    With an `echo_gain`, what is played also leaks back into the microphone at
+    that level, as it would from speakers in the same room.
+    """
+
+    def __init__(self, script, sink=None, speed=1.0, echo_gain=0.0):
+        self.script = script
+        self.sink = sink or NullSink()
+        self.speed = speed
+        self.echo_gain = echo_gain
+        self.input_streams = []
+        self._echo = np.zeros(0, np.float32) # Played audio not yet heard by the microphone, at the script's rate
+        self._echo_lock = threading.Lock()
+
+    def add_echo(self, audio, sample_rate):
+        if not self.echo_gain or not len(audio):
+            return
+        rate = self.script.sample_rate
+        positions = np.arange(0, len(audio), sample_rate / rate)
+        echo = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32) * (32767 * self.echo_gain)
+        with self._echo_lock:
+            self._echo = np.concatenate((self._echo, echo))
+
+    def take_echo(self, num_samples):
+        """The next num_samples of echo (zeros once it's all been heard)."""
+        with self._echo_lock:
+            echo, self._echo = self._echo[:num_samples], self._echo[num_samples:]
+        return np.pad(echo, (0, num_samples - len(echo)))
+
+    def open(self, rate, channels=1, format=pyaudio.paInt16, input=False, output=False,
+             frames_per_buffer=1024, stream_callback=None, **kwargs):
+        if output:
+            return SinkStream(self, rate, format)
+        stream = ScriptedInputStream(self, self.script, rate, frames_per_buffer, stream_callback)
+        self.input_streams.append(stream)
+        return stream
+
+    def terminate(self):
+        for stream in self.input_streams:
+            stream.close()
+
+class StubWakeEngine(WakeDetector):
+    """A wake word detector that fires at the end of each wake tone, as Porcupine does at the end of the word."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH, min_frames=3):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.min_frames = min_frames
+        t = np.arange(frame_length) / sample_rate
+        self._basis = np.exp(-2j * np.pi * WAKE_TONE_HZ * t)
+        self._samples = np.zeros(frame_length, dtype=np.float32)
+        self._run = 0
+
+    def detect(self, frame):
+        x = self._samples
+        np.copyto(x, np.frombuffer(frame, dtype=np.int16) if not isinstance(frame, np.ndarray) else frame)
+        energy = np.dot(x, x) / len(x)
+        tone_energy = 2 * abs(np.dot(x, self._basis) / len(x)) ** 2
+        if energy > NOISE_RMS ** 2 * 100 and tone_energy > 0.5 * energy:
+            self._run += 1
+            return -1
+        fired, self._run = self._run >= self.min_frames, 0
+        return 0 if fired else -1
+
+class ScriptedWhisper:
+    """
+    Whisper's transcribe() for scripted audio: each tone becomes a segment with
+    its phrase. `real_time_factor` adds compute time in proportion to the audio.
+    """
+
+    def __init__(self, code, real_time_factor=0.0, sample_rate=SAMPLE_RATE):
+        self.code = code
+        self.real_time_factor = real_time_factor
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio, **options):
+        audio = np.asarray(audio, dtype=np.float32)
+        time.sleep(len(audio) / self.sample_rate * self.real_time_factor)
+        frame = self.sample_rate // 50
+        count = len(audio) // frame
+        voiced = np.sqrt(np.mean(audio[:count * frame].reshape(count, frame) ** 2, axis=1)) > 0.02
+        segments, i = [], 0
+        while i < count:
+            if not voiced[i]:
+                i += 1
+                continue
+            j = i
+            while j < count and voiced[j]:
+                j += 1
+            phrase = self.code.decode(audio[i * frame:j * frame], self.sample_rate) if j - i >= 5 else None
+            if phrase:
+                segments.append({"start": i * frame / self.sample_rate, "end": j * frame / self.sample_rate,
+                                 "text": " " + phrase})
+            i = j
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+
+class SilentTTS:
+    """
+    A TTS stand-in: silence as long as the text would take to say, after
+    `real_time_factor` of that in compute. With a `voice_level`, it hums at
+    VOICE_HZ instead, so there is something to echo back into the microphone.
+    """
+
+    def __init__(self, sample_rate=22050, real_time_factor=0.0, voice_level=0.0):
+        self.synthesizer = SimpleNamespace(output_sample_rate=sample_rate)
+        self.real_time_factor = real_time_factor
+        self.voice_level = voice_level
+
+    def tts(self, text, speaker=None, **kwargs):
+        seconds = SECONDS_PER_WORD * max(1, len(text.split()))
+        time.sleep(seconds * self.real_time_factor)
+        rate = self.synthesizer.output_sample_rate
+        if not self.voice_level:
+            return np.zeros(int(seconds * rate), dtype=np.float32)
+        return tone(VOICE_HZ, seconds, rate, amplitude=self.voice_level)
+
+DEFAULT_REPLY = "Certainly, sir. This is a scripted reply, standing in for Gemini."
+_PROMPT_COMMAND_RE = re.compile(r'command: "(.*?)"')
+
+def scripted_llm(replies=None, default_reply=DEFAULT_REPLY, first_token_delay_s=0.4, token_delay_s=0.03):
+    """
+    An LLMClient answering like Gemini would, from a table of command -> reply
+    (normalized like the response cache, so punctuation and fillers don't matter).
+    """
+    table = {normalize_command(command): reply for command, reply in (replies or {}).items()}
+
+    def reply(contents):
+        match = _PROMPT_COMMAND_RE.search(contents)
+        return table.get(normalize_command(match.group(1)) if match else "", default_reply)
+
+    return LLMClient(ScriptedStreamBackend(reply, first_token_delay_s, token_delay_s))
+
+# --- End-to-end benchmark of final.py's pipeline (python3 fake_devices.py) ---
+
+DEMO_COMMANDS = ["what is my battery level", "tell me something interesting",
+                 "how busy is the computer and what is my battery", "goodbye"]
+BARGE_IN_COMMANDS = ["tell me a long story", "how busy is the computer", "goodbye"] # The second talks over the first
+DEMO_REPLIES = {
+    "tell me a long story": "Once upon a time, sir, there was a very patient assistant. It read every word of every "
+                            "answer aloud. Nobody could stop it. The user grew old waiting. The end.",
+    "tell me something interesting": "Octopuses have three hearts, sir. Two of them stop when they swim.",
+    "how busy is the computer and what is my battery":
+        '[{"tool_name": "get_system_status", "parameters": {}}, {"tool_name": "get_battery_level", "parameters": {}}]',
+}
+
+if __name__ == "__main__":
+    import os
+    import glob
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Run final.py's pipeline end to end on fake devices.")
+    parser.add_argument("--conversations", type=int, default=3, help="Wake-to-goodbye conversations to run")
+    parser.add_argument("--speed", type=float, default=1.0, help="Play the script (and speech) this many times real time")
+    parser.add_argument("--stt-rtf", type=float, default=0.1, help="Scripted Whisper compute, as a fraction of audio length")
+    parser.add_argument("--tts-rtf", type=float, default=0.1, help="Fake TTS compute, as a fraction of speech length")
+    parser.add_argument("--llm-first-token", type=float, default=0.4, help="Scripted Gemini time to first token (s)")
+    parser.add_argument("--whisper", default="scripted", help="'scripted', or a Whisper model name (needs --corpus)")
+    parser.add_argument("--stt-backend", help="Speech-to-text backend for a real model (default: final.STT_BACKEND)")
+    parser.add_argument("--corpus", help="Directory of recorded .wav commands with .txt transcripts (see stt_benchmark.py)")
+    parser.add_argument("--capture", help="Write everything Jarvis said to this WAV file")
+    parser.add_argument("--barge-in", action="store_true", help="Also talk over a long answer in each conversation")
+    parser.add_argument("--echo", type=float, default=0.05, help="How loud Jarvis's voice comes back into the microphone")
+    args = parser.parse_args()
+
+    import final
+    import actions
+    from startup import Startup, Lazy, load_stt, warm_up_whisper
+    from response_cache import ResponseCache
+    from system_status import SystemMonitor
+    from stt_benchmark import load_corpus
+    from voice_io import set_output_device, close_output, save_debug_wav, SILENCE_DURATION_S
+
+    script = Script()
+    if args.corpus:
+        if args.whisper == "scripted":
+            parser.error("Recorded commands need a real Whisper model (e.g. --whisper base)")
+        recorded = [(audio, text) for _, audio, text in load_corpus(args.corpus) if text]
+        goodbyes = [(audio, text) for audio, text in recorded if final.SHUTDOWN_COMMAND in text.lower()]
+        if not goodbyes:
+            parser.error(f"The corpus needs a recording of '{final.SHUTDOWN_COMMAND}' to end each conversation")
+        for _ in range(args.conversations):
+            script.wake()
+            for audio, text in [c for c in recorded if c not in goodbyes] + goodbyes[:1]:
+                script.play(audio, text)
+    else:
+        for _ in range(args.conversations):
+            script.conversation(DEMO_COMMANDS[:-1] if args.barge_in else DEMO_COMMANDS)
+            if args.barge_in:
+                story, interruption, goodbye = BARGE_IN_COMMANDS
+                script.say(story).say(interruption, interrupt_after_s=1.5).say(goodbye)
+
+    sink = CaptureSink() if args.capture else NullSink()
+    pa = FakePyAudio(script, sink, speed=args.speed, echo_gain=args.echo)
+    set_output_device(pa)
+    final.response_cache = ResponseCache(os.path.join(tempfile.mkdtemp(), "responses.json")) # Every run starts cold
+    final.llm = Lazy("scripted gemini", lambda: scripted_llm(DEMO_REPLIES, first_token_delay_s=args.llm_first_token))
+    actions.system_monitor = SystemMonitor().start()
+
+    startup = Startup()
+    startup.load("porcupine", StubWakeEngine)
+    if args.whisper == "scripted":
+        startup.load("whisper", lambda: ScriptedWhisper(script.code, args.stt_rtf))
+    else:
+        startup.load("whisper", lambda: load_stt(args.stt_backend or final.STT_BACKEND, args.whisper, final.STT_THREADS),
+                     warm_up=warm_up_whisper)
+    startup.load("tts", lambda: SilentTTS(real_time_factor=args.tts_rtf, voice_level=0.3 if args.echo else 0.0))
+    startup.get("whisper") # Loading isn't part of the measurement
+
+    started = time.perf_counter()
+    try:
+        final.run_pipeline(startup, pa, conversations=args.conversations)
+    finally:
+        wall_s = time.perf_counter() - started
+        startup.close()
+        final.tool_executor.close()
+
+    cues = pa.input_streams[0].cues
+    latencies = {}
+    for cue in cues:
+        answered = sink.first_write_after(cue.end)
+        if answered is not None:
+            latencies.setdefault(cue.text or "(wake word)", []).append(answered - cue.end)
+    print(f"\n{'what was said':<50} {'n':>3} {'p50 ms':>8} {'p95 ms':>8}")
+    for text, values in latencies.items():
+        print(f"{text:<50} {len(values):>3} {np.percentile(values, 50) * 1000:>8.0f} {np.percentile(values, 95) * 1000:>8.0f}")
+    commands = sum(1 for cue in cues if cue.kind == "say")
+    print(f"{commands} commands in {wall_s:.1f}s ({commands / wall_s * 60:.1f} per minute, speed x{args.speed:g})")
+    for cue in cues:
+        if cue.interrupting:
+            stopped = sink.stopped_after(cue.start)
+            print(f"Talking over Jarvis: " + (f"playback stopped {(stopped - cue.start) * 1000:.0f} ms after the user started"
+                                              if stopped else "nothing was playing"))
+    print(f"Latency is from the end of what was said to Jarvis's first audio, "
+          f"including the {SILENCE_DURATION_S}s end-of-speech wait.")
+    if final.llm.loaded:
+        print(f"Scripted Gemini: {final.llm.stats()}")
+    final.tracer.report()
+    if args.capture and sink.chunks:
+        save_debug_wav((np.clip(sink.audio(), -1, 1) * 32767).astype(np.int16).tobytes(),
+                       sink.chunks[0][1], args.capture)
+        print(f"Jarvis's speech written to {args.capture}")
+    close_output()
@@ -0,0 +1,426 @@
+# file_search.py
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import tempfile
+import bisect
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_RESULTS = 5
+SEARCH_TIMEOUT_S = 5                 # Streaming backend: give up on the external tool after this long
+FILE_INDEX_FILE = os.path.join(".jarvis_cache", "file_index.json")
+FILE_INDEX_ROOTS = [os.path.expanduser("~")]
+FILE_INDEX_REFRESH_S = 60            # Background mtime scan interval
+WALK_WORKERS = 8
+# Directories that are huge, noisy and never what "find my file" means
+SKIP_DIRS = frozenset({"node_modules", "__pycache__", "Library", "site-packages", "venv", ".venv", "proc", "sys"})
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(name):
+    """Splits a file name (or a query) into lowercase alphanumeric tokens."""
+    return _TOKEN_RE.findall(name.lower())
+
+def default_search_command(query):
+    """The platform's own file search: Spotlight on macOS, locate elsewhere."""
+    if sys.platform == "darwin":
+        return ["mdfind", query]
+    return ["locate", "-i", query]
+
+class StreamingSearch:
+    """
+    Runs an external search tool and reads its output line by line, killing the
+    process as soon as enough results have arrived (mdfind can print tens of
+    thousands of paths, of which we keep five).
+    """
+
+    def __init__(self, command_builder=default_search_command, timeout_s=SEARCH_TIMEOUT_S):
+        self.command_builder = command_builder
+        self.timeout_s = timeout_s
+
+    def search(self, query, limit=MAX_RESULTS):
+        process = subprocess.Popen(self.command_builder(query), stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, text=True)
+        # The watchdog kills a tool that is still running (and silent) at the deadline
+        watchdog = threading.Timer(self.timeout_s, process.kill)
+        watchdog.start()
+        results = []
+        try:
+            for line in process.stdout:
+                line = line.rstrip("\n")
+                if line:
+                    results.append(line)
+                    if len(results) >= limit:
+                        break
+        finally:
+            watchdog.cancel()
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+        return results
+
+class FileIndex:
+    """
+    A built-in filename index: an inverted index from name tokens to paths.
+
+    The tree is walked in parallel, one worker per top-level directory. Directory
+    mtimes are remembered, so refresh() only re-lists directories whose entries
+    changed. The directory listing is persisted and the token postings are
+    rebuilt from it on load.
+
+    Queries match paths whose name has, for every query token, a token starting
+    with it ("proj prop" finds "Project_Proposal.pdf").
+    """
+
+    def __init__(self, roots=FILE_INDEX_ROOTS, path=FILE_INDEX_FILE, skip_dirs=SKIP_DIRS, workers=WALK_WORKERS):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.path = path
+        self.skip_dirs = skip_dirs
+        self.workers = workers
+        self.dirs = {}         # dir path -> (mtime, [child names])
+        self.paths = []        # path id -> path (None once removed)
+        self.ids = {}          # path -> path id
+        self.postings = {}     # token -> set of path ids
+        self._sorted_tokens = None
+        self._lock = threading.RLock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self.ready = threading.Event()
+
+    # --- Building ---
+
+    def _skip(self, name):
+        return name.startswith(".") or name in self.skip_dirs
+
+    def _list_dir(self, directory):
+        """Returns (mtime, [child names], [child dir paths]) for one directory."""
+        mtime = os.stat(directory).st_mtime
+        names, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if self._skip(entry.name):
+                    continue
+                names.append(entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+        return mtime, names, subdirs
+
+    def _scan_tree(self, top):
+        """Walks one subtree without touching the index. Returns {dir: (mtime, [child names])}."""
+        found = {}
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime, names, subdirs = self._list_dir(directory)
+            except OSError:
+                continue
+            found[directory] = (mtime, names)
+            stack += subdirs
+        return found
+
+    def _scan_parallel(self, tops):
+        found = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for subtree in pool.map(self._scan_tree, tops):
+                found.update(subtree)
+        return found
+
+    def build(self):
+        """Walks every root from scratch."""
+        listings, tops = {}, []
+        for root in self.roots:
+            try:
+                mtime, names, subdirs = self._list_dir(root)
+            except OSError:
+                continue
+            listings[root] = (mtime, names)
+            tops += subdirs
+        listings.update(self._scan_parallel(tops))
+        with self._lock:
+            self.dirs, self.paths, self.ids, self.postings = {}, [], {}, {}
+            self._sorted_tokens = None
+            for directory, listing in listings.items():
+                self._add_dir(directory, listing)
+        self.ready.set()
+
+    def _add_path(self, path):
+        if path in self.ids:
+            return
+        path_id = len(self.paths)
+        self.paths.append(path)
+        self.ids[path] = path_id
+        for token in set(tokenize(os.path.basename(path))):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                if self._sorted_tokens is not None:
+                    bisect.insort(self._sorted_tokens, token)
+            ids.add(path_id)
+
+    def _remove_path(self, path):
+        path_id = self.ids.pop(path, None)
+        if path_id is None:
+            return
+        self.paths[path_id] = None
+        for token in set(tokenize(os.path.basename(path))):
+            ids = self.postings.get(token)
+            if ids is not None:
+                ids.discard(path_id)
+                if not ids:
+                    del self.postings[token]
+                    if self._sorted_tokens is not None:
+                        del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+
+    def _add_dir(self, directory, listing):
+        self.dirs[directory] = listing
+        for name in listing[1]:
+            self._add_path(os.path.join(directory, name))
+
+    def _remove_dir(self, directory):
+        """Forgets a directory's entries, and its whole subtree."""
+        _, names = self.dirs.pop(directory, (0, []))
+        for name in names:
+            child = os.path.join(directory, name)
+            self._remove_path(child)
+            if child in self.dirs:
+                self._remove_dir(child)
+
+    def refresh(self):
+        """
+        Brings the index up to date by re-listing only directories whose mtime changed.
+        Directories that appeared since the last scan are walked whole.
+
+        Returns:
+            int: The number of directories that were re-listed.
+        """
+        with self._lock:
+            known = dict(self.dirs)
+        # Stat and re-list outside the lock, so searches aren't held up by the disk
+        changes = {}
+        for directory, (mtime, old_names) in known.items():
+            try:
+                if os.stat(directory).st_mtime == mtime:
+                    continue
+                new_mtime, names, subdirs = self._list_dir(directory)
+            except OSError:
+                changes[directory] = None # Gone
+                continue
+            added = set(names) - set(old_names)
+            new_trees = {}
+            for subdir in subdirs:
+                if os.path.basename(subdir) in added:
+                    new_trees.update(self._scan_tree(subdir))
+            changes[directory] = ((new_mtime, names), set(old_names) - set(names), added, new_trees)
+        if not changes:
+            return 0
+
+        with self._lock:
+            for directory, change in changes.items():
+                if directory not in self.dirs:
+                    continue # Already dropped along with a parent
+                if change is None:
+                    self._remove_dir(directory)
+                    continue
+                listing, removed, added, new_trees = change
+                self.dirs[directory] = listing
+                for name in removed:
+                    child = os.path.join(directory, name)
+                    self._remove_path(child)
+                    if child in self.dirs:
+                        self._remove_dir(child)
+                for name in added:
+                    self._add_path(os.path.join(directory, name))
+                for sub_dir, sub_listing in new_trees.items():
+                    self._add_dir(sub_dir, sub_listing)
+        return len(changes)
+
+    # --- Persistence ---
+
+    def save(self):
+        """Writes the directory listing to disk (atomically)."""
+        with self._lock:
+            # Listings are replaced, never changed in place, so a shallow copy is a consistent snapshot
+            data = {"roots": self.roots, "dirs": dict(self.dirs)}
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save file index: {e}")
+            if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+
+    def load(self):
+        """Loads a saved index. Returns False if there is none for these roots."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("roots") != self.roots:
+            return False
+        with self._lock:
+            self.dirs, self.paths, self.ids, self.postings = {}, [], {}, {}
+            self._sorted_tokens = None
+            for directory, (mtime, names) in data["dirs"].items():
+                self._add_dir(directory, (mtime, names))
+        self.ready.set()
+        return True
+
+    def start(self, refresh_s=FILE_INDEX_REFRESH_S):
+        """
+        Loads (or builds) the index and keeps it fresh, all on a background thread.
+        search() returns None until the index is ready.
+        """
+        if self._refresher is not None:
+            return self
+
+        def run():
+            if self.load():
+                self.refresh()
+            else:
+                self.build()
+            self.save()
+            while not self._stop.wait(refresh_s):
+                if self.refresh():
+                    self.save()
+
+        self._refresher = threading.Thread(target=run, daemon=True)
+        self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Queries ---
+
+    def _ids_with_prefix(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        ids = set()
+        i = bisect.bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            ids |= self.postings[tokens[i]]
+            i += 1
+        return ids
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Returns up to `limit` paths whose name matches every query token, best first,
+        or None if the index hasn't been built yet.
+        """
+        if not self.ready.is_set():
+            return None
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return []
+        with self._lock:
+            matches = None
+            for token in sorted(query_tokens, key=len, reverse=True): # Longer prefixes narrow faster
+                ids = self.postings.get(token, set()) if len(token) < 3 else self._ids_with_prefix(token)
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+            # Names containing the query words exactly beat prefix matches; then shorter paths win
+            exact = set(matches)
+            for token in query_tokens:
+                exact &= self.postings.get(token, set())
+            candidates = exact or matches
+            best = heapq.nsmallest(limit, candidates, key=lambda i: (len(self.paths[i]), self.paths[i]))
+            return [self.paths[i] for i in best]
+
+    def __len__(self):
+        return len(self.ids)
+
+class FileSearch:
+    """
+    The file search used by the search_files_on_mac tool. Answers from the
+    built-in index once it is ready, and streams from the platform's search
+    tool until then (or if the index is switched off).
+    """
+
+    def __init__(self, index=None, streaming=None):
+        self.index = index
+        self.streaming = streaming or StreamingSearch()
+
+    def search(self, query, limit=MAX_RESULTS):
+        if self.index is not None:
+            results = self.index.search(query, limit)
+            if results is not None:
+                return results
+        return self.streaming.search(query, limit)
+
+# --- Benchmark on a synthetic tree (python3 file_search.py [num_files]) ---
+
+if __name__ == "__main__":
+    import random
+    import shutil
+
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    words = ["project", "proposal", "quarterly", "report", "invoice", "taxes", "notes", "draft", "final",
+             "budget", "meeting", "photo", "resume", "contract", "summary", "slides", "data", "backup"]
+    extensions = [".pdf", ".docx", ".txt", ".png", ".xlsx", ".md", ".py"]
+    rng = random.Random(0)
+    root = tempfile.mkdtemp(prefix="jarvis_files_")
+    try:
+        print(f"Creating {num_files} files under {root}...")
+        dirs = [root]
+        for i in range(num_files // 50):
+            parent = rng.choice(dirs)
+            d = os.path.join(parent, f"{rng.choice(words)}_{i}")
+            os.mkdir(d)
+            dirs.append(d)
+        for i in range(num_files):
+            name = f"{rng.choice(words)}_{rng.choice(words)}_{i}{rng.choice(extensions)}"
+            open(os.path.join(rng.choice(dirs), name), "w").close()
+
+        index_file = root + "_index.json"
+        index = FileIndex([root], path=index_file)
+        t0 = time.perf_counter(); index.build(); build_s = time.perf_counter() - t0
+        serial = FileIndex([root], path=index_file, workers=1)
+        t0 = time.perf_counter(); serial.build(); serial_s = time.perf_counter() - t0
+        print(f"Build: {build_s:.2f}s with {WALK_WORKERS} walkers, {serial_s:.2f}s with 1 "
+              f"({len(index)} paths, {len(index.postings)} tokens)")
+
+        t0 = time.perf_counter(); index.save(); save_s = time.perf_counter() - t0
+        loaded = FileIndex([root], path=index_file)
+        t0 = time.perf_counter(); loaded.load(); load_s = time.perf_counter() - t0
+        print(f"Save: {save_s:.2f}s, load: {load_s:.2f}s ({os.path.getsize(index_file) / 1e6:.1f} MB)")
+
+        queries = ["project proposal", "quarterly report", "invoice", "tax", "resume pdf", "budget xlsx", "zebra"]
+        for query in queries:
+            t0 = time.perf_counter()
+            for _ in range(20):
+                results = index.search(query)
+            per_query_ms = (time.perf_counter() - t0) / 20 * 1000
+            print(f"  {query!r:20} {per_query_ms:8.2f} ms  {results[:1]}")
+
+        t0 = time.perf_counter(); unchanged = index.refresh(); idle_s = time.perf_counter() - t0
+        new_dir = os.path.join(rng.choice(dirs), "holiday_photos")
+        os.mkdir(new_dir)
+        open(os.path.join(new_dir, "beach_sunset.jpg"), "w").close()
+        removed_file = next(path for path in index.ids if os.path.isfile(path))
+        os.remove(removed_file)
+        t0 = time.perf_counter(); relisted = index.refresh(); refresh_s = time.perf_counter() - t0
+        print(f"Refresh: {idle_s * 1000:.0f} ms with nothing changed ({unchanged} dirs), "
+              f"{refresh_s * 1000:.0f} ms after changes ({relisted} dirs re-listed)")
+        print(f"  'beach sunset' -> {index.search('beach sunset')}, removed file still indexed: {removed_file in index.ids}")
+
+        if shutil.which(default_search_command("x")[0]):
+            t0 = time.perf_counter()
+            StreamingSearch().search("report")
+            print(f"Streaming {default_search_command('x')[0]}: {(time.perf_counter() - t0) * 1000:.0f} ms for {MAX_RESULTS} results")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        if os.path.exists(root + "_index.json"): os.remove(root + "_index.json")
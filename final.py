@@ -1,187 +1,379 @@
 # main_jarvis.py
 
-import pvporcupine
 import pyaudio
-import struct
-import whisper
-from TTS.api import TTS
 import os
-import wave
 import time
-import audioop
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
+import itertools
 
 # --- IMPORT OUR NEW ACTIONS MODULE ---
 import actions
+from audio_capture import AudioCapture
+from barge_in import BargeInMonitor
+from wake_word import PorcupineDetector, StandbyMeter, wait_for_wake_word
+from command_profile import CommandProfile
+from incremental_stt import IncrementalTranscriber
+from intent_router import IntentRouter
+from llm_client import LLMClient, GeminiBackend
+from response_cache import ResponseCache, TOOL, REPLY
+from tool_executor import ToolExecutor
+from file_search import FileIndex
+from calendar_store import CalendarStore, IcsSource, AppleScriptSource
+from system_status import SystemMonitor
+from tracing import tracer, JsonlSink, PrometheusFile, MetricsServer
+from startup import Startup, Lazy, load_porcupine, load_stt, warm_up_whisper, load_tts, warm_up_tts
+from voice_io import record_command_vad, transcribe_command, speak, speak_stream, close_output, acknowledge_wake, \
+    get_vad, set_barge_in
 
 # --- Load Environment Variables ---
 load_dotenv()
 PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-# --- Configure Google AI ---
-try:
-    genai.configure(api_key=GOOGLE_API_KEY)
-except Exception as e:
-    print(f"Error configuring Google AI. Check your API key. Error: {e}")
-    exit()
+CALENDAR_ICS_FILE = os.getenv("JARVIS_CALENDAR_ICS") # Optional: read events from an .ics file instead of Calendar.app
 
 # --- Configuration ---
 WAKE_WORDS = ["jarvis"]
 SHUTDOWN_COMMAND = "goodbye"
-COMMAND_FILENAME = "command.wav"
-RESPONSE_FILENAME = "response.wav"
+COMMAND_FILENAME = "command.wav" # Only written when SAVE_COMMAND_WAV is on
+SAVE_COMMAND_WAV = False          # Debug: keep a copy of the last command on disk
+ACKNOWLEDGEMENT_MODE = "speak"    # "speak", "overlap" or "skip" (see voice_io.py)
+PREROLL_SECONDS = 2.0             # Audio after the wake word kept for the command
+STREAMING_TRANSCRIPTION = True    # Transcribe while the user is still speaking
+COMMAND_PROFILE = True            # Decode commands as English, with few retries and a prompt of expected words
+STREAM_LLM_REPLIES = True         # Speak conversational replies while Gemini is still generating
+BARGE_IN = True                   # Keep listening while speaking; talking over Jarvis (or "Jarvis") cuts it off
+USE_FILE_INDEX = True             # Answer file searches from a built-in filename index (built in the background)
+USE_CALENDAR_STORE = True         # Answer calendar questions from an in-memory copy refreshed in the background
+USE_SYSTEM_MONITOR = True         # Sample battery/CPU/memory in the background instead of running pmset per question
+TRACE_TURNS = True                # Time every stage of every turn into .jarvis_cache/traces.jsonl and metrics.prom
+METRICS_PORT = None               # e.g. 9464 to also serve the stage histograms at http://127.0.0.1:9464/metrics
 SAMPLE_RATE = 16000
+WHISPER_MODEL = "base"
+STT_BACKEND = "whisper"            # "whisper" (PyTorch) or "faster-whisper" (CTranslate2, int8; see stt.py)
+STT_THREADS = None                # CPU threads for transcription; None keeps the backend's default
 TTS_MODEL = "tts_models/en/vctk/vits"
 TTS_SPEAKER = "p236"
-SILENCE_THRESHOLD = 300
-SILENCE_DURATION_S = 1.5
-MAX_RECORDING_SECONDS = 15
+
+# Fixed phrases are synthesized once and served from the phrase cache afterwards
+FIXED_PHRASES = [
+    "Yes, sir?",
+    "Goodbye, sir.",
+    "My apologies, sir. My cognitive circuits are experiencing a malfunction.",
+    "An unknown tool was requested. I am unable to perform that action.",
+]
 
 # --- Action Registry: Map tool names to functions ---
 AVAILABLE_TOOLS = {
     "open_application": actions.open_application,
     "search_files_on_mac": actions.search_files_on_mac,
     "get_calendar_events": actions.get_calendar_events,
+    "get_next_event": actions.get_next_event,
     "get_battery_level": actions.get_battery_level,
+    "get_system_status": actions.get_system_status,
 }
 
-# --- Voice I/O Functions (Unchanged) ---
-def speak(tts_instance, text, speaker_wav=None):
-    print(f"JARVIS: {text}")
-    try:
-        # Clean text for TTS
-        clean_text = text.replace('%', ' percent')
-        tts_instance.tts_to_file(text=clean_text, file_path=RESPONSE_FILENAME, speaker=speaker_wav)
-        os.system(f"afplay {RESPONSE_FILENAME} > /dev/null 2>&1")
-    except Exception as e:
-        print(f"Error during speech synthesis: {e}")
-    finally:
-        if os.path.exists(RESPONSE_FILENAME): os.remove(RESPONSE_FILENAME)
-
-def record_command_vad(p, stream, sample_rate, chunk_size, filename):
-    print("Listening...")
-    if not stream.is_active(): stream.start_stream()
-    frames, is_speaking, silent_chunks = [], False, 0
-    num_silent_chunks_to_stop = int(SILENCE_DURATION_S * (sample_rate / chunk_size))
-    max_chunks = int(MAX_RECORDING_SECONDS * (sample_rate / chunk_size))
-    for _ in range(max_chunks):
-        data = stream.read(chunk_size, exception_on_overflow=False)
-        frames.append(data)
-        if audioop.rms(data, 2) > SILENCE_THRESHOLD:
-            is_speaking, silent_chunks = True, 0
-        elif is_speaking:
-            silent_chunks += 1
-        if is_speaking and silent_chunks > num_silent_chunks_to_stop: break
-    if not is_speaking:
-        stream.stop_stream()
-        return None
-    stream.stop_stream()
-    with wave.open(filename, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(sample_rate)
-        wf.writeframes(b''.join(frames))
-    return filename
-
-def transcribe_command(whisper_model, filename):
-    if filename is None: return ""
-    print("Transcribing...")
-    result = whisper_model.transcribe(filename, fp16=False)
-    if os.path.exists(filename): os.remove(filename)
-    transcription = result['text'].strip()
-    print(f"YOU SAID: '{transcription}'")
-    return transcription
+# Tools run on a worker pool with per-tool deadlines; several calls in one reply run in parallel
+tool_executor = ToolExecutor(AVAILABLE_TOOLS)
+
+# Unambiguous tool commands are matched locally and skip the Gemini round trip
+intent_router = IntentRouter(AVAILABLE_TOOLS, app_catalog=actions.app_catalog)
+
+# Whisper options for commands: English only, bounded retries, a prompt of tool, app and recent words
+command_profile = CommandProfile(AVAILABLE_TOOLS, actions.app_catalog)
+
+def command_decode_options():
+    return command_profile.options() if COMMAND_PROFILE else {}
+
+# One long-lived Gemini client with request deadlines and hedging (see llm_client.py).
+# It's built on first use: importing google.generativeai alone takes a while.
+def load_llm():
+    import google.generativeai as genai
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return LLMClient(GeminiBackend('gemini-1.5-flash'))
+
+llm = Lazy("gemini", load_llm)
+
+# Repeated commands are answered from here instead of asking Gemini again (see response_cache.py)
+response_cache = ResponseCache()
 
 # --- AI Brain with Tool-Using Capability ---
-def get_ai_response(command):
-    """
-    Gets a response from the AI and cleans it for tool use.
-    """
-    print("JARVIS is thinking...")
-    system_prompt = f"""
+AI_ERROR_REPLY = "My apologies, sir. My cognitive circuits are experiencing a malfunction."
+
+def build_system_prompt(command):
+    return f"""
     You are Jarvis, a witty and brilliant AI assistant. Analyze the user's command: "{command}"
 
     You have access to the following tools:
     1. open_application(app_name: str): Opens a specified application.
     2. search_files_on_mac(query: str): Searches for files on the user's Mac.
     3. get_calendar_events(): Retrieves today's events from the calendar.
-    4. get_battery_level(): Checks the current battery level and status.
+    4. get_next_event(): Finds the next upcoming event or meeting on the calendar.
+    5. get_battery_level(): Checks the current battery level and status.
+    6. get_system_status(): Reports how busy the computer's processor and memory are.
 
     - If the command matches a tool's capability, you MUST respond with ONLY a JSON object:
       {{"tool_name": "function_name", "parameters": {{"arg_name": "value"}}}}
     - For tools without arguments (like get_calendar_events or get_battery_level), use empty parameters:
       {{"tool_name": "function_name", "parameters": {{}}}}
+    - If the command needs several tools (e.g. "battery and calendar"), respond with ONLY a JSON array of such objects.
     - If the command is conversational (e.g., a greeting, a random question), respond naturally and in character, without using JSON.
     """
+
+def clean_ai_text(ai_text):
+    """Removes the markdown wrapper Gemini sometimes puts around JSON."""
+    ai_text = ai_text.strip()
+    if ai_text.startswith("```json"):
+        ai_text = ai_text.strip("```json").strip("`").strip()
+    return ai_text
+
+def remember_ai_response(command, ai_text):
+    """Caches a tool-call decision or a conversational reply for this command."""
+    try:
+        tool_call = json.loads(ai_text)
+    except json.JSONDecodeError:
+        response_cache.put(REPLY, command, ai_text)
+        return
+    tool_calls = tool_call if isinstance(tool_call, list) else [tool_call]
+    if all(isinstance(call, dict) and call.get("tool_name") in AVAILABLE_TOOLS for call in tool_calls):
+        response_cache.put(TOOL, command, ai_text)
+
+UNKNOWN_TOOL_REPLY = "An unknown tool was requested. I am unable to perform that action."
+
+def parse_tool_calls(ai_output):
+    """Returns the tool calls in an AI reply as a list of dicts, or None if it's a conversational reply."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(system_prompt)
+        parsed = json.loads(ai_output)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    tool_calls = parsed if isinstance(parsed, list) else [parsed]
+    if not tool_calls or not all(isinstance(call, dict) for call in tool_calls):
+        return None
+    return tool_calls
+
+def execute_tool_calls(tool_calls):
+    """
+    Runs tool calls concurrently.
+
+    Returns:
+        list | None: ToolResults in the order requested, or None if any tool is unknown.
+    """
+    calls = [(call.get("tool_name"), call.get("parameters") or {}) for call in tool_calls]
+    if any(tool_name not in AVAILABLE_TOOLS for tool_name, _ in calls):
+        return None
+    with tracer.stage("tools"):
+        results = tool_executor.run_batch(calls)
+    tracer.annotate(tools=[tool_name for tool_name, _ in calls])
+    for result in results:
+        print(f"Tool {result.tool_name} finished in {result.elapsed_s:.2f}s")
+        tracer.observe(f"tool:{result.tool_name}", result.elapsed_s)
+    return results
+
+def run_tool_calls(tool_calls):
+    """
+    Runs one tool call (a dict) or several (a list) concurrently and returns
+    the text to speak, with the results in the order they were requested.
+    """
+    if isinstance(tool_calls, dict):
+        tool_calls = [tool_calls]
+    results = execute_tool_calls(tool_calls) if tool_calls else None
+    if results is None:
+        return UNKNOWN_TOOL_REPLY
+    return "\n".join(result.result for result in results)
+
+def start_services():
+    """Starts the background helpers the tools answer from (each is optional, see the configuration)."""
+    if USE_FILE_INDEX: actions.file_search.index = FileIndex().start()
+    if USE_CALENDAR_STORE:
+        calendar_source = IcsSource(CALENDAR_ICS_FILE) if CALENDAR_ICS_FILE else AppleScriptSource()
+        actions.calendar_store = CalendarStore(calendar_source).start()
+    if USE_SYSTEM_MONITOR: actions.system_monitor = SystemMonitor().start()
+
+def start_tracing():
+    """Attaches the trace sinks (and the metrics endpoint, if configured) to the shared tracer."""
+    if TRACE_TURNS: tracer.sinks += [JsonlSink(), PrometheusFile()]
+    if METRICS_PORT: MetricsServer(tracer, port=METRICS_PORT).start()
+
+def get_ai_response(command):
+    """
+    Gets a response from the AI and cleans it for tool use.
+    """
+    cached = response_cache.get(TOOL, command) or response_cache.get(REPLY, command)
+    if cached:
+        tracer.annotate(route="cache")
+        return cached
+
+    print("JARVIS is thinking...")
+    tracer.annotate(route="llm")
+    try:
+        with tracer.stage("llm"):
+            response = llm.generate_content(build_system_prompt(command))
         
         # --- THIS IS THE CRITICAL FIX ---
         # Clean the response to remove markdown wrappers.
-        ai_text = response.text.strip()
-        if ai_text.startswith("```json"):
-            ai_text = ai_text.strip("```json").strip("`").strip()
-
+        ai_text = clean_ai_text(response.text)
+        remember_ai_response(command, ai_text)
         return ai_text
 
     except Exception as e:
         print(f"AI Error: {e}")
-        return "My apologies, sir. My cognitive circuits are experiencing a malfunction."
+        return AI_ERROR_REPLY
+
+def stream_ai_response(command, tts_instance, speaker_wav=None):
+    """
+    Streams the AI's response. A conversational reply is spoken sentence by sentence
+    while Gemini is still generating it; a tool call is collected and returned.
+
+    Returns:
+        str | None: The cleaned tool-call JSON, or None if the reply has already been spoken.
+    """
+    cached_tool_call = response_cache.get(TOOL, command)
+    cached_reply = None if cached_tool_call else response_cache.get(REPLY, command)
+    if cached_tool_call or cached_reply: tracer.annotate(route="cache")
+    if cached_tool_call: return cached_tool_call
+    if cached_reply:
+        speak(tts_instance, cached_reply, speaker_wav=speaker_wav)
+        return None
+
+    print("JARVIS is thinking...")
+    tracer.annotate(route="llm")
+    try:
+        start = time.perf_counter()
+        chunks = llm.stream_text(build_system_prompt(command))
+        first = next((chunk for chunk in chunks if chunk.strip()), "")
+        tracer.observe("llm_first_token", time.perf_counter() - start)
+        if first.lstrip().startswith(("{", "[", "`")):
+            ai_text = clean_ai_text(first + "".join(chunks))
+            tracer.observe("llm", time.perf_counter() - start)
+            remember_ai_response(command, ai_text)
+            return ai_text
+        try:
+            spoken = speak_stream(tts_instance, itertools.chain([first], chunks), speaker_wav=speaker_wav)
+        finally:
+            chunks.close() # An interrupted reply stops streaming from Gemini
+        if spoken: response_cache.put(REPLY, command, spoken)
+        return None
+
+    except Exception as e:
+        print(f"AI Error: {e}")
+        return AI_ERROR_REPLY
+
+# --- The Pipeline: standby, wake word, commands, back to standby ---
+
+def load_components(startup):
+    """Starts loading everything the pipeline needs. Only the wake word engine is needed for standby."""
+    startup.load("porcupine", lambda: PorcupineDetector(load_porcupine(PICOVOICE_ACCESS_KEY, WAKE_WORDS)))
+    startup.load("whisper", lambda: load_stt(STT_BACKEND, WHISPER_MODEL, STT_THREADS), warm_up=warm_up_whisper)
+    startup.load("tts", lambda: load_tts(TTS_MODEL, TTS_SPEAKER, FIXED_PHRASES),
+                 warm_up=lambda tts: warm_up_tts(tts, TTS_SPEAKER))
+    startup.track(llm)
+    startup.load("app catalog", actions.app_catalog.build)
+
+def answer_command(command_text, tts):
+    """Thinks about one transcribed command, runs any tools, and speaks the answer."""
+    local_tool_call = intent_router.route(command_text)
+    if local_tool_call:
+        tracer.annotate(route="local")
+        ai_output = json.dumps(local_tool_call)
+    elif STREAM_LLM_REPLIES:
+        ai_output = stream_ai_response(command_text, tts, speaker_wav=TTS_SPEAKER)
+        if ai_output is None: return # The reply was spoken as it streamed in
+    else:
+        ai_output = get_ai_response(command_text)
+
+    # Attempt to parse the AI's output as one or more tool commands
+    tool_calls = parse_tool_calls(ai_output)
+    if tool_calls is not None:
+        speak(tts, run_tool_calls(tool_calls), speaker_wav=TTS_SPEAKER)
+    else:
+        # If it's not JSON, it's a conversational reply
+        speak(tts, ai_output, speaker_wav=TTS_SPEAKER)
+
+def converse(capture, wake_position, frame_length, whisper_model, tts, barge_in=None):
+    """
+    Acknowledges the wake word, then answers commands until the user says goodbye.
+    If the user talks over an answer (barge_in), the next command is recorded from where they started.
+    """
+    with tracer.stage("acknowledge"):
+        command_stream, preroll = acknowledge_wake(capture, wake_position, tts, "Yes, sir?",
+                                                   speaker_wav=TTS_SPEAKER, mode=ACKNOWLEDGEMENT_MODE,
+                                                   preroll_seconds=PREROLL_SECONDS)
+    while True:
+        if tracer.turn is None: tracer.begin_turn() # The first turn started at the wake word
+        decode_options = command_decode_options()
+        transcriber = IncrementalTranscriber(whisper_model, SAMPLE_RATE, **decode_options) if STREAMING_TRANSCRIPTION else None
+        with tracer.stage("record"):
+            command_audio = record_command_vad(command_stream or capture.reader(), SAMPLE_RATE, frame_length,
+                                               debug_filename=COMMAND_FILENAME if SAVE_COMMAND_WAV else None,
+                                               preroll=preroll, transcriber=transcriber)
+        tracer.mark("speech_end")
+        command_stream, preroll = None, b'' # Follow-up commands start at the live edge
+        with tracer.stage("transcribe"):
+            command_text = transcribe_command(whisper_model, command_audio, transcriber, **decode_options)
+
+        if not command_text:
+            tracer.cancel_turn()
+            continue
+        if SHUTDOWN_COMMAND in command_text.lower():
+            speak(tts, "Goodbye, sir.", speaker_wav=TTS_SPEAKER)
+            tracer.end_turn()
+            return
+        answer_command(command_text, tts)
+        command_profile.remember(command_text)
+        if barge_in is not None and barge_in.interrupted.is_set():
+            tracer.annotate(interrupted=barge_in.reason)
+            command_stream = capture.reader_at(barge_in.take())
+        tracer.end_turn()
+
+def run_pipeline(startup, pa, conversations=None):
+    """
+    Runs the assistant until interrupted.
+
+    Args:
+        startup (Startup): Has "porcupine", "whisper" and "tts" loaded or loading
+            (see load_components; a test harness can load stand-ins under the same names).
+        pa: A PyAudio instance, or anything with the same open(), to capture from.
+        conversations (int, optional): Return after this many wake-to-goodbye conversations.
+    """
+    wake_engine = startup.get("porcupine")
+    # One capture stream for the whole session; each stage reads the ring buffer at its own cursor.
+    capture = AudioCapture(pa, wake_engine.sample_rate, wake_engine.frame_length).start()
+    barge_in = None
+    if BARGE_IN:
+        barge_in = BargeInMonitor(capture, wake_engine.frame_length, wake_engine,
+                                  vad=get_vad(SAMPLE_RATE, wake_engine.frame_length))
+        set_barge_in(barge_in)
+    try:
+        for _ in (range(conversations) if conversations is not None else itertools.count()):
+            print(f"\n--- JARVIS is in standby, listening for '{WAKE_WORDS[0]}' ---")
+            standby = StandbyMeter()
+            wake_stream = wait_for_wake_word(capture, wake_engine, standby)
+            tracer.begin_turn()
+            tracer.annotate(**standby.report())
+            # How far behind the live audio the wake word was noticed
+            tracer.observe("wake_detect", (capture.ring.write_pos - wake_stream.position) / capture.sample_rate)
+            llm.prefetch() # Gets the Gemini client ready while the user is still speaking
+            # Whisper and TTS are only waited for here, so standby doesn't wait for them to load.
+            converse(capture, wake_stream.position, wake_engine.frame_length,
+                     startup.get("whisper"), startup.get("tts"), barge_in)
+    finally:
+        set_barge_in(None)
+        capture.close()
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    porcupine, pa, audio_stream = None, None, None
+    porcupine, pa = None, None
+    # Models load in parallel; standby only needs Porcupine, Whisper and TTS are waited for on the wake word.
+    startup = Startup()
     try:
         print("Initializing models...")
-        porcupine = pvporcupine.create(access_key=PICOVOICE_ACCESS_KEY, keywords=WAKE_WORDS)
-        whisper_model = whisper.load_model("base")
-        tts = TTS(model_name=TTS_MODEL, progress_bar=False)
+        load_components(startup)
+        start_services()
+        start_tracing()
+        porcupine = startup.get("porcupine")
         pa = pyaudio.PyAudio()
-        audio_stream = pa.open(rate=porcupine.sample_rate, channels=1, format=pyaudio.paInt16,
-                               input=True, frames_per_buffer=porcupine.frame_length)
-        
-        while True:
-            print(f"\n--- JARVIS is in standby, listening for '{WAKE_WORDS[0]}' ---")
-            audio_stream.start_stream()
-            while True:
-                pcm = audio_stream.read(porcupine.frame_length, exception_on_overflow=False)
-                if porcupine.process(struct.unpack_from("h" * porcupine.frame_length, pcm)) >= 0:
-                    audio_stream.stop_stream()
-                    break
-            
-            speak(tts, "Yes, sir?", speaker_wav=TTS_SPEAKER)
-            
-            while True: 
-                command_path = record_command_vad(pa, audio_stream, SAMPLE_RATE, porcupine.frame_length, COMMAND_FILENAME)
-                command_text = transcribe_command(whisper_model, command_path)
-                
-                if not command_text: continue
-                if SHUTDOWN_COMMAND in command_text.lower():
-                    speak(tts, "Goodbye, sir.", speaker_wav=TTS_SPEAKER)
-                    break
-                
-                ai_output = get_ai_response(command_text)
-                
-                try:
-                    # Attempt to parse the AI's output as a tool command
-                    tool_call = json.loads(ai_output)
-                    tool_name = tool_call.get("tool_name")
-                    parameters = tool_call.get("parameters", {})
-                    
-                    if tool_name in AVAILABLE_TOOLS:
-                        function_to_call = AVAILABLE_TOOLS[tool_name]
-                        action_result = function_to_call(**parameters)
-                        speak(tts, action_result, speaker_wav=TTS_SPEAKER)
-                    else:
-                        speak(tts, "An unknown tool was requested. I am unable to perform that action.", speaker_wav=TTS_SPEAKER)
-
-                except (json.JSONDecodeError, TypeError):
-                    # If it's not JSON, it's a conversational reply
-                    speak(tts, ai_output, speaker_wav=TTS_SPEAKER)
+        startup.report_when_loaded()
+        run_pipeline(startup, pa)
 
     except KeyboardInterrupt:
         print("\nUser initiated shutdown. Goodbye.")
@@ -189,8 +381,10 @@ if __name__ == "__main__":
         print(f"A critical error occurred: {e}")
     finally:
         print("Cleaning up resources...")
-        if audio_stream: audio_stream.close()
+        startup.close()
+        tool_executor.close()
+        response_cache.flush()
+        tracer.report()
         if pa: pa.terminate()
         if porcupine: porcupine.delete()
-        if os.path.exists(COMMAND_FILENAME): os.remove(COMMAND_FILENAME)
-        if os.path.exists(RESPONSE_FILENAME): os.remove(RESPONSE_FILENAME)
\ No newline at end of file
+        close_output()
@@ -0,0 +1,122 @@
+# incremental_stt.py
+
+import threading
+from voice_io import pcm16_to_float32, SAMPLE_WIDTH
+
+_model_locks = {}            # id(model) -> Lock: a model is shared by every transcriber using it
+_model_locks_guard = threading.Lock()
+
+PASS_INTERVAL_S = 1.0    # How often the background worker re-transcribes the growing command
+MIN_NEW_AUDIO_S = 0.5    # Don't start a pass unless at least this much new audio has arrived
+STABLE_MARGIN_S = 1.0    # Segments ending this close to the live edge may still change
+
+def model_lock(whisper_model):
+    """The lock serializing transcriptions on this model (Whisper models aren't thread-safe)."""
+    with _model_locks_guard:
+        return _model_locks.setdefault(id(whisper_model), threading.Lock())
+
+class IncrementalTranscriber:
+    """
+    Transcribes a command while it is still being spoken.
+
+    A background worker periodically transcribes the audio after the last
+    committed point. Leading segments that came out the same in two consecutive
+    passes, and that end well before the live edge, are committed and never
+    decoded again. When the recorder declares end-of-speech, finish() only has to
+    decode the short uncommitted tail. A pass still running at that point
+    commits all but its last segment, so little is left for the tail.
+    """
+
+    def __init__(self, whisper_model, sample_rate=16000, interval_s=PASS_INTERVAL_S, **transcribe_options):
+        self.whisper_model = whisper_model
+        self.sample_rate = sample_rate
+        self.interval_s = interval_s
+        self.prompt = transcribe_options.pop("initial_prompt", None) # Goes before the committed text
+        self.transcribe_options = {"fp16": False, "condition_on_previous_text": False, **transcribe_options}
+        self.pcm = bytearray()
+        self.committed_samples = 0
+        self.committed_text = []
+        self.previous_segments = []
+        self.passes = 0
+        self._lock = threading.Lock()         # Guards pcm and the committed state
+        self._model_lock = model_lock(whisper_model) # One transcription at a time, across transcribers
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def append(self, pcm):
+        """Adds newly recorded int16 PCM. Called from the recording loop."""
+        with self._lock:
+            self.pcm += pcm
+
+    def _uncommitted_audio(self):
+        with self._lock:
+            start = self.committed_samples * SAMPLE_WIDTH
+            return self.committed_samples, pcm16_to_float32(bytes(self.pcm[start:]))
+
+    def _transcribe(self, audio, background=False):
+        prompt = " ".join(([self.prompt] if self.prompt else []) + self.committed_text) or None
+        with self._model_lock:
+            if background and self._stop.is_set():
+                return None # finish() or cancel() came first; a background pass would only delay them
+            return self.whisper_model.transcribe(audio, initial_prompt=prompt, **self.transcribe_options)
+
+    def _run(self):
+        last_pass_samples = 0
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                total = len(self.pcm) // SAMPLE_WIDTH
+            if total - last_pass_samples < MIN_NEW_AUDIO_S * self.sample_rate:
+                continue
+            last_pass_samples = total
+            offset, audio = self._uncommitted_audio()
+            try:
+                result = self._transcribe(audio, background=True)
+            except Exception as e:
+                print(f"Incremental transcription error: {e}")
+                continue
+            if result is None:
+                return
+            self.passes += 1 # Even a pass that overlapped finish() still saves it work
+            self._commit_stable(offset, len(audio), result.get("segments", []))
+
+    def _commit_stable(self, offset, num_samples, segments):
+        """
+        Commits leading segments that agree with the previous pass and are clear of the live edge.
+        Once recording has ended there is no next pass to agree with: all but the last segment
+        (which may be cut off at the edge) are committed.
+        """
+        live_edge_s = num_samples / self.sample_rate
+        texts = [s["text"].strip() for s in segments]
+        stable = 0
+        if self._stop.is_set():
+            stable = max(0, len(segments) - 1)
+        for i, segment in enumerate(segments[stable:], stable):
+            agrees = i < len(self.previous_segments) and self.previous_segments[i] == texts[i]
+            if not agrees or segment["end"] > live_edge_s - STABLE_MARGIN_S:
+                break
+            stable = i + 1
+        with self._lock:
+            if offset != self.committed_samples:
+                return # finish() or another pass moved on; this result is stale
+            if stable:
+                self.committed_text.extend(texts[:stable])
+                self.committed_samples += int(segments[stable - 1]["end"] * self.sample_rate)
+            self.previous_segments = texts[stable:]
+
+    def cancel(self):
+        """Stops the worker without transcribing (e.g. the recorder heard only silence)."""
+        self._stop.set()
+
+    def finish(self):
+        """
+        Stops the worker and decodes whatever has not been committed yet.
+
+        Returns:
+            str: The full transcription.
+        """
+        self._stop.set()
+        self._worker.join()
+        _, audio = self._uncommitted_audio()
+        tail = self._transcribe(audio)["text"].strip() if len(audio) else ""
+        return " ".join(self.committed_text + ([tail] if tail else [])).strip()
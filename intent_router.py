@@ -0,0 +1,274 @@
+# intent_router.py
+
+import re
+import time
+
+CONFIDENCE_THRESHOLD = 0.8 # Below this, the command goes to Gemini instead
+AMBIGUITY_MARGIN = 0.2     # If two tools score this close, it's ambiguous: ask Gemini
+KEYWORD_MAX_SCORE = 0.7    # Keywords alone never reach the threshold; they only flag ambiguity
+APP_MATCH_SCORE = 0.8      # "open X" is routed locally only if X is this close to an installed app
+
+# Politeness and wake-word padding that never changes the intent
+_PREFIX_RE = re.compile(r"^(?:(?:hey |ok |okay )?jarvis |please |can you |could you |would you |will you |"
+                        r"i want to |i'd like to |i need to |go ahead and |tell me |quickly )+")
+_SUFFIX_RE = re.compile(r"(?: please| for me| right now| now| sir| jarvis| thanks| thank you)+$")
+_PUNCT_RE = re.compile(r"[^\w\s'%]")
+# Hesitations Whisper transcribes verbatim
+FILLER_WORDS = frozenset({"um", "umm", "uh", "uhh", "er", "erm", "ah", "hmm", "mm", "actually", "basically"})
+
+# --- Intent definitions, one per tool name ---
+# patterns: regexes that must match the whole normalized command (confidence 1.0).
+#           Named groups become the tool's parameters.
+# keywords: groups of tool-specific alternatives; the share of groups hit gives a softer score
+#           (at most KEYWORD_MAX_SCORE), which can only make a pattern match ambiguous.
+INTENT_PATTERNS = {
+    "get_battery_level": {
+        "patterns": [
+            r"(?:what(?:'s| is) )?(?:my |the )?(?:current )?battery(?: level| status| percentage| charge| life)?(?: at)?",
+            r"how much (?:battery|charge)(?: do i have| is)?(?: left| remaining)?",
+            r"(?:check|show)(?: me)? (?:my |the )?battery(?: level| status)?",
+            r"am i (?:charging|plugged in)",
+            r"how(?:'s| is) (?:my |the )?battery(?: looking| doing)?",
+            r"is (?:my |the )?(?:battery|charge)(?: level)? (?:okay|ok|good|low)",
+        ],
+        "keywords": [("battery", "charging", "charger"), ("level", "percent", "percentage", "plugged")],
+    },
+    "get_system_status": {
+        "patterns": [
+            r"(?:what(?:'s| is) )?(?:my |the )?(?:cpu|processor|memory|ram|system)(?: usage| load| status)",
+            r"how (?:busy|loaded) is (?:my |the )?(?:computer|mac|laptop|system|cpu|processor)",
+            r"how much (?:memory|ram) (?:am i using|is (?:being )?used|is free)",
+        ],
+        "keywords": [("cpu", "processor", "ram"), ("usage", "load")],
+    },
+    "get_current_time": {
+        "patterns": [
+            r"what(?:'s| is) the (?:current )?time",
+            r"what time is it",
+            r"(?:the )?(?:current )?time",
+            r"do you have the time",
+        ],
+        "keywords": [("o'clock", "clock")],
+    },
+    "get_calendar_events": {
+        "patterns": [
+            r"what(?:'s| is) (?:on )?my (?:calendar|schedule|agenda)(?: for)?(?: today)?(?: look like)?",
+            r"what(?: are| do i have)(?: on)? (?:my )?(?:events|meetings|appointments)(?: for)?(?: today)?",
+            r"(?:do i have )?any (?:events|meetings|appointments)(?: today)?",
+            r"(?:check|show)(?: me)? my (?:calendar|schedule|agenda|events|meetings)(?: for)?(?: today)?",
+            r"what do i have (?:on )?today",
+        ],
+        "keywords": [("calendar", "schedule", "agenda"), ("meetings", "appointments")],
+    },
+    "get_next_event": {
+        "patterns": [
+            r"(?:what(?:'s| is) |when(?:'s| is) )?my next (?:meeting|event|appointment|call)",
+            r"what(?:'s| is) (?:coming )?(?:up )?next on my (?:calendar|schedule|agenda)",
+            r"what do i have (?:coming up )?next",
+        ],
+        "keywords": [("meeting", "appointment"), ("next", "upcoming")],
+    },
+    "search_files_on_mac": {
+        "patterns": [
+            r"(?:search|look)(?: my (?:computer|mac|laptop|files|disk))? for (?:a |the |my )?(?:files?|documents?) (?:called |named |about |for )?(?P<query>.+)",
+            r"(?:search|look through) my (?:computer|mac|laptop|disk|files) for (?P<query>.+)",
+            r"find (?:a |the |my )?(?:files?|documents?) (?:called |named |about |for )?(?P<query>.+)",
+            r"where is (?:the |my )?(?:files?|documents?) (?:called |named )?(?P<query>.+)",
+        ],
+        "keywords": [],
+    },
+    "open_application": {
+        "patterns": [
+            r"(?:open|launch|start|fire up|bring up|switch to)(?: up)? (?:the )?(?:app |application )?(?P<app_name>.+?)(?: app| application)?",
+        ],
+        "keywords": [],
+    },
+}
+
+def normalize_command(text):
+    """Lowercases a transcription and strips punctuation, filler words and politeness padding."""
+    text = _PUNCT_RE.sub(" ", text.lower().replace("’", "'"))
+    text = " ".join(word for word in text.split() if word not in FILLER_WORDS)
+    text = _PREFIX_RE.sub("", text)
+    return _SUFFIX_RE.sub("", text).strip()
+
+class IntentRouter:
+    """
+    Resolves unambiguous tool commands locally, before Gemini is asked.
+
+    Only tools present in the given registry get routes, so each entry script
+    builds its router from its own AVAILABLE_TOOLS / available_tools. Only a
+    full pattern match is dispatched locally; "open X" also needs X to be an
+    installed app in `app_catalog` (without one, it is left to Gemini).
+    """
+
+    def __init__(self, tools, intents=INTENT_PATTERNS, threshold=CONFIDENCE_THRESHOLD, app_catalog=None):
+        self.threshold = threshold
+        self.app_catalog = app_catalog
+        self.routes = []
+        for tool_name in tools:
+            intent = intents.get(tool_name)
+            if intent is None:
+                continue
+            patterns = [re.compile(p) for p in intent["patterns"]]
+            keywords = [frozenset(group) for group in intent["keywords"]]
+            self.routes.append((tool_name, patterns, keywords))
+
+    def classify(self, text):
+        """
+        Scores a command against every known tool.
+
+        Returns:
+            tuple: (tool_name, parameters, confidence) for the best match, or (None, {}, 0.0).
+        """
+        command = normalize_command(text)
+        words = set(command.split())
+        scores = []
+        for tool_name, patterns, keywords in self.routes:
+            for pattern in patterns:
+                match = pattern.fullmatch(command)
+                if match:
+                    params = {k: v.strip() for k, v in match.groupdict().items() if v}
+                    if self._plausible(tool_name, params):
+                        scores.append((1.0, tool_name, params))
+                        break
+            else:
+                if keywords:
+                    hits = sum(1 for group in keywords if words & group)
+                    scores.append((KEYWORD_MAX_SCORE * hits / len(keywords), tool_name, {}))
+        if not scores:
+            return None, {}, 0.0
+        scores.sort(key=lambda s: s[0], reverse=True)
+        confidence, tool_name, params = scores[0]
+        # A keyword score can't overrule a full pattern match, only another pattern can
+        if len(scores) > 1 and scores[1][0] > confidence - AMBIGUITY_MARGIN and (confidence < 1.0 or scores[1][0] == 1.0):
+            confidence = min(confidence, 0.5) # Two tools fit: let the LLM decide
+        return tool_name, params, confidence
+
+    def _plausible(self, tool_name, params):
+        """Checks a pattern's parameters: "start over" names no app, so it isn't open_application."""
+        if tool_name == "open_application":
+            if self.app_catalog is None:
+                return False
+            _, score = self.app_catalog.match(params.get("app_name", ""))
+            return score >= APP_MATCH_SCORE
+        return True
+
+    def route(self, text):
+        """
+        Returns a tool call in the same shape get_ai_response produces
+        ({"tool_name": ..., "parameters": {...}}), or None if the command should go to Gemini.
+        """
+        tool_name, params, confidence = self.classify(text)
+        if tool_name is None or confidence < self.threshold:
+            return None
+        return {"tool_name": tool_name, "parameters": params}
+
+# --- Labelled utterances, self-check and benchmark (python3 intent_router.py; fails on a misroute) ---
+
+# (utterance as Whisper tends to produce it, expected tool or None for "send to Gemini", expected params)
+LABELLED_UTTERANCES = [
+    ("What's my battery level?", "get_battery_level", {}),
+    ("Jarvis, what is the battery status.", "get_battery_level", {}),
+    ("How much battery do I have left?", "get_battery_level", {}),
+    ("Battery.", "get_battery_level", {}),
+    ("Check my battery please.", "get_battery_level", {}),
+    ("Am I charging?", "get_battery_level", {}),
+    ("How's the battery looking?", "get_battery_level", {}),
+    ("Is the charge level okay?", "get_battery_level", {}),
+    ("What's the CPU usage?", "get_system_status", {}),
+    ("How busy is my computer?", "get_system_status", {}),
+    ("How much memory am I using?", "get_system_status", {}),
+    ("What time is it?", "get_current_time", {}),
+    ("What's the time, Jarvis?", "get_current_time", {}),
+    ("Tell me the current time.", "get_current_time", {}),
+    ("What's on my calendar today?", "get_calendar_events", {}),
+    ("What are my events for today?", "get_calendar_events", {}),
+    ("Do I have any meetings today?", "get_calendar_events", {}),
+    ("Show me my schedule.", "get_calendar_events", {}),
+    ("What's my next meeting?", "get_next_event", {}),
+    ("When is my next appointment?", "get_next_event", {}),
+    ("What's next on my calendar?", "get_next_event", {}),
+    ("Open Spotify.", "open_application", {"app_name": "spotify"}),
+    ("Open Spotify for me.", "open_application", {"app_name": "spotify"}),
+    ("Could you launch Google Chrome?", "open_application", {"app_name": "google chrome"}),
+    ("Please open the Calculator app.", "open_application", {"app_name": "calculator"}),
+    ("Switch to Visual Studio Code.", "open_application", {"app_name": "visual studio code"}),
+    ("Search my computer for a file called project proposal.", "search_files_on_mac", {"query": "project proposal"}),
+    ("Find the document named quarterly report.", "search_files_on_mac", {"query": "quarterly report"}),
+    ("Look for files about taxes.", "search_files_on_mac", {"query": "taxes"}),
+    ("Search my Mac for invoice.", "search_files_on_mac", {"query": "invoice"}),
+    ("What is the theory of relativity?", None, {}),
+    ("Hello Jarvis, how are you today?", None, {}),
+    ("Tell me a joke.", None, {}),
+    ("Why is my battery draining so fast on long flights?", None, {}),
+    ("What's the best time to visit Japan?", None, {}),
+    ("Can you explain how calendars were invented?", None, {}),
+    ("Goodbye.", None, {}),
+    ("Write me a short poem about time.", None, {}),
+    # Hard negatives: tool words and command verbs in questions that aren't tool commands
+    ("What is the time complexity of quicksort?", None, {}),
+    ("What is the current time in London?", None, {}),
+    ("What events are happening in Paris this weekend?", None, {}),
+    ("How much battery does an iPhone have?", None, {}),
+    ("Start over.", None, {}),
+    ("Start a timer for five minutes.", None, {}),
+    ("Switch to dark mode.", None, {}),
+    ("Open the pod bay doors.", None, {}),
+    ("Look for a good restaurant nearby.", None, {}),
+    ("Search for the meaning of life.", None, {}),
+    ("Search for invoice.", None, {}),
+    ("What's the memory of a goldfish?", None, {}),
+    ("Is it time to leave for the meeting in London?", None, {}),
+    ("How long does a laptop battery last?", None, {}),
+    ("Find me a recipe for pancakes.", None, {}),
+]
+
+# Installed apps the benchmark resolves "open X" against
+BENCHMARK_APPS = ["Spotify", "Google Chrome", "Calculator", "Visual Studio Code", "Safari", "Notes", "Overcast"]
+
+if __name__ == "__main__":
+    from app_catalog import AppCatalog, App
+    catalog = AppCatalog(dirs=[]).build([App(name, name) for name in BENCHMARK_APPS])
+    all_tools = list(INTENT_PATTERNS)
+    print(f"{len(LABELLED_UTTERANCES)} labelled utterances, tools: {', '.join(all_tools)}\n")
+    print(f"{'threshold':>9} {'hit rate':>9} {'precision':>10} {'false routes':>13} {'us/command':>11}")
+    tool_utterances = sum(1 for _, tool, _ in LABELLED_UTTERANCES if tool)
+    for threshold in (0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+        router = IntentRouter(all_tools, threshold=threshold, app_catalog=catalog)
+        hits = wrong = 0
+        for text, tool, params in LABELLED_UTTERANCES:
+            call = router.route(text)
+            if call is None:
+                continue
+            if call["tool_name"] == tool and call["parameters"] == params:
+                hits += 1
+            else:
+                wrong += 1
+        repeats = 200
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            for text, _, _ in LABELLED_UTTERANCES:
+                router.route(text)
+        per_command = (time.perf_counter() - t0) / (repeats * len(LABELLED_UTTERANCES)) * 1e6
+        routed = hits + wrong
+        precision = hits / routed if routed else 1.0
+        print(f"{threshold:>9.1f} {hits / tool_utterances:>9.0%} {precision:>10.0%} {wrong:>13} {per_command:>11.1f}")
+
+    router = IntentRouter(all_tools, app_catalog=catalog)
+    misses = [(t, router.classify(t)) for t, tool, p in LABELLED_UTTERANCES if (router.route(t) or {}).get("tool_name") != tool]
+    if misses:
+        print(f"\nMisrouted or missed at threshold {CONFIDENCE_THRESHOLD}:")
+        for text, (tool_name, params, confidence) in misses:
+            print(f"  {text!r:60} -> {tool_name} {params} ({confidence:.2f})")
+
+    # At the configured threshold: no question goes to a tool, and every tool command is routed with its parameters
+    for text, tool, params in LABELLED_UTTERANCES:
+        call = router.route(text)
+        if tool is None:
+            assert call is None, f"{text!r} should go to Gemini, was routed to {call}"
+        else:
+            assert call == {"tool_name": tool, "parameters": params}, f"{text!r} should route to {tool} {params}, got {call}"
+    assert router.route("Open Spotify.") is not None and IntentRouter(all_tools).route("Open Spotify.") is None, \
+        "open_application must only be routed against an app catalog"
+    print(f"\nSelf-check passed: {len(LABELLED_UTTERANCES)} utterances routed as labelled at {CONFIDENCE_THRESHOLD}")
@@ -0,0 +1,226 @@
+# jarvis_daemon.py
+#
+# Keeps Whisper, TTS and the Gemini client warm in one long-lived process and
+# serves them over HTTP on a Unix socket, so scripts, hotkeys and other
+# front-ends don't reload models for every request. The socket is only
+# accessible to the user running the daemon (mode 0600); unlike a TCP port,
+# web pages open in a browser can't reach it.
+#
+#   python3 jarvis_daemon.py
+#   curl -s --unix-socket .jarvis_cache/jarvis.sock localhost/command -d '{"text": "what is my battery level"}'
+#   curl -s --unix-socket .jarvis_cache/jarvis.sock localhost/audio --data-binary @command.wav
+#   curl -s --unix-socket .jarvis_cache/jarvis.sock localhost/tts -d '{"text": "Hello, sir."}' -o hello.wav
+#
+# Endpoints (all POST bodies are JSON unless noted):
+#   GET  /health   -> {"status", "components"}
+#   GET  /metrics  -> per-stage latency histograms, Prometheus text format
+#   POST /command  {"text", "speak"?}   -> {"transcript", "reply", "tool_calls", "audio_wav_base64"?}
+#   POST /audio    WAV file, or raw 16 kHz mono int16 PCM; add ?speak=1 for audio back
+#                  -> same as /command, with "transcript" from Whisper
+#   POST /tts      {"text"}             -> audio/wav
+
+import io
+import os
+import json
+import time
+import wave
+import base64
+import socket
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+import numpy as np
+
+import final
+from tracing import tracer
+from startup import Startup, load_stt, warm_up_whisper, load_tts, warm_up_tts
+from voice_io import split_sentences, clean_text_for_tts, get_tts_sample_rate, synthesize, decode_audio
+
+DAEMON_SOCKET = os.path.join(".jarvis_cache", "jarvis.sock") # The API runs tools on this machine, so no TCP port
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+def encode_wav(audio, sample_rate):
+    """float32 samples to a 16-bit mono WAV file in memory."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+class JarvisEngine:
+    """
+    The warm models plus final.py's command pipeline (local routing, cache,
+    Gemini, tools). Whisper, TTS and the command pipeline each have a lock:
+    the models aren't thread-safe, and the pipeline shares final.py's module
+    state and the tracer's current turn. So a transcription, a synthesis and
+    a command can overlap, but two of the same kind run one after the other.
+    """
+
+    def __init__(self, startup):
+        self.startup = startup
+        self._whisper_lock = threading.Lock()
+        self._tts_lock = threading.Lock()
+        self._command_lock = threading.Lock()
+
+    def transcribe(self, audio):
+        whisper_model = self.startup.get("whisper")
+        with self._whisper_lock, tracer.stage("transcribe"):
+            return whisper_model.transcribe(audio, fp16=False, **final.command_decode_options())["text"].strip()
+
+    def synthesize(self, text):
+        """Returns a WAV file of the text, synthesized sentence by sentence (cached phrases are free)."""
+        tts = self.startup.get("tts")
+        with self._tts_lock:
+            parts = [synthesize(tts, sentence, final.TTS_SPEAKER)
+                     for sentence in split_sentences(clean_text_for_tts(text))]
+            sample_rate = get_tts_sample_rate(tts)
+        audio = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return encode_wav(audio, sample_rate)
+
+    def command(self, text):
+        """
+        Answers a text command.
+
+        Returns:
+            dict: {"transcript", "reply", "tool_calls": [{"tool_name", "parameters", "result", "ok"}]}
+        """
+        with self._command_lock:
+            return self._command(text)
+
+    def _command(self, text):
+        local_tool_call = final.intent_router.route(text)
+        ai_output = json.dumps(local_tool_call) if local_tool_call else final.get_ai_response(text)
+        final.command_profile.remember(text)
+        tool_calls = final.parse_tool_calls(ai_output)
+        if tool_calls is None:
+            return {"transcript": text, "reply": ai_output, "tool_calls": []}
+        results = final.execute_tool_calls(tool_calls)
+        if results is None:
+            return {"transcript": text, "reply": final.UNKNOWN_TOOL_REPLY, "tool_calls": []}
+        return {
+            "transcript": text,
+            "reply": "\n".join(result.result for result in results),
+            "tool_calls": [{"tool_name": r.tool_name, "parameters": r.parameters, "result": r.result, "ok": r.ok}
+                           for r in results],
+        }
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """An HTTP server on a Unix socket only its owner can connect to."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        path = self.server_address
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                os.remove(path) # Left behind by a daemon that didn't shut down cleanly
+            else:
+                raise OSError(f"Another daemon is already listening on {path}")
+            finally:
+                probe.close()
+        super().server_bind()
+        os.chmod(path, 0o600) # Before listen(), so nobody else can ever connect
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    engine = None # Set by serve()
+
+    def log_message(self, format, *args):
+        pass # The daemon prints its own one-line summaries
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            return self._send(200, tracer.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+        if path != "/health":
+            return self._send(404, {"error": "not found"})
+        components = {name: ("ready" if future.done() and not future.exception() else
+                             "failed" if future.done() else "loading")
+                      for name, future in self.engine.startup.futures.items()}
+        self._send(200, {"status": "ok", "components": components})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        try:
+            body = self._body()
+            if url.path == "/audio":
+                speak = parse_qs(url.query).get("speak", ["0"])[0] in ("1", "true")
+                text = self.engine.transcribe(decode_audio(body))
+            elif url.path in ("/command", "/tts"):
+                request = json.loads(body or b"{}")
+                text, speak = str(request.get("text", "")).strip(), bool(request.get("speak"))
+            else:
+                return self._send(404, {"error": "not found"})
+
+            if url.path == "/tts":
+                if not text:
+                    return self._send(400, {"error": "missing 'text'"})
+                self._send(200, self.engine.synthesize(text), "audio/wav")
+            else:
+                response = self.engine.command(text) if text else {"transcript": "", "reply": "", "tool_calls": []}
+                if speak and response["reply"]:
+                    response["audio_wav_base64"] = base64.b64encode(self.engine.synthesize(response["reply"])).decode("ascii")
+                self._send(200, response)
+        except (ValueError, wave.Error) as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            print(f"Daemon error on {url.path}: {e}")
+            self._send(500, {"error": str(e)})
+        print(f"{url.path} handled in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def serve(path=DAEMON_SOCKET):
+    server = UnixHTTPServer(path, DaemonHandler) # First, so a second daemon fails before loading any model
+    startup = Startup()
+    startup.load("whisper", lambda: load_stt(final.STT_BACKEND, final.WHISPER_MODEL, final.STT_THREADS), warm_up=warm_up_whisper)
+    startup.load("tts", lambda: load_tts(final.TTS_MODEL, final.TTS_SPEAKER, final.FIXED_PHRASES),
+                 warm_up=lambda tts: warm_up_tts(tts, final.TTS_SPEAKER))
+    startup.load("app catalog", final.actions.app_catalog.build)
+    startup.track(final.llm)
+    final.start_services()
+    startup.report_when_loaded()
+
+    DaemonHandler.engine = JarvisEngine(startup)
+    print(f"JARVIS daemon listening on {path} (models are loading in the background)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down the daemon.")
+    finally:
+        server.server_close()
+        startup.close()
+        final.tool_executor.close()
+        final.response_cache.flush()
+
+if __name__ == "__main__":
+    serve()
@@ -1,15 +1,14 @@
-import pvporcupine
 import pyaudio
-import struct
-import whisper
-from TTS.api import TTS
 import os
-import wave
 import time
 import numpy as np
-import audioop
 from dotenv import load_dotenv
-import google.generativeai as genai # <-- NEW: Import Google AI
+from audio_capture import AudioCapture
+from incremental_stt import IncrementalTranscriber
+from llm_client import LLMClient, GeminiBackend
+from wake_word import PorcupineDetector, wait_for_wake_word
+from startup import Startup, Lazy, load_porcupine, load_whisper, warm_up_whisper, load_tts, warm_up_tts
+from voice_io import record_command_vad, transcribe_command, speak, close_output, acknowledge_wake
 
 # --- Load Environment Variables ---
 load_dotenv()
@@ -18,110 +17,44 @@ load_dotenv()
 PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") # <-- NEW: Load Google API Key
 
-# --- NEW: Configure the Google AI client ---
-try:
-    genai.configure(api_key=GOOGLE_API_KEY)
-except Exception as e:
-    print(f"Error configuring Google AI: {e}")
-    print("Please ensure your GOOGLE_API_KEY is correct in the .env file.")
-    exit()
-
 WAKE_WORDS = ["jarvis"]
 SHUTDOWN_COMMAND = "goodbye"
-COMMAND_FILENAME = "command.wav"
-RESPONSE_FILENAME = "response.wav"
+COMMAND_FILENAME = "command.wav" # Only written when SAVE_COMMAND_WAV is on
+SAVE_COMMAND_WAV = False          # Debug: keep a copy of the last command on disk
+ACKNOWLEDGEMENT_MODE = "speak"    # "speak", "overlap" or "skip" (see voice_io.py)
+PREROLL_SECONDS = 2.0             # Audio after the wake word kept for the command
+STREAMING_TRANSCRIPTION = True    # Transcribe while the user is still speaking
 SAMPLE_RATE = 16000
 
 # Use a high-quality voice model (ensure you have run `brew install espeak`)
 TTS_MODEL = "tts_models/en/vctk/vits"
 TTS_SPEAKER = "p236" # A good male voice from the VCTK dataset
 
-# Voice Activity Detection (VAD) configuration
-SILENCE_THRESHOLD = 300
-SILENCE_DURATION_S = 1.5
-MAX_RECORDING_SECONDS = 15
-
-# --- Voice I/O Functions ---
-
-def speak(tts_instance, text, speaker_wav=None):
-    """Generates and plays speech using the specified TTS model and speaker."""
-    print(f"JARVIS: {text}")
-    try:
-        # Use the speaker argument if the model supports it (like VCTK)
-        tts_instance.tts_to_file(text=text, file_path=RESPONSE_FILENAME, speaker=speaker_wav)
-        os.system(f"afplay {RESPONSE_FILENAME} > /dev/null 2>&1")
-    except Exception as e:
-        print(f"Error during speech synthesis: {e}")
-    finally:
-        if os.path.exists(RESPONSE_FILENAME):
-            os.remove(RESPONSE_FILENAME)
-
-def record_command_vad(p, stream, sample_rate, chunk_size, filename):
-    """Records audio dynamically, stopping after a period of silence."""
-    print("Listening...")
-    if not stream.is_active():
-        stream.start_stream()
+# Fixed phrases are synthesized once and served from the phrase cache afterwards
+FIXED_PHRASES = [
+    "Yes, sir?",
+    "Goodbye, sir. Returning to standby.",
+    "My apologies, sir. I seem to be having trouble connecting to my cognitive servers.",
+]
 
-    frames = []
-    is_speaking = False
-    silent_chunks = 0
-    num_silent_chunks_to_stop = int(SILENCE_DURATION_S * (sample_rate / chunk_size))
-    max_chunks = int(MAX_RECORDING_SECONDS * (sample_rate / chunk_size))
-
-    for _ in range(max_chunks):
-        data = stream.read(chunk_size, exception_on_overflow=False)
-        frames.append(data)
-        rms = audioop.rms(data, 2)
-
-        if rms > SILENCE_THRESHOLD:
-            is_speaking = True
-            silent_chunks = 0
-        elif is_speaking:
-            silent_chunks += 1
-        
-        if is_speaking and silent_chunks > num_silent_chunks_to_stop:
-            print("...end of speech detected.")
-            break
-    
-    if not is_speaking:
-        print("...silence detected.")
-        stream.stop_stream()
-        return None
-
-    print("...recording complete.")
-    stream.stop_stream()
-
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(sample_rate)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-    return filename
+# --- NEW: AI Brain Function ---
 
-def transcribe_command(whisper_model, filename):
-    """Transcribes the recorded audio file."""
-    if filename is None:
-        return ""
-    print("Transcribing...")
-    result = whisper_model.transcribe(filename, fp16=False)
-    if os.path.exists(filename):
-        os.remove(filename)
-    transcription = result['text'].strip()
-    print(f"YOU SAID: '{transcription}'")
-    return transcription
+# One long-lived Gemini client with request deadlines and hedging (see llm_client.py),
+# configured and built on first use so the heavy google.generativeai import stays off startup.
+def load_llm():
+    import google.generativeai as genai
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return LLMClient(GeminiBackend('gemini-2.0-flash-exp'))
 
-# --- NEW: AI Brain Function ---
+llm = Lazy("gemini", load_llm)
 
 def get_ai_response(command):
     """Sends the user's command to the Gemini AI and gets an intelligent response."""
     try:
         print("JARVIS is thinking...")
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
         # This prompt defines JARVIS's personality.
         prompt = f"You are Jarvis, a witty, brilliant, and slightly sarcastic AI assistant, inspired by the one from the movies. A user has said this to you: '{command}'. Formulate a concise and in-character response."
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return llm.generate_text(prompt)
     except Exception as e:
         print(f"AI Error: {e}")
         return "My apologies, sir. I seem to be having trouble connecting to my cognitive servers."
@@ -131,23 +64,23 @@ def get_ai_response(command):
 if __name__ == "__main__":
     porcupine = None
     pa = None
-    audio_stream = None
+    capture = None
+    startup = Startup()
 
     try:
-        # --- Initialize Models ---
+        # --- Initialize Models (in parallel; Whisper and TTS are only waited for on the wake word) ---
         print("Initializing models... (This might take a moment)")
-        porcupine = pvporcupine.create(access_key=PICOVOICE_ACCESS_KEY, keywords=WAKE_WORDS)
-        whisper_model = whisper.load_model("base")
-        tts = TTS(model_name=TTS_MODEL, progress_bar=False)
+        startup.load("porcupine", lambda: PorcupineDetector(load_porcupine(PICOVOICE_ACCESS_KEY, WAKE_WORDS)))
+        startup.load("whisper", lambda: load_whisper("base"), warm_up=warm_up_whisper)
+        startup.load("tts", lambda: load_tts(TTS_MODEL, TTS_SPEAKER, FIXED_PHRASES),
+                     warm_up=lambda tts: warm_up_tts(tts, TTS_SPEAKER))
+        startup.track(llm)
+        porcupine = startup.get("porcupine")
         pa = pyaudio.PyAudio()
 
-        audio_stream = pa.open(
-            rate=porcupine.sample_rate,
-            channels=1,
-            format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=porcupine.frame_length
-        )
+        # One capture stream for the whole session; each stage reads the ring buffer at its own cursor.
+        capture = AudioCapture(pa, porcupine.sample_rate, porcupine.frame_length).start()
+        startup.report_when_loaded()
         
         # --- Main Loop ---
         while True:
@@ -155,21 +88,23 @@ if __name__ == "__main__":
             print(f"JARVIS is in standby, listening for '{WAKE_WORDS[0]}'")
             print("--------------------------------------------------")
             
-            audio_stream.start_stream()
-            while True:
-                pcm = audio_stream.read(porcupine.frame_length, exception_on_overflow=False)
-                pcm = struct.unpack_from("h" * porcupine.frame_length, pcm)
-                if porcupine.process(pcm) >= 0:
-                    print(f"Wake word '{WAKE_WORDS[0]}' detected!")
-                    audio_stream.stop_stream()
-                    break
+            wake_stream = wait_for_wake_word(capture, porcupine)
+            print(f"Wake word '{WAKE_WORDS[0]}' detected!")
             
-            speak(tts, "Yes, sir?", speaker_wav=TTS_SPEAKER)
+            llm.prefetch() # Gets the Gemini client ready while the user is still speaking
+            whisper_model, tts = startup.get("whisper"), startup.get("tts")
+            command_stream, preroll = acknowledge_wake(capture, wake_stream.position, tts, "Yes, sir?",
+                                                       speaker_wav=TTS_SPEAKER, mode=ACKNOWLEDGEMENT_MODE,
+                                                       preroll_seconds=PREROLL_SECONDS)
             
             # --- Conversation Loop ---
             while True: 
-                command_path = record_command_vad(pa, audio_stream, SAMPLE_RATE, porcupine.frame_length, COMMAND_FILENAME)
-                command_text = transcribe_command(whisper_model, command_path)
+                transcriber = IncrementalTranscriber(whisper_model, SAMPLE_RATE) if STREAMING_TRANSCRIPTION else None
+                command_audio = record_command_vad(command_stream or capture.reader(), SAMPLE_RATE, porcupine.frame_length,
+                                                   debug_filename=COMMAND_FILENAME if SAVE_COMMAND_WAV else None,
+                                                   preroll=preroll, transcriber=transcriber)
+                command_stream, preroll = None, b'' # Follow-up commands start at the live edge
+                command_text = transcribe_command(whisper_model, command_audio, transcriber)
 
                 if not command_text:
                     continue # If silence, listen again immediately
@@ -189,8 +124,8 @@ if __name__ == "__main__":
         print(f"A critical error occurred: {e}")
     finally:
         print("Cleaning up resources.")
-        if audio_stream is not None: audio_stream.close()
+        startup.close()
+        if capture is not None: capture.close()
         if pa is not None: pa.terminate()
         if porcupine is not None: porcupine.delete()
-        if os.path.exists(COMMAND_FILENAME): os.remove(COMMAND_FILENAME)
-        if os.path.exists(RESPONSE_FILENAME): os.remove(RESPONSE_FILENAME)
\ No newline at end of file
+        close_output()
\ No newline at end of file
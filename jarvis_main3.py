@@ -1,17 +1,22 @@
-import pvporcupine
 import pyaudio
-import struct
-import whisper
-from TTS.api import TTS
 import os
-import wave
 import time
 import numpy as np
-import audioop
 from dotenv import load_dotenv
-import google.generativeai as genai
 import datetime   # <-- ADDED for getting time
 import subprocess # <-- ADDED for opening apps
+import itertools
+from collections.abc import Iterable, Mapping
+from audio_capture import AudioCapture
+from incremental_stt import IncrementalTranscriber
+from intent_router import IntentRouter
+from llm_client import LLMClient, GeminiBackend, iter_text
+from response_cache import ResponseCache, TOOL, REPLY
+from tool_executor import ToolExecutor
+from app_catalog import AppCatalog, launch_command
+from wake_word import PorcupineDetector, wait_for_wake_word
+from startup import Startup, load_porcupine, load_whisper, warm_up_whisper, load_tts, warm_up_tts
+from voice_io import record_command_vad, transcribe_command, speak, speak_stream, close_output, acknowledge_wake
 
 # --- Load Environment Variables ---
 load_dotenv()
@@ -20,22 +25,24 @@ load_dotenv()
 PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-try:
-    genai.configure(api_key=GOOGLE_API_KEY)
-except Exception as e:
-    print(f"Error configuring Google AI: {e}\nPlease ensure your GOOGLE_API_KEY is correct.")
-    exit()
-
 WAKE_WORDS = ["jarvis"]
 SHUTDOWN_COMMAND = "goodbye"
-COMMAND_FILENAME = "command.wav"
-RESPONSE_FILENAME = "response.wav"
+COMMAND_FILENAME = "command.wav" # Only written when SAVE_COMMAND_WAV is on
+SAVE_COMMAND_WAV = False          # Debug: keep a copy of the last command on disk
+ACKNOWLEDGEMENT_MODE = "speak"    # "speak", "overlap" or "skip" (see voice_io.py)
+PREROLL_SECONDS = 2.0             # Audio after the wake word kept for the command
+STREAMING_TRANSCRIPTION = True    # Transcribe while the user is still speaking
+STREAM_LLM_REPLIES = True         # Speak replies while Gemini is still generating
 SAMPLE_RATE = 16000
 TTS_MODEL = "tts_models/en/vctk/vits"
 TTS_SPEAKER = "p236"
-SILENCE_THRESHOLD = 300
-SILENCE_DURATION_S = 1.5
-MAX_RECORDING_SECONDS = 15
+
+# Fixed phrases are synthesized once and served from the phrase cache afterwards
+FIXED_PHRASES = [
+    "Yes, sir?",
+    "Goodbye, sir. Returning to standby.",
+    "My apologies, sir. I've encountered a cognitive dissonance.",
+]
 
 # --- NEW: Define Python Functions as "Tools" ---
 
@@ -45,46 +52,66 @@ def get_current_time():
     now = datetime.datetime.now()
     return now.strftime("%I:%M %p") # Example: 04:30 PM
 
+# Installed apps, for resolving spoken names before calling `open -a` (see app_catalog.py)
+app_catalog = AppCatalog()
+
 def open_application(app_name: str):
-    """Opens a specified application on the Mac."""
+    """Opens a specified application (`open -a` on the Mac, gtk-launch on Linux)."""
     print(f"TOOL: Opening application '{app_name}'.")
+    app = app_catalog.resolve(app_name)
+    target = app.target if app else app_name.strip().rstrip(".")
+    display_name = app.name if app else target
     try:
         # Use subprocess for better control and security
-        subprocess.run(["open", "-a", app_name], check=True)
-        return f"Successfully opened {app_name}."
+        subprocess.run(launch_command(target), check=True, timeout=5)
+        return f"Successfully opened {display_name}."
     except Exception as e:
-        return f"An error occurred while trying to open {app_name}: {e}"
+        return f"An error occurred while trying to open {display_name}: {e}"
 
 # --- NEW: Describe the Tools for the AI Model ---
 
-# --- NEW: Describe the Tools for the AI Model ---
+# google.generativeai takes a second or more to import, so it is imported, configured and given
+# the tool declarations by load_gemini() on the first command; until then these are None.
+genai = None
+tools_list = None
 
-tools_list = [
-    genai.protos.Tool(
-        function_declarations=[
-            genai.protos.FunctionDeclaration(
-                name="get_current_time",
-                description="Use this function to get the current time.",
-                # THE FIX IS HERE: Define an empty object schema
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={}
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="open_application",
-                description="Use this function to open any application on the user's Mac.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "app_name": genai.protos.Schema(type=genai.protos.Type.STRING, description="The name of the application to open (e.g., 'Safari', 'WhatsApp').")
-                    },
-                    required=["app_name"]
+def declare_tools(genai):
+    """The tool declarations Gemini is given with every request."""
+    return [
+        genai.protos.Tool(
+            function_declarations=[
+                genai.protos.FunctionDeclaration(
+                    name="get_current_time",
+                    description="Use this function to get the current time.",
+                    # THE FIX IS HERE: Define an empty object schema
+                    parameters=genai.protos.Schema(
+                        type=genai.protos.Type.OBJECT,
+                        properties={}
+                    )
+                ),
+                genai.protos.FunctionDeclaration(
+                    name="open_application",
+                    description="Use this function to open any application on the user's Mac.",
+                    parameters=genai.protos.Schema(
+                        type=genai.protos.Type.OBJECT,
+                        properties={
+                            "app_name": genai.protos.Schema(type=genai.protos.Type.STRING, description="The name of the application to open (e.g., 'Safari', 'WhatsApp').")
+                        },
+                        required=["app_name"]
+                    )
                 )
-            )
-        ]
-    )
-]
+            ]
+        )
+    ]
+
+def load_gemini():
+    """Imports and configures google.generativeai, declares the tools and builds the Gemini client."""
+    global genai, tools_list
+    import google.generativeai
+    google.generativeai.configure(api_key=GOOGLE_API_KEY)
+    genai, tools_list = google.generativeai, declare_tools(google.generativeai)
+    # LLMClient keeps the same generate_content() interface, adding deadlines and hedged retries.
+    return LLMClient(GeminiBackend('gemini-1.5-flash-latest'))
 
 # --- NEW: A dictionary to map tool names to the actual Python functions ---
 available_tools = {
@@ -92,154 +119,181 @@ available_tools = {
     "open_application": open_application,
 }
 
+# --- NEW: Tools run on a worker pool with per-tool deadlines; parallel function calls run concurrently ---
+tool_executor = ToolExecutor(available_tools)
 
-# --- Voice I/O Functions (Unchanged from jarvis_main2.py) ---
+# --- NEW: Unambiguous tool commands are matched locally and skip the Gemini round trips ---
+intent_router = IntentRouter(available_tools, app_catalog=app_catalog)
+
+# --- NEW: Repeated commands reuse earlier tool decisions and replies (see response_cache.py) ---
+response_cache = ResponseCache()
 
-def speak(tts_instance, text, speaker_wav=None):
-    print(f"JARVIS: {text}")
-    try:
-        tts_instance.tts_to_file(text=text, file_path=RESPONSE_FILENAME, speaker=speaker_wav)
-        os.system(f"afplay {RESPONSE_FILENAME} > /dev/null 2>&1")
-    except Exception as e:
-        print(f"Error during speech synthesis: {e}")
-    finally:
-        if os.path.exists(RESPONSE_FILENAME):
-            os.remove(RESPONSE_FILENAME)
-
-def record_command_vad(p, stream, sample_rate, chunk_size, filename):
-    print("Listening...")
-    if not stream.is_active(): stream.start_stream()
-    frames = []
-    is_speaking = False
-    silent_chunks = 0
-    num_silent_chunks_to_stop = int(SILENCE_DURATION_S * (sample_rate / chunk_size))
-    max_chunks = int(MAX_RECORDING_SECONDS * (sample_rate / chunk_size))
-    for _ in range(max_chunks):
-        data = stream.read(chunk_size, exception_on_overflow=False)
-        frames.append(data)
-        rms = audioop.rms(data, 2)
-        if rms > SILENCE_THRESHOLD:
-            is_speaking = True
-            silent_chunks = 0
-        elif is_speaking:
-            silent_chunks += 1
-        if is_speaking and silent_chunks > num_silent_chunks_to_stop:
-            print("...end of speech detected.")
-            break
-    if not is_speaking:
-        print("...silence detected.")
-        stream.stop_stream()
-        return None
-    print("...recording complete.")
-    stream.stop_stream()
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(sample_rate)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-    return filename
-
-def transcribe_command(whisper_model, filename):
-    if filename is None: return ""
-    print("Transcribing...")
-    result = whisper_model.transcribe(filename, fp16=False)
-    if os.path.exists(filename): os.remove(filename)
-    transcription = result['text'].strip()
-    print(f"YOU SAID: '{transcription}'")
-    return transcription
 
 # --- REVISED: The AI Brain now handles conversations and tools ---
 
-def run_conversation(command, ai_model):
-    """Handles the full conversation logic, including function calling."""
-    print("JARVIS is thinking...")
-    
-    prompt = f"""
+AI_ERROR_REPLY = "My apologies, sir. I've encountered a cognitive dissonance."
+
+def build_prompt(command):
+    return f"""
     You are Jarvis, a witty and brilliant AI assistant. The user has said: '{command}'.
     Analyze the request. 
     1. If it's a general question (e.g., 'what is a black hole?'), formulate a helpful, in-character response directly.
     2. If it requires a computer action (like getting time or opening an app), use the available tools.
     """
+
+def function_calls_of(content):
+    """Returns every function call in a model turn (Gemini may ask for several at once)."""
+    return [part.function_call for part in content.parts if part.function_call.name]
+
+def to_plain(value):
+    """Gemini's proto maps and lists (function call args) as plain dicts and lists, so they can be cached as JSON."""
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, Iterable):
+        return [to_plain(item) for item in value]
+    return value
+
+def to_tool_calls(function_calls):
+    return [{"tool_name": fc.name, "parameters": to_plain(fc.args)} for fc in function_calls]
+
+def run_tools(tool_calls):
+    """Runs the requested tools concurrently, each under its own deadline. Returns ToolResults in order."""
+    for call in tool_calls:
+        print(f"AI wants to use tool: {call['tool_name']} with args: {call['parameters']}")
+    results = tool_executor.run_batch([(call["tool_name"], call["parameters"]) for call in tool_calls])
+    for result in results:
+        print(f"Tool Result ({result.elapsed_s:.2f}s): '{result.result}'")
+    return results
+
+def call_tools(prompt, function_calls):
+    """Runs every tool the model asked for and builds the follow-up request carrying all the results."""
+    results = run_tools(to_tool_calls(function_calls))
+
+    # Send the results back to the model, in one batch, to get a natural language response
+    model_content = genai.protos.Content(
+        role="model", parts=[genai.protos.Part(function_call=fc) for fc in function_calls])
+    return [
+        genai.Part(text=prompt),
+        model_content,
+        *[genai.Part(
+            function_response=genai.protos.FunctionResponse(
+                name=result.tool_name,
+                response={"result": str(result.result)}
+            )
+        ) for result in results]
+    ]
+
+def remember_tool_calls(command, function_calls):
+    """Caches which tools (and arguments) the model picked for this command."""
+    response_cache.put(TOOL, command, to_tool_calls(function_calls))
+
+def run_conversation(command, ai_model):
+    """Handles the full conversation logic, including function calling."""
+    print("JARVIS is thinking...")
+    
+    prompt = build_prompt(command)
     
     try:
+        ai_model = ai_model.get() # The first call imports google.generativeai and sets tools_list
         response = ai_model.generate_content(prompt, tools=tools_list)
-        response_part = response.candidates[0].content.parts[0]
+        function_calls = function_calls_of(response.candidates[0].content)
 
-        if response_part.function_call.name:
-            function_name = response_part.function_call.name
-            function_args = {key: value for key, value in response_part.function_call.args.items()}
-            
-            print(f"AI wants to use tool: {function_name} with args: {function_args}")
-            
-            function_to_call = available_tools[function_name]
-            function_result = function_to_call(**function_args)
-            
-            print(f"Tool Result: '{function_result}'")
-
-            # Send the result back to the model to get a natural language response
-            final_response = ai_model.generate_content(
-                [
-                    genai.Part(text=prompt),
-                    response.candidates[0].content,
-                    genai.Part(
-                        function_response=genai.protos.FunctionResponse(
-                            name=function_name,
-                            response={"result": str(function_result)}
-                        )
-                    )
-                ],
-                tools=tools_list
-            )
+        if function_calls:
+            remember_tool_calls(command, function_calls)
+            follow_up = call_tools(prompt, function_calls)
+            final_response = ai_model.generate_content(follow_up, tools=tools_list)
             return final_response.text.strip()
         else:
-            return response.text.strip()
+            reply = response.text.strip()
+            response_cache.put(REPLY, command, reply)
+            return reply
             
     except Exception as e:
         print(f"AI Error: {e}")
-        return "My apologies, sir. I've encountered a cognitive dissonance."
+        return AI_ERROR_REPLY
+
+def run_conversation_stream(command, ai_model, tts_instance, speaker_wav=None):
+    """
+    Like run_conversation, but the reply is spoken sentence by sentence while
+    Gemini is still generating it. Returns the text that was spoken.
+    """
+    print("JARVIS is thinking...")
+
+    prompt = build_prompt(command)
+
+    try:
+        ai_model = ai_model.get() # The first call imports google.generativeai and sets tools_list
+        chunks = ai_model.stream_content(prompt, tools=tools_list)
+        first = next(chunks, None)
+        if first is None:
+            return ""
+        function_calls = function_calls_of(first.candidates[0].content)
+
+        if function_calls:
+            for chunk in chunks: # Function calls arrive whole, but parallel ones may span chunks
+                function_calls += function_calls_of(chunk.candidates[0].content)
+            remember_tool_calls(command, function_calls)
+            follow_up = call_tools(prompt, function_calls)
+            return speak_stream(tts_instance, ai_model.stream_text(follow_up, tools=tools_list), speaker_wav=speaker_wav)
+        spoken = speak_stream(tts_instance, iter_text(itertools.chain([first], chunks)), speaker_wav=speaker_wav)
+        if spoken: response_cache.put(REPLY, command, spoken)
+        return spoken
+
+    except Exception as e:
+        print(f"AI Error: {e}")
+        speak(tts_instance, AI_ERROR_REPLY, speaker_wav=speaker_wav)
+        return AI_ERROR_REPLY
 
 # --- Main Execution ---
 
 if __name__ == "__main__":
     porcupine = None
     pa = None
-    audio_stream = None
+    capture = None
+    startup = Startup()
 
     try:
+        # Models load in parallel; Whisper and TTS are only waited for on the wake word.
         print("Initializing models... (This might take a moment)")
-        porcupine = pvporcupine.create(access_key=PICOVOICE_ACCESS_KEY, keywords=WAKE_WORDS)
-        whisper_model = whisper.load_model("base")
-        tts = TTS(model_name=TTS_MODEL, progress_bar=False)
+        startup.load("porcupine", lambda: PorcupineDetector(load_porcupine(PICOVOICE_ACCESS_KEY, WAKE_WORDS)))
+        startup.load("whisper", lambda: load_whisper("base"), warm_up=warm_up_whisper)
+        startup.load("tts", lambda: load_tts(TTS_MODEL, TTS_SPEAKER, FIXED_PHRASES),
+                     warm_up=lambda tts: warm_up_tts(tts, TTS_SPEAKER))
+        startup.load("app catalog", app_catalog.build)
         
         # --- NEW: Initialize the AI model once, using a version that supports tool use ---
-        ai_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        # It is built on first use (prefetched on the wake word), with the google.generativeai import.
+        ai_model = startup.lazy("gemini", load_gemini)
         
+        porcupine = startup.get("porcupine")
         pa = pyaudio.PyAudio()
-        audio_stream = pa.open(
-            rate=porcupine.sample_rate, channels=1, format=pyaudio.paInt16,
-            input=True, frames_per_buffer=porcupine.frame_length
-        )
+        # One capture stream for the whole session; each stage reads the ring buffer at its own cursor.
+        capture = AudioCapture(pa, porcupine.sample_rate, porcupine.frame_length).start()
+        startup.report_when_loaded()
         
         while True:
             print("\n--------------------------------------------------")
             print(f"JARVIS is in standby, listening for '{WAKE_WORDS[0]}'")
             print("--------------------------------------------------")
             
-            audio_stream.start_stream()
-            while True:
-                pcm = audio_stream.read(porcupine.frame_length, exception_on_overflow=False)
-                pcm = struct.unpack_from("h" * porcupine.frame_length, pcm)
-                if porcupine.process(pcm) >= 0:
-                    print(f"Wake word '{WAKE_WORDS[0]}' detected!")
-                    audio_stream.stop_stream()
-                    break
+            wake_stream = wait_for_wake_word(capture, porcupine)
+            print(f"Wake word '{WAKE_WORDS[0]}' detected!")
             
-            speak(tts, "Yes, sir?", speaker_wav=TTS_SPEAKER)
+            ai_model.prefetch()
+            whisper_model, tts = startup.get("whisper"), startup.get("tts")
+            command_stream, preroll = acknowledge_wake(capture, wake_stream.position, tts, "Yes, sir?",
+                                                       speaker_wav=TTS_SPEAKER, mode=ACKNOWLEDGEMENT_MODE,
+                                                       preroll_seconds=PREROLL_SECONDS)
             
             while True: 
-                command_path = record_command_vad(pa, audio_stream, SAMPLE_RATE, porcupine.frame_length, COMMAND_FILENAME)
-                command_text = transcribe_command(whisper_model, command_path)
+                transcriber = IncrementalTranscriber(whisper_model, SAMPLE_RATE) if STREAMING_TRANSCRIPTION else None
+                command_audio = record_command_vad(command_stream or capture.reader(), SAMPLE_RATE, porcupine.frame_length,
+                                                   debug_filename=COMMAND_FILENAME if SAVE_COMMAND_WAV else None,
+                                                   preroll=preroll, transcriber=transcriber)
+                command_stream, preroll = None, b'' # Follow-up commands start at the live edge
+                command_text = transcribe_command(whisper_model, command_audio, transcriber)
 
                 if not command_text: continue
                 
@@ -248,7 +302,18 @@ if __name__ == "__main__":
                     break
                 
                 # --- CORE LOGIC CHANGE: Use the new conversation handler ---
-                ai_reply = run_conversation(command_text, ai_model)
+                local_tool_calls = intent_router.route(command_text) or response_cache.get(TOOL, command_text)
+                cached_reply = None if local_tool_calls else response_cache.get(REPLY, command_text)
+                if local_tool_calls:
+                    if isinstance(local_tool_calls, dict): local_tool_calls = [local_tool_calls]
+                    ai_reply = "\n".join(str(result.result) for result in run_tools(local_tool_calls))
+                elif cached_reply:
+                    ai_reply = cached_reply
+                elif STREAM_LLM_REPLIES:
+                    run_conversation_stream(command_text, ai_model, tts, speaker_wav=TTS_SPEAKER)
+                    continue # Already spoken as it streamed in
+                else:
+                    ai_reply = run_conversation(command_text, ai_model)
                 speak(tts, ai_reply, speaker_wav=TTS_SPEAKER)
 
     except KeyboardInterrupt:
@@ -257,8 +322,10 @@ if __name__ == "__main__":
         print(f"A critical error occurred: {e}")
     finally:
         print("Cleaning up resources.")
-        if audio_stream: audio_stream.close()
+        startup.close()
+        tool_executor.close()
+        response_cache.flush()
+        if capture: capture.close()
         if pa: pa.terminate()
         if porcupine: porcupine.delete()
-        if os.path.exists(COMMAND_FILENAME): os.remove(COMMAND_FILENAME)
-        if os.path.exists(RESPONSE_FILENAME): os.remove(RESPONSE_FILENAME)
\ No newline at end of file
+        close_output()
\ No newline at end of file
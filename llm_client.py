@@ -0,0 +1,347 @@
+# llm_client.py
+
+import json
+import time
+import random
+import threading
+import re
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REQUEST_TIMEOUT_S = 15.0  # Hard deadline for one LLM request, including hedges
+DEFAULT_HEDGE_DELAY_S = 3.0 # Used until enough latencies have been recorded
+HEDGE_PERCENTILE = 90     # Fire a duplicate once a request is slower than this percentile of past requests
+MIN_HEDGE_SAMPLES = 20    # Latencies needed before the percentile is trusted
+MAX_HEDGES = 1            # Extra requests per call (also used as retries after an error)
+LATENCY_HISTORY = 200     # Recent latencies kept for percentiles
+POOL_WORKERS = 4
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when no backend reply arrives before the request deadline."""
+
+# --- Backends ---
+# A backend has generate_content(contents, timeout, **kwargs), returning an object with
+# a `.text` attribute (Gemini's own response object qualifies). Backends that can stream
+# also have stream_content(contents, timeout, **kwargs), returning an iterator of such chunks.
+
+class GeminiBackend:
+    """Google Gemini. The GenerativeModel (and its HTTP channel) is created once and reused."""
+
+    def __init__(self, model_name):
+        import google.generativeai as genai
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, contents, timeout, **kwargs):
+        return self.model.generate_content(contents, request_options={"timeout": timeout}, **kwargs)
+
+    def stream_content(self, contents, timeout, **kwargs):
+        return iter(self.model.generate_content(contents, stream=True, request_options={"timeout": timeout}, **kwargs))
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class ScriptedStreamBackend:
+    """
+    An in-process backend that replays a scripted reply token by token, for testing
+    and benchmarking the streaming path without a network.
+
+    Args:
+        reply (str | callable): The reply text, or a function mapping contents to it.
+        first_token_delay_s (float): Simulated time to first token.
+        token_delay_s (float): Simulated time between tokens.
+    """
+
+    def __init__(self, reply, first_token_delay_s=0.3, token_delay_s=0.02):
+        self.reply = reply if callable(reply) else (lambda contents: reply)
+        self.first_token_delay_s = first_token_delay_s
+        self.token_delay_s = token_delay_s
+
+    def stream_content(self, contents, timeout, **kwargs):
+        time.sleep(self.first_token_delay_s)
+        for i, token in enumerate(re.findall(r"\S+\s*", self.reply(contents))):
+            if i: time.sleep(self.token_delay_s)
+            yield StubResponse(token)
+
+    def generate_content(self, contents, timeout, **kwargs):
+        return StubResponse("".join(chunk.text for chunk in self.stream_content(contents, timeout, **kwargs)))
+
+class HTTPBackend:
+    """
+    Talks to an HTTP server speaking the stub protocol (POST /generate -> {"text": ...}).
+    Each worker thread keeps its own persistent connection.
+    """
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self._local = threading.local()
+
+    def _connection(self, timeout):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def generate_content(self, contents, timeout, **kwargs):
+        body = json.dumps({"contents": contents}, default=str)
+        conn = self._connection(timeout)
+        try:
+            conn.request("POST", "/generate", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"Stub server error {response.status}: {payload.get('error')}")
+        return StubResponse(payload["text"])
+
+class StubServer:
+    """
+    An in-process HTTP server that imitates an LLM, for offline load tests and benchmarks.
+
+    Args:
+        reply (callable): Maps the request contents to the reply text.
+        latency (callable): Returns how long (seconds) to sleep before replying.
+        error_rate (float): Fraction of requests that fail with a 500.
+    """
+
+    def __init__(self, reply=None, latency=None, error_rate=0.0, host="127.0.0.1", port=0):
+        stub = self
+        self.reply = reply or (lambda contents: "At your service, sir.")
+        self.latency = latency or (lambda: 0.0)
+        self.error_rate = error_rate
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, so clients can reuse connections
+
+            def do_POST(self):
+                stub.requests += 1
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(stub.latency())
+                if random.random() < stub.error_rate:
+                    status, payload = 500, {"error": "injected failure"}
+                else:
+                    status, payload = 200, {"text": stub.reply(request["contents"])}
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def backend(self):
+        return HTTPBackend(self.host, self.port)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# --- Client ---
+
+class LLMClient:
+    """
+    A long-lived LLM client: one backend, one worker pool, per-request deadlines,
+    hedged duplicate requests for slow calls, and per-call latency records.
+    """
+
+    def __init__(self, backend, timeout_s=REQUEST_TIMEOUT_S, max_hedges=MAX_HEDGES,
+                 hedge_percentile=HEDGE_PERCENTILE, pool_workers=POOL_WORKERS):
+        self.backend = backend
+        self.timeout_s = timeout_s
+        self.max_hedges = max_hedges
+        self.hedge_percentile = hedge_percentile
+        self.executor = ThreadPoolExecutor(max_workers=pool_workers, thread_name_prefix="llm")
+        self.latencies = deque(maxlen=LATENCY_HISTORY)          # Per call, as the caller saw it
+        self.attempt_latencies = deque(maxlen=LATENCY_HISTORY)  # Per backend request; drives hedging
+        self.first_token_latencies = deque(maxlen=LATENCY_HISTORY)
+        self.calls = self.timeouts = self.errors = self.hedges = 0
+        self._lock = threading.Lock()
+
+    def percentile(self, p, samples=None):
+        with self._lock:
+            samples = sorted(self.latencies if samples is None else samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def hedge_delay(self):
+        """How long to wait for a reply before firing a duplicate request."""
+        if len(self.attempt_latencies) < MIN_HEDGE_SAMPLES:
+            return DEFAULT_HEDGE_DELAY_S
+        return self.percentile(self.hedge_percentile, self.attempt_latencies)
+
+    def _attempt(self, contents, timeout, kwargs):
+        start = time.monotonic()
+        response = self.backend.generate_content(contents, timeout, **kwargs)
+        with self._lock:
+            self.attempt_latencies.append(time.monotonic() - start)
+        return response
+
+    def _submit(self, contents, deadline, kwargs):
+        remaining = max(0.1, deadline - time.monotonic())
+        return self.executor.submit(self._attempt, contents, remaining, kwargs)
+
+    def generate_content(self, contents, timeout=None, **kwargs):
+        """
+        Sends a request and returns the first successful backend response.
+
+        Raises:
+            LLMTimeoutError: If nothing came back before the deadline.
+            Exception: The last backend error, if every attempt failed.
+        """
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout_s)
+        with self._lock:
+            self.calls += 1
+        pending = [self._submit(contents, deadline, kwargs)]
+        hedges_left = self.max_hedges
+        hedge_at = start + self.hedge_delay()
+        last_error = None
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                with self._lock:
+                    self.timeouts += 1
+                raise LLMTimeoutError(f"No LLM reply within {deadline - start:.1f}s")
+            wake_at = min(deadline, hedge_at) if hedges_left else deadline
+            done, _ = wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                with self._lock:
+                    self.latencies.append(time.monotonic() - start)
+                return response
+            if not pending and not hedges_left:
+                with self._lock:
+                    self.errors += 1
+                raise last_error
+            # Hedge when the call is slow, or retry straight away when every attempt failed.
+            if hedges_left and (not pending or time.monotonic() >= hedge_at):
+                hedges_left -= 1
+                with self._lock:
+                    self.hedges += 1
+                pending.append(self._submit(contents, deadline, kwargs))
+                hedge_at = time.monotonic() + self.hedge_delay()
+
+    def generate_text(self, contents, timeout=None, **kwargs):
+        """Like generate_content, but returns the stripped reply text."""
+        return self.generate_content(contents, timeout=timeout, **kwargs).text.strip()
+
+    def _open_stream(self, contents, timeout, kwargs):
+        stream = self.backend.stream_content(contents, timeout, **kwargs)
+        return stream, next(stream, None)
+
+    def stream_content(self, contents, timeout=None, **kwargs):
+        """
+        Streams a reply chunk by chunk. The deadline applies to the first chunk;
+        after that, chunks are yielded as the backend produces them.
+
+        Raises:
+            LLMTimeoutError: If the first chunk didn't arrive before the deadline.
+        """
+        start = time.monotonic()
+        timeout = timeout or self.timeout_s
+        with self._lock:
+            self.calls += 1
+        future = self.executor.submit(self._open_stream, contents, timeout, kwargs)
+        try:
+            stream, first = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise LLMTimeoutError(f"No LLM reply within {timeout:.1f}s")
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        with self._lock:
+            self.first_token_latencies.append(time.monotonic() - start)
+        if first is None:
+            return
+        yield first
+        yield from stream
+        with self._lock:
+            self.latencies.append(time.monotonic() - start)
+
+    def stream_text(self, contents, timeout=None, **kwargs):
+        """Like stream_content, but yields only the text of each chunk."""
+        return iter_text(self.stream_content(contents, timeout=timeout, **kwargs))
+
+    def stats(self):
+        """Returns call counts and latency percentiles for logging."""
+        return {
+            "calls": self.calls, "timeouts": self.timeouts, "errors": self.errors, "hedges": self.hedges,
+            "p50_s": self.percentile(50), "p95_s": self.percentile(95), "p99_s": self.percentile(99),
+            "first_token_p50_s": self.percentile(50, self.first_token_latencies),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_text(chunks):
+    """Yields the text of each streamed chunk, skipping chunks without text (e.g. function calls)."""
+    for chunk in chunks:
+        try:
+            text = chunk.text
+        except ValueError: # Gemini raises this for chunks that only hold a function call
+            continue
+        if text:
+            yield text
+
+# --- Offline load test (python3 llm_client.py) ---
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+
+    def tail_latency():
+        # Mostly ~80 ms, but 3% of requests stall for a second, like a congested upstream.
+        return 1.0 if rng.random() < 0.03 else rng.lognormvariate(-2.5, 0.3)
+
+    server = StubServer(reply=lambda contents: f"Echo: {contents}", latency=tail_latency, error_rate=0.01).start()
+    print(f"Stub LLM server on {server.host}:{server.port}\n")
+    print(f"{'mode':>12} {'p50':>8} {'p95':>8} {'p99':>8} {'hedges':>7} {'errors':>7} {'timeouts':>9} {'req/s':>7}")
+    for label, hedges in (("no hedging", 0), ("hedged", 1)):
+        client = LLMClient(server.backend(), timeout_s=2.0, max_hedges=hedges, pool_workers=16)
+        concurrency, per_worker = 4, 50
+
+        def worker(i):
+            for n in range(per_worker):
+                try:
+                    client.generate_text(f"request {i}-{n}")
+                except Exception:
+                    pass
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - t0
+        s = client.stats()
+        print(f"{label:>12} {s['p50_s'] * 1000:>6.0f}ms {s['p95_s'] * 1000:>6.0f}ms {s['p99_s'] * 1000:>6.0f}ms "
+              f"{s['hedges']:>7} {s['errors']:>7} {s['timeouts']:>9} {s['calls'] / elapsed:>7.1f}")
+        client.close()
+    server.stop()
@@ -0,0 +1,136 @@
+# phrase_cache.py
+
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+PHRASE_CACHE_DIR = os.path.join(".jarvis_cache", "phrases")
+MAX_MEMORY_PHRASES = 64  # Waveforms kept in RAM (LRU)
+MAX_DISK_PHRASES = 500   # Waveforms kept on disk before the least recently used are pruned
+
+class PhraseCache:
+    """
+    Caches synthesized waveforms keyed by (text, TTS model, speaker).
+
+    Recently used phrases live in an in-memory LRU. Phrases put with persist=True
+    (the fixed phrases) are also saved as .npy files, which are memory-mapped on
+    the next run instead of re-synthesized. Safe to use from several threads.
+    """
+
+    def __init__(self, model_name, cache_dir=PHRASE_CACHE_DIR,
+                 max_memory=MAX_MEMORY_PHRASES, max_disk=MAX_DISK_PHRASES):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Phrase cache is memory-only, could not create {cache_dir}: {e}")
+            self.cache_dir = None
+
+    def key(self, text, speaker):
+        return hashlib.sha1(f"{self.model_name}\0{speaker}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, text, speaker=None):
+        """Returns the cached waveform, or None if this phrase hasn't been synthesized before."""
+        key = self.key(text, speaker)
+        with self._lock:
+            wav = self.memory.get(key)
+        if wav is None and self.cache_dir:
+            path = self._path(key)
+            try:
+                wav = np.load(path, mmap_mode='r')
+                os.utime(path) # Pruning goes by mtime, so phrases in use are the last to go
+            except (OSError, ValueError):
+                wav = None
+        with self._lock:
+            if wav is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, wav)
+        return wav
+
+    def put(self, text, speaker, wav, persist=False):
+        """Stores a waveform in memory, and on disk too if `persist`."""
+        key = self.key(text, speaker)
+        wav = np.asarray(wav, dtype=np.float32)
+        with self._lock:
+            self._remember(key, wav)
+        if not persist or not self.cache_dir:
+            return
+        tmp_path = None
+        try:
+            # Write to a uniquely named temp file and rename, so a crash or a concurrent put
+            # never leaves a half-written phrase. Its .tmp suffix keeps it out of _prune_disk.
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, wav)
+            os.replace(tmp_path, self._path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"Could not save phrase to cache: {e}")
+            if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+
+    def _remember(self, key, wav):
+        """Called with the lock held."""
+        self.memory[key] = wav
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def _prune_disk(self):
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".npy")]
+        if len(entries) <= self.max_disk:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass # Another thread pruned it first
+
+class CachedTTS:
+    """
+    Wraps a Coqui TTS instance so repeated sentences come from the PhraseCache.
+
+    It exposes the same `tts()` and `synthesizer` the rest of Jarvis uses, so it
+    can be passed to speak() in place of the raw TTS instance. Only the fixed
+    phrases given to prewarm() are written to disk; other sentences (one-off
+    LLM replies) stay in the in-memory LRU, so synthesis does no file I/O for them.
+    """
+
+    def __init__(self, tts_instance, cache):
+        self.tts_instance = tts_instance
+        self.cache = cache
+        self.fixed = set() # (text, speaker) of the prewarmed phrases
+
+    @property
+    def synthesizer(self):
+        return self.tts_instance.synthesizer
+
+    def tts(self, text, speaker=None, **kwargs):
+        wav = self.cache.get(text, speaker)
+        if wav is None:
+            wav = np.asarray(self.tts_instance.tts(text=text, speaker=speaker, **kwargs), dtype=np.float32)
+            self.cache.put(text, speaker, wav, persist=(text, speaker) in self.fixed)
+        return wav
+
+    def prewarm(self, phrases, speaker=None):
+        """Synthesizes fixed phrases up front (a no-op for ones already on disk)."""
+        from voice_io import split_sentences, clean_text_for_tts
+        for phrase in phrases:
+            for sentence in split_sentences(clean_text_for_tts(phrase)):
+                self.fixed.add((sentence, speaker))
+                self.tts(sentence, speaker=speaker)
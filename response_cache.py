@@ -0,0 +1,149 @@
+# response_cache.py
+
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+from intent_router import normalize_command
+
+RESPONSE_CACHE_FILE = os.path.join(".jarvis_cache", "responses.json")
+
+# Cache classes: tool-call decisions don't go stale; conversational replies do (and get repetitive).
+TOOL = "tool"
+REPLY = "reply"
+CACHE_TTL_S = {TOOL: 30 * 24 * 3600, REPLY: 6 * 3600}
+CACHE_MAX_ENTRIES = {TOOL: 500, REPLY: 200}
+SAVE_DELAY_S = 5.0  # put()s within this long of each other are written to disk together
+
+# Conversational replies to these are never cached: the answer depends on when it's asked
+# ("what time is it", "any news today") or should differ each time ("tell me a joke").
+# Matched against the normalized command.
+UNCACHEABLE_REPLY_RE = re.compile(
+    r"\b(?:time|date|day|today|tonight|tomorrow|yesterday|now|currently|latest|recent|news|weather|"
+    r"forecast|temperature|score|price|stock|joke|jokes|story|poem|riddle|fact|quote|random|surprise|"
+    r"something|another|again)\b")
+
+def cacheable(kind, key):
+    """Whether a response of this kind to this normalized command may be cached and served again."""
+    return kind != REPLY or not UNCACHEABLE_REPLY_RE.search(key)
+
+class ResponseCache:
+    """
+    Remembers what the LLM answered for a command, keyed by the normalized
+    transcription (so "Open Chrome." and "um, open chrome please" share an entry).
+
+    Tool-call decisions and conversational replies are kept in separate LRUs with
+    their own TTLs (replies to time-sensitive or open-ended commands aren't kept), and both are persisted to a JSON file between runs. Safe to
+    share between threads; the file is rewritten at most every save_delay_s
+    (call flush() before exiting to write the last changes).
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, ttl_s=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES,
+                 save_delay_s=SAVE_DELAY_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.save_delay_s = save_delay_s
+        self.entries = {kind: OrderedDict() for kind in ttl_s}
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # One writer at a time, so an older snapshot never replaces a newer one
+        self._save_timer = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for kind, entries in stored.items():
+            if kind in self.entries:
+                for key, (value, expires_at) in entries.items():
+                    if expires_at > now:
+                        self.entries[kind][key] = (value, expires_at)
+
+    def _schedule_save(self):
+        """Called with the lock held."""
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay_s, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Writes pending changes to disk now (atomically)."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is None:
+                    return
+                self._save_timer.cancel()
+                self._save_timer = None
+                snapshot = {kind: dict(entries) for kind, entries in self.entries.items()}
+            tmp_path = None
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Could not save response cache: {e}")
+                if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+
+    def get(self, kind, command):
+        """Returns the cached value for this command, or None."""
+        key = normalize_command(command)
+        with self._lock:
+            entries = self.entries[kind]
+            entry = entries.get(key) if cacheable(kind, key) else None
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del entries[key]
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, kind, command, value):
+        """Caches a value (any JSON-serializable object) for this command; others are skipped."""
+        key = normalize_command(command)
+        if not key or not cacheable(kind, key):
+            return
+        try:
+            json.dumps(value) # One bad value would otherwise make every later save fail
+        except (TypeError, ValueError) as e:
+            print(f"Not caching the response to '{command}': {e}")
+            return
+        with self._lock:
+            entries = self.entries[kind]
+            entries[key] = (value, time.time() + self.ttl_s[kind])
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries[kind]:
+                entries.popitem(last=False)
+            self._schedule_save()
+
+# --- Self-check (python3 response_cache.py) ---
+
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "responses.json")
+    cache = ResponseCache(path)
+    for command in ["What time is it?", "Um, what's the date today?", "Tell me a joke.", "Any news?"]:
+        cache.put(REPLY, command, "A reply that would be stale or repeated.")
+        assert cache.get(REPLY, command) is None, f"'{command}' was served from the cache"
+    cache.put(REPLY, "What is the capital of France?", "Paris, sir.")
+    assert cache.get(REPLY, "what is the capital of france") == "Paris, sir."
+    cache.put(TOOL, "What time is it?", [{"tool_name": "get_current_time", "parameters": {}}]) # Tools run fresh anyway
+    assert cache.get(TOOL, "what time is it") is not None
+
+    # An entry saved before a command became uncacheable isn't served either
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({REPLY: {"what time is it": ["It is 4:30 PM, sir.", time.time() + 3600]}}, f)
+    assert ResponseCache(path).get(REPLY, "What time is it?") is None
+    print("Self-check passed: time-sensitive and open-ended replies are never served from the cache.")
@@ -0,0 +1,201 @@
+# startup.py
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STARTUP_WORKERS = 4
+WARM_UP_SECONDS = 1.0     # Length of the silent clip used to warm up Whisper
+WARM_UP_TEXT = "Ready."   # Synthesized (not cached, not played) to warm up TTS
+
+class Lazy:
+    """
+    A stand-in for an object that is only built on first use (e.g. the Gemini
+    client, whose import alone costs a second or more). Attribute access is
+    forwarded to the real object, building it the first time.
+    """
+
+    def __init__(self, name, loader):
+        self._name = name
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+        self.load_s = None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    start = time.perf_counter()
+                    self._value = self._loader()
+                    self.load_s = time.perf_counter() - start
+                    print(f"Loaded {self._name} on first use in {self.load_s:.2f}s")
+        return self._value
+
+    def prefetch(self):
+        """Starts building in the background (e.g. on the wake word, while the user is still talking)."""
+        if self._value is None:
+            threading.Thread(target=self._prefetch, daemon=True).start()
+
+    def _prefetch(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"Prefetching {self._name} failed: {e}")
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+class Startup:
+    """
+    Loads independent components concurrently and keeps a timing breakdown.
+
+    load() starts a component on a worker thread and returns immediately; get()
+    waits for it. A component can have a warm-up step, run right after it loads
+    on the same worker, so its first real use isn't the slow one. Things that
+    aren't needed until the first command should be Lazy instead.
+    """
+
+    def __init__(self, workers=STARTUP_WORKERS):
+        self.started_at = time.perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="startup")
+        self.futures = {}
+        self.timings = []   # (component, phase, start offset, duration, error)
+        self.lazies = []
+        self._lock = threading.Lock()
+
+    def _timed(self, name, phase, fn, *args):
+        start = time.perf_counter()
+        error = None
+        try:
+            return fn(*args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                self.timings.append((name, phase, start - self.started_at, time.perf_counter() - start, error))
+
+    def load(self, name, loader, warm_up=None):
+        """
+        Starts loading a component in the background.
+
+        Args:
+            name (str): Used with get() and in the report.
+            loader (callable): Builds and returns the component.
+            warm_up (callable): Optional; called with the component after it loads.
+        """
+        def job():
+            component = self._timed(name, "load", loader)
+            if warm_up is not None:
+                try:
+                    self._timed(name, "warm-up", warm_up, component)
+                except Exception as e:
+                    print(f"Warm-up of {name} failed (continuing): {e}")
+            return component
+        self.futures[name] = self.executor.submit(job)
+        return self.futures[name]
+
+    def get(self, name):
+        """Waits for a component (loading and warm-up) and returns it. Re-raises its loading error."""
+        return self.futures[name].result()
+
+    def lazy(self, name, loader):
+        """Returns a Lazy that builds the component on first use, and lists it in the report."""
+        lazy = Lazy(name, loader)
+        self.lazies.append(lazy)
+        return lazy
+
+    def track(self, lazy):
+        """Lists an existing Lazy in the report."""
+        self.lazies.append(lazy)
+        return lazy
+
+    def report(self):
+        """Prints when each component started, how long it took, and the wall time to this point."""
+        total = time.perf_counter() - self.started_at
+        with self._lock:
+            timings = sorted(self.timings, key=lambda t: t[2])
+        print(f"\n{'component':<22} {'phase':<8} {'start':>7} {'took':>7}")
+        for name, phase, start, duration, error in timings:
+            status = f"  FAILED: {error}" if error else ""
+            print(f"{name:<22} {phase:<8} {start:>6.2f}s {duration:>6.2f}s{status}")
+        for lazy in self.lazies:
+            took = f"{lazy.load_s:>6.2f}s" if lazy.loaded else "  first use"
+            print(f"{lazy._name:<22} {'deferred':<8} {'':>7} {took}")
+        busy = sum(t[3] for t in timings)
+        print(f"Startup wall time {total:.2f}s (work done {busy:.2f}s)\n")
+
+    def report_when_loaded(self):
+        """Prints the report from a background thread once every component has loaded."""
+        def wait_and_report():
+            for future in list(self.futures.values()):
+                try:
+                    future.result()
+                except Exception:
+                    pass # Shown as FAILED in the report
+            self.report()
+        threading.Thread(target=wait_and_report, daemon=True).start()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# --- Loaders shared by the entry scripts. Heavy imports happen here, on the worker threads. ---
+
+def load_porcupine(access_key, keywords):
+    import pvporcupine
+    return pvporcupine.create(access_key=access_key, keywords=keywords)
+
+def load_whisper(model_name="base"):
+    import whisper
+    return whisper.load_model(model_name)
+
+def load_stt(backend="whisper", model_name="base", threads=None):
+    """A speech-to-text backend from stt.py; same transcribe() as a Whisper model."""
+    from stt import load_backend
+    return load_backend(backend, model_name, threads)
+
+def warm_up_whisper(whisper_model, sample_rate=16000):
+    """One throwaway decode, so the first real command doesn't pay for lazy initialization."""
+    whisper_model.transcribe(np.zeros(int(WARM_UP_SECONDS * sample_rate), dtype=np.float32), fp16=False, language="en")
+
+def load_tts(model_name, speaker=None, phrases=()):
+    """Builds the cached TTS and synthesizes any fixed phrases not already on disk."""
+    from TTS.api import TTS
+    from phrase_cache import PhraseCache, CachedTTS
+    tts = CachedTTS(TTS(model_name=model_name, progress_bar=False), PhraseCache(model_name))
+    tts.prewarm(phrases, speaker=speaker)
+    return tts
+
+def warm_up_tts(tts, speaker=None):
+    tts.tts_instance.tts(text=WARM_UP_TEXT, speaker=speaker)
+
+# --- Demo with fake loaders (python3 startup.py) ---
+
+if __name__ == "__main__":
+    def fake_loader(seconds, value):
+        def load():
+            time.sleep(seconds)
+            return value
+        return load
+
+    sequential = 0.3 + 2.0 + 3.0
+    startup = Startup()
+    startup.load("porcupine", fake_loader(0.3, "porcupine"))
+    startup.load("whisper", fake_loader(2.0, "whisper"), warm_up=lambda m: time.sleep(0.5))
+    startup.load("tts", fake_loader(3.0, "tts"), warm_up=lambda m: time.sleep(0.4))
+    llm = startup.lazy("gemini", fake_loader(1.2, "gemini"))
+    startup.get("porcupine")
+    print(f"Standby after {time.perf_counter() - startup.started_at:.2f}s "
+          f"(loading one after another: {sequential + 1.2:.1f}s before standby)")
+    startup.get("whisper"); startup.get("tts")
+    startup.report()
+    llm.get()
+    startup.report()
+    startup.close()
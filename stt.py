@@ -0,0 +1,159 @@
+# stt.py
+#
+# Speech-to-text backends. Each has transcribe(audio, **options), taking float32
+# samples at 16 kHz and returning openai-whisper's result shape:
+#   {"text": str, "segments": [{"start", "end", "text"}, ...], "language": str}
+# so the recorder, the incremental transcriber and the daemon work with any of them.
+#
+# Parity check between the backends on a fixed set of recordings (.wav + .txt, as for stt_benchmark.py):
+#   python3 stt.py recordings/ --model base
+# Without recordings it runs on generated non-speech clips (silence, noise, tones), where both backends
+# must return the result shape above and no words:
+#   python3 stt.py --model tiny
+
+import os
+import time
+
+SAMPLE_RATE = 16000
+DEFAULT_BACKEND = "whisper"
+FASTER_WHISPER_COMPUTE_TYPE = "int8"   # Quantized weights; the fast option on CPUs without fp16
+PARITY_MAX_WER = 0.10                  # Max word error rate between the backends for the parity check to pass
+SYNTHETIC_MAX_WORDS = 2                # Words a backend may "hear" in a generated non-speech clip (e.g. a stray "you")
+
+# Options both backends understand; openai-whisper's name on the left, faster-whisper's on the right
+_FASTER_WHISPER_OPTIONS = {
+    "language": "language", "initial_prompt": "initial_prompt", "beam_size": "beam_size", "best_of": "best_of",
+    "patience": "patience", "temperature": "temperature", "condition_on_previous_text": "condition_on_previous_text",
+    "compression_ratio_threshold": "compression_ratio_threshold", "logprob_threshold": "log_prob_threshold",
+    "no_speech_threshold": "no_speech_threshold", "word_timestamps": "word_timestamps",
+}
+
+class WhisperBackend:
+    """openai-whisper on PyTorch, fp32 on CPU."""
+
+    name = "whisper"
+
+    def __init__(self, model_name="base", threads=None):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_name)
+
+    def transcribe(self, audio, **options):
+        options.setdefault("fp16", False)
+        return self.model.transcribe(audio, **options)
+
+class FasterWhisperBackend:
+    """
+    faster-whisper: the same Whisper models on CTranslate2, with int8 weights by
+    default. Unknown options (e.g. fp16) are ignored; decoding is greedy unless
+    a beam_size is given, as with openai-whisper.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name="base", threads=None, compute_type=FASTER_WHISPER_COMPUTE_TYPE):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads or 0)
+
+    def transcribe(self, audio, **options):
+        kwargs = {_FASTER_WHISPER_OPTIONS[k]: v for k, v in options.items() if k in _FASTER_WHISPER_OPTIONS and v is not None}
+        kwargs.setdefault("beam_size", 1)
+        segments, info = self.model.transcribe(audio, **kwargs)
+        segments = [{"start": s.start, "end": s.end, "text": s.text} for s in segments] # The generator does the decoding
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": info.language}
+
+STT_BACKENDS = {WhisperBackend.name: WhisperBackend, FasterWhisperBackend.name: FasterWhisperBackend}
+
+def load_backend(backend=DEFAULT_BACKEND, model_name="base", threads=None):
+    """
+    Builds a speech-to-text backend by name.
+
+    Args:
+        backend (str): "whisper" or "faster-whisper".
+        model_name (str): Whisper model size (tiny, base, small, ...) or a local model path.
+        threads (int, optional): CPU threads for inference; None keeps the library default.
+    """
+    if backend not in STT_BACKENDS:
+        raise ValueError(f"Unknown STT backend '{backend}' (choose from {', '.join(STT_BACKENDS)})")
+    return STT_BACKENDS[backend](model_name, threads)
+
+def synthetic_corpus(seed=0):
+    """Non-speech clips for the parity check when there are no recordings: [(name, float32 audio, None)]."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    bursts = np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 4 * t) > 0) # 4 beeps a second, syllable-like rhythm
+    clips = [
+        ("silence", np.zeros_like(t)),
+        ("room noise", rng.normal(0, 0.003, t.size)),
+        ("tone 1 kHz", 0.3 * np.sin(2 * np.pi * 1000 * t)),
+        ("beeps", 0.3 * bursts + rng.normal(0, 0.003, t.size)),
+    ]
+    return [(name, audio.astype(np.float32), None) for name, audio in clips]
+
+def check_result(result):
+    """Asserts a transcribe() result has the documented shape."""
+    assert isinstance(result.get("text"), str), result
+    assert isinstance(result.get("language"), str), result
+    for segment in result.get("segments"):
+        assert isinstance(segment["text"], str) and segment["start"] <= segment["end"], segment
+
+# --- Parity check (python3 stt.py recordings/ [--model base]) ---
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from stt_benchmark import load_corpus, word_errors, words
+
+    parser = argparse.ArgumentParser(description="Check that the STT backends agree on a fixed set of recordings.")
+    parser.add_argument("corpus", nargs="?",
+                        help="Directory of .wav recordings with same-named .txt references (default: generated clips)")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--max-wer", type=float, default=PARITY_MAX_WER,
+                        help="Max word error rate of each backend against the first one")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        parser.error(f"No .wav files in {args.corpus}")
+    options = {"language": "en", "condition_on_previous_text": False}
+
+    results = {}
+    for name in STT_BACKENDS:
+        backend = load_backend(name, args.model, args.threads)
+        backend.transcribe(corpus[0][1], **options) # Warm-up
+        texts, elapsed = [], 0.0
+        for _, audio, _ in corpus:
+            t0 = time.perf_counter()
+            result = backend.transcribe(audio, **options)
+            elapsed += time.perf_counter() - t0
+            check_result(result)
+            texts.append(result["text"].strip())
+        results[name] = (texts, elapsed)
+
+    baseline, (baseline_texts, baseline_s) = next(iter(results.items()))
+    audio_s = sum(len(audio) for _, audio, _ in corpus) / SAMPLE_RATE
+    passed = True
+    print(f"\n{len(corpus)} {'recordings' if args.corpus else 'generated clips'}, {audio_s:.1f}s of audio, model {args.model}, {args.threads} threads")
+    print(f"{'backend':<16} {'time s':>7} {'RTF':>6} {'speed-up':>9} {'WER vs ref':>11} {'WER vs ' + baseline:>18}")
+    for name, (texts, elapsed) in results.items():
+        scored = [word_errors(ref, text) for (_, _, ref), text in zip(corpus, texts) if ref]
+        ref_wer = sum(e for e, _ in scored) / max(1, sum(n for _, n in scored)) if scored else None
+        pairs = [word_errors(base, text) for base, text in zip(baseline_texts, texts)]
+        parity_wer = sum(e for e, _ in pairs) / max(1, sum(n for _, n in pairs))
+        if args.corpus:
+            passed &= parity_wer <= args.max_wer
+        else: # Generated clips have no speech, so WER against a near-empty baseline means little
+            passed &= all(len(words(text)) <= SYNTHETIC_MAX_WORDS for text in texts)
+        print(f"{name:<16} {elapsed:>7.2f} {elapsed / audio_s:>6.3f} {baseline_s / elapsed:>8.1f}x "
+              f"{(f'{ref_wer:.1%}' if ref_wer is not None else '-'):>11} {parity_wer:>18.1%}")
+        for (file_name, _, _), base, text in zip(corpus, baseline_texts, texts):
+            if name != baseline and text.lower() != base.lower():
+                print(f"    {file_name}: {baseline} '{base}' / {name} '{text}'")
+    failure = (f"a backend differs from {baseline} by more than {args.max_wer:.0%} WER" if args.corpus else
+               f"a backend heard more than {SYNTHETIC_MAX_WORDS} words in a clip without speech")
+    print("Parity: " + ("PASS" if passed else f"FAIL ({failure})"))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,185 @@
+# stt_benchmark.py
+#
+# Replays a directory of recorded commands through Whisper under a matrix of
+# configurations and reports, per configuration: real-time factor, p50/p95
+# latency, peak RSS, model load time and word error rate.
+#
+#   python3 stt_benchmark.py recordings/ --models tiny base small --beams 1 5 --threads 2 4 --languages auto en
+#   python3 stt_benchmark.py recordings/ --backends whisper faster-whisper --models base --beams 1
+#
+# The corpus is a directory of .wav files, each with a reference transcript in a
+# .txt file of the same name (commands without one are timed but not scored).
+# Each configuration runs in a fresh process so its peak RSS is its own, and the
+# results are written as JSON (one file per run) for tracking regressions.
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import platform
+import argparse
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from voice_io import decode_audio
+
+SAMPLE_RATE = 16000
+RESULTS_DIR = os.path.join(".jarvis_cache", "stt_benchmarks")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+def load_corpus(directory):
+    """Returns [(name, float32 audio at 16 kHz, reference text or None)], sorted by name."""
+    corpus = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with open(wav_path, "rb") as f:
+            audio = decode_audio(f.read(), SAMPLE_RATE)
+        reference = None
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if os.path.exists(txt_path):
+            with open(txt_path, encoding="utf-8") as f:
+                reference = f.read().strip()
+        corpus.append((os.path.basename(wav_path), audio, reference))
+    return corpus
+
+def words(text):
+    return _WORD_RE.findall(text.lower().replace("’", "'"))
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)."""
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(ref)
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KB on Linux
+
+def config_name(config):
+    return f"{config['backend']} {config['model']} beam={config['beam_size']} threads={config['threads']} lang={config['language'] or 'auto'}"
+
+def transcribe_options(config):
+    """Keyword arguments for the backend's transcribe() under this configuration (beam_size 1 is greedy)."""
+    options = {"fp16": False, "language": config["language"]}
+    if config["beam_size"] > 1:
+        options["beam_size"] = config["beam_size"]
+    return options
+
+def run_config(config, corpus_dir):
+    """Runs one configuration over the corpus (in its own process). Returns its result dict."""
+    from stt import load_backend
+    corpus = load_corpus(corpus_dir)
+
+    t0 = time.perf_counter()
+    model = load_backend(config["backend"], config["model"], config["threads"])
+    load_s = time.perf_counter() - t0
+    options = transcribe_options(config)
+    model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), **options) # Warm-up, not timed
+
+    latencies, audio_s, errors, reference_words = [], 0.0, 0, 0
+    files = []
+    for name, audio, reference in corpus:
+        t0 = time.perf_counter()
+        text = model.transcribe(audio, **options)["text"].strip()
+        latency = time.perf_counter() - t0
+        latencies.append(latency)
+        audio_s += len(audio) / SAMPLE_RATE
+        entry = {"file": name, "latency_ms": round(latency * 1000, 1), "text": text}
+        if reference is not None:
+            file_errors, file_words = word_errors(reference, text)
+            errors += file_errors
+            reference_words += file_words
+            entry["errors"] = file_errors
+        files.append(entry)
+
+    return {
+        "config": config,
+        "name": config_name(config),
+        "files": len(corpus),
+        "audio_s": round(audio_s, 2),
+        "load_s": round(load_s, 2),
+        "rtf": round(sum(latencies) / audio_s, 4) if audio_s else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "wer": round(errors / reference_words, 4) if reference_words else None,
+        "transcripts": files,
+    }
+
+def _child(config, corpus_dir, results):
+    try:
+        results.put(run_config(config, corpus_dir))
+    except Exception as e:
+        results.put({"config": config, "name": config_name(config), "error": str(e)})
+
+def run_isolated(config, corpus_dir):
+    """Runs a configuration in a fresh process, so peak RSS and thread settings don't leak between runs."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_child, args=(config, corpus_dir, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def machine_info():
+    return {"platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count(), "python": platform.python_version()}
+
+def print_table(results):
+    print(f"\n{'configuration':<52} {'RTF':>6} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'WER':>7} {'load s':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<52} FAILED: {r['error']}")
+            continue
+        wer = f"{r['wer']:.1%}" if r["wer"] is not None else "-"
+        print(f"{r['name']:<52} {r['rtf']:>6.3f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['peak_rss_mb']:>8.0f} {wer:>7} {r['load_s']:>7.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep Whisper configurations over recorded commands.")
+    parser.add_argument("corpus", help="Directory of .wav commands with same-named .txt references")
+    parser.add_argument("--backends", nargs="+", default=["whisper"], help="whisper, faster-whisper (see stt.py)")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 5], help="1 is greedy decoding")
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    parser.add_argument("--languages", nargs="+", default=["auto", "en"], help="'auto' lets Whisper detect it")
+    parser.add_argument("--out", help=f"JSON output path (default: a timestamped file in {RESULTS_DIR})")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No .wav files in {args.corpus}")
+    scored = sum(1 for _, _, reference in corpus if reference is not None)
+    print(f"{len(corpus)} commands ({scored} with reference transcripts), "
+          f"{sum(len(a) for _, a, _ in corpus) / SAMPLE_RATE:.1f}s of audio")
+
+    configs = [{"backend": backend, "model": model, "beam_size": beam, "threads": threads,
+                "language": None if language == "auto" else language}
+               for backend, model, beam, threads, language in
+               itertools.product(args.backends, args.models, args.beams, args.threads, args.languages)]
+    results = []
+    for i, config in enumerate(configs, 1):
+        print(f"[{i}/{len(configs)}] {config_name(config)}")
+        results.append(run_isolated(config, args.corpus))
+    print_table(results)
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("stt-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine_info(),
+                   "corpus": os.path.abspath(args.corpus), "results": results}, f, indent=2)
+    print(f"\nResults written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# system_status.py
+
+import os
+import re
+import sys
+import glob
+import time
+import threading
+import subprocess
+from collections import namedtuple
+
+SAMPLE_INTERVAL_S = 15     # Battery and load change slowly; sampling more often just burns power
+COMMAND_TIMEOUT_S = 5
+
+# One reading of the machine's state. Fields a platform can't report are None.
+Snapshot = namedtuple("Snapshot", "timestamp battery_percent charging_state on_battery cpu_percent load_avg memory_percent")
+
+_PMSET_BATTERY_RE = re.compile(r"(\d+)%;\s*([^;]+?)\s*(?:;|$)", re.MULTILINE)
+_PMSET_SOURCE_RE = re.compile(r"Now drawing from '([^']+)'")
+
+def parse_pmset(output):
+    """
+    Parses `pmset -g batt` output.
+
+    Returns:
+        tuple: (percent, charging_state, on_battery); percent is None without a battery.
+    """
+    source = _PMSET_SOURCE_RE.search(output)
+    on_battery = source.group(1) == "Battery Power" if source else None
+    battery = _PMSET_BATTERY_RE.search(output)
+    if not battery:
+        return None, None, on_battery
+    return int(battery.group(1)), battery.group(2), on_battery
+
+class LinuxBackend:
+    """Reads /sys/class/power_supply and /proc directly; never forks."""
+
+    def __init__(self, power_supply_dir="/sys/class/power_supply", proc_dir="/proc"):
+        self.power_supply_dir = power_supply_dir
+        self.proc_dir = proc_dir
+        self._last_cpu = None
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def battery(self):
+        percent, state, on_battery = None, None, None
+        for supply in sorted(glob.glob(os.path.join(self.power_supply_dir, "*"))):
+            kind = self._read(os.path.join(supply, "type"))
+            if kind == "Battery" and percent is None:
+                capacity = self._read(os.path.join(supply, "capacity"))
+                percent = int(capacity) if capacity and capacity.isdigit() else None
+                status = self._read(os.path.join(supply, "status")) # Charging, Discharging, Full, Not charging
+                state = {"Full": "charged", "Not charging": "AC attached"}.get(status, (status or "").lower() or None)
+            elif kind == "Mains":
+                online = self._read(os.path.join(supply, "online")) == "1"
+                on_battery = not online if on_battery is None else on_battery and not online
+        if on_battery is None and state:
+            on_battery = state == "discharging"
+        return percent, state, on_battery
+
+    def cpu_percent(self):
+        """CPU busy share since the previous call (None on the first call)."""
+        line = self._read(os.path.join(self.proc_dir, "stat"))
+        if not line:
+            return None
+        fields = [int(v) for v in line.splitlines()[0].split()[1:]]
+        idle, total = fields[3] + (fields[4] if len(fields) > 4 else 0), sum(fields)
+        previous, self._last_cpu = self._last_cpu, (idle, total)
+        if previous is None or total == previous[1]:
+            return None
+        return 100.0 * (1 - (idle - previous[0]) / (total - previous[1]))
+
+    def memory_percent(self):
+        meminfo = self._read(os.path.join(self.proc_dir, "meminfo"))
+        if not meminfo:
+            return None
+        values = {}
+        for line in meminfo.splitlines():
+            name, _, rest = line.partition(":")
+            values[name] = int(rest.split()[0]) if rest.split() else 0
+        if not values.get("MemTotal") or "MemAvailable" not in values:
+            return None
+        return 100.0 * (1 - values["MemAvailable"] / values["MemTotal"])
+
+class MacBackend:
+    """
+    pmset for the battery and vm_stat for memory. These fork, but only on the
+    sampler thread, once per interval, instead of once per question.
+    """
+
+    def __init__(self):
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._total_bytes = None
+
+    def battery(self):
+        output = subprocess.check_output(["pmset", "-g", "batt"], text=True, timeout=COMMAND_TIMEOUT_S)
+        return parse_pmset(output)
+
+    def cpu_percent(self):
+        return None # Reported as load average instead; a per-core busy share would need another fork
+
+    def memory_percent(self):
+        if self._total_bytes is None:
+            self._total_bytes = int(subprocess.check_output(["sysctl", "-n", "hw.memsize"], text=True,
+                                                            timeout=COMMAND_TIMEOUT_S))
+        output = subprocess.check_output(["vm_stat"], text=True, timeout=COMMAND_TIMEOUT_S)
+        pages = {}
+        for line in output.splitlines()[1:]:
+            name, _, value = line.partition(":")
+            value = value.strip().rstrip(".")
+            if value.isdigit():
+                pages[name.strip()] = int(value)
+        used = sum(pages.get(k, 0) for k in ("Pages active", "Pages wired down", "Pages occupied by compressor"))
+        return 100.0 * used * self._page_size / self._total_bytes
+
+def default_backend():
+    return MacBackend() if sys.platform == "darwin" else LinuxBackend()
+
+class SystemMonitor:
+    """
+    Samples battery, CPU and memory on a background thread and keeps the latest
+    Snapshot, so status questions are answered from memory without spawning anything.
+
+    Code that wants to adapt to the machine's state (e.g. a lighter model on
+    battery) can read `snapshot` or call `on_battery()` at any time.
+    """
+
+    def __init__(self, backend=None, interval_s=SAMPLE_INTERVAL_S):
+        self.backend = backend or default_backend()
+        self.interval_s = interval_s
+        self.snapshot = None
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _try(self, reading, default=None):
+        try:
+            return reading()
+        except Exception as e:
+            print(f"System status reading failed: {e}")
+            return default
+
+    def sample(self):
+        """Takes one reading now and makes it the current snapshot."""
+        percent, state, on_battery = self._try(self.backend.battery, (None, None, None))
+        load_avg = os.getloadavg()[0] if hasattr(os, "getloadavg") else None
+        self.snapshot = Snapshot(time.time(), percent, state, on_battery,
+                                 self._try(self.backend.cpu_percent), load_avg,
+                                 self._try(self.backend.memory_percent))
+        self.ready.set()
+        return self.snapshot
+
+    def start(self):
+        """Takes a first reading in the background and keeps sampling every interval."""
+        if self._sampler is not None:
+            return self
+
+        def run():
+            while True:
+                self.sample()
+                if self._stop.wait(self.interval_s):
+                    break
+
+        self._sampler = threading.Thread(target=run, daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def on_battery(self):
+        """True when running on battery, False on mains power, None if unknown."""
+        return self.snapshot.on_battery if self.snapshot else None
+
+# --- Benchmark (python3 system_status.py) ---
+
+if __name__ == "__main__":
+    monitor = SystemMonitor()
+    t0 = time.perf_counter()
+    monitor.sample()
+    time.sleep(0.2) # Give the CPU counter a window
+    snapshot = monitor.sample()
+    print(f"Sample ({type(monitor.backend).__name__}): {(time.perf_counter() - t0 - 0.2) / 2 * 1000:.2f} ms")
+    print(f"  {snapshot}")
+
+    repeats = 100_000
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        cached = monitor.snapshot.battery_percent
+    print(f"Cached read: {(time.perf_counter() - t0) / repeats * 1e9:.0f} ns")
+
+    repeats = 20
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        subprocess.run(["true"], check=False)
+    print(f"Forking one process (what every pmset call costs at least): {(time.perf_counter() - t0) / repeats * 1000:.2f} ms")
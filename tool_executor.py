@@ -0,0 +1,158 @@
+# tool_executor.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_TOOL_TIMEOUT_S = 10.0
+# Per-tool deadlines. A tool that misses its deadline is reported as timed out
+# (its subprocess is also bounded by the timeouts in actions.py).
+TOOL_TIMEOUTS_S = {
+    "get_battery_level": 3.0,
+    "get_current_time": 1.0,
+    "get_system_status": 1.0,
+    "open_application": 5.0,
+    "search_files_on_mac": 6.0,
+    "get_calendar_events": 8.0,
+    "get_next_event": 2.0,
+}
+TOOL_WORKERS = 4
+
+class ToolResult:
+    """The outcome of one tool call."""
+
+    def __init__(self, tool_name, parameters, result, ok, elapsed_s):
+        self.tool_name = tool_name
+        self.parameters = parameters
+        self.result = result
+        self.ok = ok
+        self.elapsed_s = elapsed_s
+
+    def __repr__(self):
+        status = "ok" if self.ok else "failed"
+        return f"ToolResult({self.tool_name}, {status}, {self.elapsed_s:.2f}s, {self.result!r})"
+
+class ToolExecutor:
+    """
+    Runs tools off the voice loop on a thread pool, with a deadline per tool.
+
+    run_batch() starts every call of a model turn at once and waits for all of
+    them (or their deadlines), so N slow tools cost the slowest one, not the sum.
+    """
+
+    def __init__(self, tools, timeouts_s=TOOL_TIMEOUTS_S, default_timeout_s=DEFAULT_TOOL_TIMEOUT_S,
+                 max_workers=TOOL_WORKERS):
+        self.tools = tools
+        self.timeouts_s = timeouts_s
+        self.default_timeout_s = default_timeout_s
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def timeout_for(self, tool_name):
+        return self.timeouts_s.get(tool_name, self.default_timeout_s)
+
+    def run(self, tool_name, parameters=None):
+        """Runs a single tool call and returns its ToolResult."""
+        return self.run_batch([(tool_name, parameters or {})])[0]
+
+    def run_batch(self, calls):
+        """
+        Runs several tool calls concurrently.
+
+        Args:
+            calls (list): (tool_name, parameters) pairs.
+
+        Returns:
+            list: One ToolResult per call, in the same order.
+        """
+        start = time.monotonic()
+        submitted = []
+        for tool_name, parameters in calls:
+            function_to_call = self.tools.get(tool_name)
+            if function_to_call is None or not isinstance(parameters, dict):
+                submitted.append((tool_name, parameters, None))
+                continue
+            submitted.append((tool_name, parameters, self.executor.submit(function_to_call, **parameters)))
+
+        deadline = start + max((self.timeout_for(name) for name, _, f in submitted if f), default=0)
+        results = []
+        for tool_name, parameters, future in submitted:
+            if future is None:
+                error = (f"Unknown tool '{tool_name}'." if tool_name not in self.tools else
+                         f"Bad parameters for '{tool_name}': expected an object, got {type(parameters).__name__}.")
+                results.append(ToolResult(tool_name, parameters, error, False, 0.0))
+                continue
+            tool_deadline = min(deadline, start + self.timeout_for(tool_name))
+            wait([future], timeout=max(0.0, tool_deadline - time.monotonic()))
+            elapsed = time.monotonic() - start
+            if not future.done():
+                future.cancel() # Only helps if it hasn't started; a running tool is left to finish
+                results.append(ToolResult(tool_name, parameters,
+                                          f"The {tool_name.replace('_', ' ')} request took too long, sir.", False, elapsed))
+                continue
+            try:
+                results.append(ToolResult(tool_name, parameters, future.result(), True, elapsed))
+            except Exception as e:
+                results.append(ToolResult(tool_name, parameters, f"An unexpected error occurred: {e}", False, elapsed))
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# --- Harness with fake slow tools (python3 tool_executor.py) ---
+
+if __name__ == "__main__":
+    def fake_battery():
+        time.sleep(0.1)
+        return "The current battery is at 80%, and is currently charging."
+
+    def fake_calendar():
+        time.sleep(0.8)
+        return "Here are your events for today:\n- Standup at 9:30 AM"
+
+    def fake_search(query):
+        time.sleep(0.5)
+        return f"I found the following files related to '{query}':\n/Users/you/{query}.pdf"
+
+    def hung_calendar():
+        time.sleep(30) # A wedged osascript
+        return "never"
+
+    def broken_tool():
+        raise RuntimeError("device not found")
+
+    fake_tools = {
+        "get_battery_level": fake_battery,
+        "get_calendar_events": fake_calendar,
+        "search_files_on_mac": fake_search,
+        "hung_calendar": hung_calendar,
+        "broken_tool": broken_tool,
+    }
+    executor = ToolExecutor(fake_tools, timeouts_s={**TOOL_TIMEOUTS_S, "hung_calendar": 1.0})
+
+    scenarios = [
+        ("three tools at once", [("get_battery_level", {}), ("get_calendar_events", {}), ("search_files_on_mac", {"query": "taxes"})]),
+        ("one hung tool", [("get_battery_level", {}), ("hung_calendar", {})]),
+        ("failing and unknown tools", [("broken_tool", {}), ("make_coffee", {})]),
+        ("malformed parameters", [("search_files_on_mac", ["taxes"]), ("search_files_on_mac", {"name": "taxes"})]),
+    ]
+    # Per scenario: the most it may take, and which calls should succeed
+    expected = {
+        "three tools at once": (1.2, [True, True, True]),
+        "one hung tool": (1.5, [True, False]),
+        "failing and unknown tools": (0.5, [False, False]),
+        "malformed parameters": (0.5, [False, False]),
+    }
+    for label, calls in scenarios:
+        sequential_s = sum({"get_battery_level": 0.1, "get_calendar_events": 0.8, "search_files_on_mac": 0.5,
+                            "hung_calendar": 30.0}.get(name, 0.0) for name, _ in calls)
+        t0 = time.perf_counter()
+        results = executor.run_batch(calls)
+        elapsed = time.perf_counter() - t0
+        print(f"--- {label}: {elapsed:.2f}s (sequential would be {sequential_s:.1f}s) ---")
+        for r in results:
+            print(f"  {r}")
+        max_s, succeeded = expected[label]
+        assert elapsed < max_s, f"{label} took {elapsed:.2f}s (expected under {max_s}s)"
+        assert [r.ok for r in results] == succeeded, f"{label}: {[r.ok for r in results]} != {succeeded}"
+        assert [(r.tool_name, r.parameters) for r in results] == calls, f"{label}: results out of order"
+    executor.close()
+    print("Self-check passed.")
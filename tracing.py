@@ -0,0 +1,259 @@
+# tracing.py
+
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TRACE_FILE = os.path.join(".jarvis_cache", "traces.jsonl")     # One JSON line per turn
+METRICS_FILE = os.path.join(".jarvis_cache", "metrics.prom")    # Prometheus text format, rewritten after every turn
+METRICS_PORT = 9464
+METRIC_NAME = "jarvis_stage_seconds"
+
+# Histogram bucket upper bounds: ~25% apart from 1 ms to 2 minutes, so percentiles are within a few percent
+BUCKETS_S = tuple(round(0.001 * 1.25 ** i, 6) for i in range(53))
+
+# The stages of a turn, in pipeline order (anything else observed is reported after these)
+STAGES = ("wake_detect", "acknowledge", "record", "vad_tail", "transcribe", "llm_first_token", "llm",
+          "tools", "synthesize", "first_audio", "turn")
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum. observe() is a bisect and three adds under a lock."""
+
+    def __init__(self, buckets=BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, p):
+        """Estimated by interpolating inside the bucket the p-th observation falls in. None when empty."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank, seen = p / 100 * count, 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+class Turn:
+    """One command, from the start of recording (or the wake word) until the answer has been spoken."""
+
+    def __init__(self, number):
+        self.number = number
+        self.started = time.perf_counter()
+        self.stages = {}   # Seconds per stage; a stage that runs more than once (e.g. synthesis) adds up
+        self.marks = {}
+        self.info = {}
+
+class Tracer:
+    """
+    Times the stages of each turn into per-stage histograms, and hands each
+    finished turn to its sinks (JSONL file, Prometheus text file).
+
+    The pipeline handles one turn at a time, so stages are attributed to the
+    current turn from whichever thread they run on. Stages observed outside a
+    turn (e.g. daemon requests) still go into the histograms.
+    """
+
+    def __init__(self, buckets=BUCKETS_S):
+        self.buckets = buckets
+        self.histograms = {}
+        self.sinks = []
+        self.turn = None
+        self.turns = 0
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+        turn = self.turn
+        if turn is not None:
+            turn.stages[stage] = turn.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def begin_turn(self):
+        """Starts a new turn (a turn still open is finished first)."""
+        if self.turn is not None:
+            self.end_turn()
+        self.turns += 1
+        self.turn = Turn(self.turns)
+        return self.turn
+
+    def mark(self, name):
+        """Records when something happened in the current turn (e.g. "speech_end")."""
+        if self.turn is not None:
+            self.turn.marks[name] = time.perf_counter()
+
+    def observe_since(self, mark, stage, once=True):
+        """Observes the time since a mark of the current turn (only the first time, if `once`)."""
+        turn = self.turn
+        if turn is None or mark not in turn.marks or (once and stage in turn.stages):
+            return
+        self.observe(stage, time.perf_counter() - turn.marks[mark])
+
+    def annotate(self, **info):
+        """Adds details to the current turn's trace record (e.g. how the command was answered)."""
+        if self.turn is not None:
+            self.turn.info.update(info)
+
+    def cancel_turn(self):
+        """Drops the current turn without recording it (e.g. the recording was silence)."""
+        self.turn = None
+
+    def end_turn(self):
+        turn, self.turn = self.turn, None
+        if turn is None:
+            return
+        total = time.perf_counter() - turn.started
+        self.histogram("turn").observe(total)
+        turn.stages["turn"] = total
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "turn": turn.number, **turn.info,
+                  "stages": {stage: round(seconds, 4) for stage, seconds in self._ordered(turn.stages)}}
+        for sink in self.sinks:
+            try:
+                sink.write(record, self)
+            except Exception as e:
+                print(f"Trace sink {type(sink).__name__} failed: {e}")
+
+    def _ordered(self, items):
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return sorted(dict(items).items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+    def prometheus_text(self):
+        """All histograms in the Prometheus text exposition format."""
+        lines = [f"# HELP {METRIC_NAME} Time spent in each stage of a Jarvis turn.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for stage, histogram in self._ordered(self.histograms):
+            with histogram._lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, n in zip(list(histogram.buckets) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Prints p50/p95 per stage."""
+        print(f"\n{'stage':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        for stage, histogram in self._ordered(self.histograms):
+            if histogram.count:
+                print(f"{stage:<28} {histogram.count:>6} {histogram.percentile(50) * 1000:>9.1f} "
+                      f"{histogram.percentile(95) * 1000:>9.1f}")
+
+class JsonlSink:
+    """Appends one JSON line per turn, for tracking stage latencies across days."""
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, record, tracer):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+class PrometheusFile:
+    """Rewrites the histograms in Prometheus text format after every turn (e.g. for node_exporter's textfile collector)."""
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, record, tracer):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(tracer.prometheus_text())
+        os.replace(tmp_path, self.path)
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format on a background thread."""
+
+    def __init__(self, tracer, host="127.0.0.1", port=METRICS_PORT):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# Shared by the pipeline modules; the entry script attaches sinks
+tracer = Tracer()
+
+# --- Overhead benchmark (python3 tracing.py) ---
+
+if __name__ == "__main__":
+    import random
+
+    bench = Tracer()
+    repeats = 200_000
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        bench.observe("transcribe", 0.42)
+    print(f"observe(): {(time.perf_counter() - t0) / repeats * 1e9:.0f} ns")
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        with bench.stage("tools"):
+            pass
+    print(f"with stage(): {(time.perf_counter() - t0) / repeats * 1e9:.0f} ns")
+
+    rng = random.Random(0)
+    samples = [rng.lognormvariate(-0.5, 0.6) for _ in range(20_000)]
+    accuracy = Histogram()
+    for value in samples:
+        accuracy.observe(value)
+    samples.sort()
+    for p in (50, 95, 99):
+        exact = samples[int(len(samples) * p / 100)]
+        print(f"p{p}: histogram {accuracy.percentile(p) * 1000:.1f} ms, exact {exact * 1000:.1f} ms")
+    print(f"Exposition for {len(bench.histograms)} stages: {len(bench.prometheus_text())} bytes")
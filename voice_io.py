@@ -0,0 +1,414 @@
+# voice_io.py
+
+import io
+import re
+import wave
+import time
+import queue
+import threading
+import numpy as np
+import pyaudio
+from vad import VoiceActivityDetector, END_OF_SPEECH
+from tracing import tracer
+
+# --- Voice Activity Detection (VAD) configuration ---
+# The speech threshold adapts to the room (see vad.py); only the timings are fixed here.
+SILENCE_DURATION_S = 1.5   # How many seconds of silence triggers the end of recording
+MAX_RECORDING_SECONDS = 15 # A failsafe to prevent recording forever
+
+SAMPLE_WIDTH = 2 # Bytes per sample for paInt16
+
+# --- Wake acknowledgement configuration ---
+# "speak":   say the acknowledgement, then listen (audio heard before it starts is kept as pre-roll)
+# "overlap": say the acknowledgement in the background while already recording
+# "skip":    don't acknowledge, start recording from the wake word
+ACKNOWLEDGEMENT_MODE = "speak"
+PREROLL_SECONDS = 2.0 # Max audio after the wake word that is prepended to the command
+
+# --- Speech output configuration ---
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+ABBREVIATIONS = ("mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc.")
+SYNTH_QUEUE_DEPTH = 2 # Sentences synthesized ahead of playback
+PLAYBACK_BLOCK_S = 0.02 # Audio is written in blocks this long, so playback can stop mid-sentence
+SYNTH_JOIN_TIMEOUT_S = 2.0 # After an interruption, how long to wait for a sentence still being synthesized
+
+_output_pa = None
+_barge_in = None # A BargeInMonitor while barge-in is on (see set_barge_in)
+_acknowledgement = None # Thread playing an "overlap" acknowledgement; other speech waits for it
+_output_streams = {}
+_detectors = {} # One VAD per (sample_rate, chunk_size), so the learned noise floor carries over
+
+def pcm16_to_float32(pcm):
+    """
+    Converts raw 16-bit PCM into the float32 array Whisper expects.
+
+    Args:
+        pcm (bytes): Mono little-endian int16 samples.
+
+    Returns:
+        np.ndarray: float32 samples scaled to [-1.0, 1.0).
+    """
+    # frombuffer is a view over the bytes; astype is the only copy, and the scale is done in place.
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio
+
+def decode_audio(data, sample_rate=16000):
+    """
+    Turns a WAV file's bytes, or raw mono int16 PCM already at `sample_rate`,
+    into float32 samples at `sample_rate` (stereo is mixed down, other rates resampled).
+    """
+    if data[:4] != b"RIFF":
+        return pcm16_to_float32(data)
+    with wave.open(io.BytesIO(data)) as wav:
+        if wav.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError("Only 16-bit WAV is supported")
+        rate, channels = wav.getframerate(), wav.getnchannels()
+        audio = pcm16_to_float32(wav.readframes(wav.getnframes()))
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(audio):
+        positions = np.arange(0, len(audio), rate / sample_rate)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+def save_debug_wav(pcm, sample_rate, filename):
+    """Writes a captured command to disk. Only used when debugging the recorder."""
+    with wave.open(filename, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+
+def get_vad(sample_rate, chunk_size):
+    """Returns the shared VoiceActivityDetector for this stream format."""
+    key = (sample_rate, chunk_size)
+    if key not in _detectors:
+        _detectors[key] = VoiceActivityDetector(sample_rate, chunk_size, SILENCE_DURATION_S)
+    return _detectors[key]
+
+def record_command_vad(stream, sample_rate, chunk_size, debug_filename=None, preroll=b'', transcriber=None):
+    """
+    Records audio dynamically, stopping after a period of silence.
+
+    Args:
+        stream: An open PyAudio input stream (paInt16, mono).
+        sample_rate (int): Sample rate of the stream.
+        chunk_size (int): Number of samples read per iteration.
+        debug_filename (str, optional): If given, the command is also dumped to this WAV file.
+        preroll (bytes, optional): Audio captured before recording started, prepended to the command.
+        transcriber (IncrementalTranscriber, optional): Receives audio as it is recorded.
+
+    Returns:
+        np.ndarray | None: The command as float32 samples, or None if nothing was said.
+    """
+    print("Listening...")
+    if not stream.is_active(): stream.start_stream()
+    frames = []
+    vad = get_vad(sample_rate, chunk_size)
+    vad.reset()
+    max_chunks = int(MAX_RECORDING_SECONDS * (sample_rate / chunk_size))
+    chunk_bytes = chunk_size * SAMPLE_WIDTH
+    preroll = preroll[len(preroll) % chunk_bytes:] # Align to whole chunks, keeping the newest audio
+
+    def chunks():
+        # Pre-roll goes through the same VAD as live audio, so speech in it counts.
+        for i in range(0, len(preroll), chunk_bytes):
+            yield preroll[i:i + chunk_bytes]
+        while True:
+            yield stream.read(chunk_size, exception_on_overflow=False)
+
+    for data, _ in zip(chunks(), range(max_chunks)):
+        frames.append(data)
+        if transcriber: transcriber.append(data)
+        if vad.feed(data) == END_OF_SPEECH:
+            print("...end of speech detected.")
+            tracer.observe("vad_tail", vad.silent_frames * chunk_size / sample_rate) # Silence waited out after the last word
+            break
+    stream.stop_stream()
+    if not vad.speech_detected:
+        print("...silence detected.")
+        return None
+
+    pcm = b''.join(frames)
+    if debug_filename:
+        save_debug_wav(pcm, sample_rate, debug_filename)
+    return pcm16_to_float32(pcm)
+
+def transcribe_command(whisper_model, audio, transcriber=None, **options):
+    """
+    Transcribes a recorded command straight from memory.
+
+    Args:
+        whisper_model: A loaded Whisper model.
+        audio (np.ndarray | None): float32 samples at 16 kHz, as returned by record_command_vad.
+        transcriber (IncrementalTranscriber, optional): If it was fed during recording,
+            only the part it hasn't transcribed yet is decoded now.
+        **options: Extra transcribe() options, e.g. CommandProfile.options() (the transcriber has its own).
+
+    Returns:
+        str: The transcription, or an empty string if there was no audio.
+    """
+    if audio is None:
+        if transcriber: transcriber.cancel()
+        return ""
+    print("Transcribing...")
+    if transcriber:
+        transcription = transcriber.finish()
+    else:
+        # Passing an array skips Whisper's ffmpeg decode of a file on disk.
+        transcription = whisper_model.transcribe(audio, fp16=False, **options)['text'].strip()
+    print(f"YOU SAID: '{transcription}'")
+    return transcription
+
+# --- Wake Acknowledgement ---
+
+def acknowledge_wake(capture, wake_position, tts_instance, text, speaker_wav=None,
+                     mode=ACKNOWLEDGEMENT_MODE, preroll_seconds=PREROLL_SECONDS):
+    """
+    Acknowledges the wake word without losing a command spoken in the same breath.
+
+    Args:
+        capture (AudioCapture): The running capture.
+        wake_position (int): Ring buffer position at which the wake word fired.
+        tts_instance: A loaded Coqui TTS instance.
+        text (str): The acknowledgement to say (e.g. "Yes, sir?").
+        speaker_wav (str, optional): Speaker id for multi-speaker models.
+        mode (str): "speak", "overlap" or "skip" (see ACKNOWLEDGEMENT_MODE).
+        preroll_seconds (float): Max audio after the wake word to keep.
+
+    Returns:
+        tuple: (stream, preroll) to pass to record_command_vad.
+    """
+    max_preroll = int(preroll_seconds * capture.sample_rate)
+    if mode in ("skip", "overlap"):
+        if mode == "overlap":
+            # Not interruptible: the user talking now is the command, not an interruption.
+            global _acknowledgement
+            _acknowledgement = threading.Thread(target=speak, args=(tts_instance, text, speaker_wav),
+                                                kwargs={"interruptible": False}, daemon=True)
+            _acknowledgement.start()
+        # Keep reading from the wake word onwards; the reader is the pre-roll.
+        start = max(wake_position, capture.ring.write_pos - max_preroll)
+        return capture.reader_at(start), b''
+
+    # "speak": keep what was said before the acknowledgement starts, but not the acknowledgement itself.
+    ack_start = capture.ring.write_pos
+    start = max(wake_position, ack_start - max_preroll)
+    preroll = capture.ring.copy(start, ack_start - start) if ack_start > start else b''
+    if not speak(tts_instance, text, speaker_wav) and _barge_in is not None:
+        # The user talked over the acknowledgement: record from where they started.
+        return capture.reader_at(max(ack_start, _barge_in.take())), preroll
+    return capture.reader(), preroll
+
+# --- Speech Output ---
+
+def split_sentences(text):
+    """Splits a reply into sentences (and lines) so each can be synthesized on its own."""
+    return [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+def iter_sentences(chunks):
+    """
+    Re-assembles a stream of text chunks (e.g. LLM tokens) into sentences,
+    yielding each one as soon as its closing punctuation arrives.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            match = SENTENCE_SPLIT_RE.search(buffer)
+            if not match:
+                break
+            sentence = buffer[:match.start()].strip()
+            if sentence.lower().endswith(ABBREVIATIONS):
+                # "Dr. Smith" is not two sentences; wait for the next boundary.
+                next_match = SENTENCE_SPLIT_RE.search(buffer, match.end())
+                if not next_match:
+                    break
+                match = next_match
+                sentence = buffer[:match.start()].strip()
+            buffer = buffer[match.end():]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+def clean_text_for_tts(text):
+    """Replaces characters the TTS model can't pronounce."""
+    return text.replace('%', ' percent')
+
+def get_tts_sample_rate(tts_instance):
+    """Returns the output sample rate of a loaded Coqui TTS instance."""
+    return tts_instance.synthesizer.output_sample_rate
+
+def synthesize(tts_instance, text, speaker_wav=None):
+    """
+    Synthesizes a single sentence into memory.
+
+    Args:
+        tts_instance: A loaded Coqui TTS instance.
+        text (str): The sentence to speak.
+        speaker_wav (str, optional): Speaker id for multi-speaker models (like VCTK).
+
+    Returns:
+        np.ndarray: float32 mono waveform at the model's sample rate.
+    """
+    return np.asarray(tts_instance.tts(text=text, speaker=speaker_wav), dtype=np.float32)
+
+def get_output_stream(sample_rate):
+    """Returns a PyAudio float32 output stream for the given rate, opening it once and reusing it."""
+    global _output_pa
+    if _output_pa is None:
+        _output_pa = pyaudio.PyAudio()
+    if sample_rate not in _output_streams:
+        _output_streams[sample_rate] = _output_pa.open(rate=sample_rate, channels=1,
+                                                       format=pyaudio.paFloat32, output=True)
+    return _output_streams[sample_rate]
+
+def set_output_device(pa):
+    """Plays speech through `pa` (a PyAudio instance, or anything with the same open()) from now on."""
+    global _output_pa
+    close_output()
+    _output_pa = pa
+
+def set_barge_in(monitor):
+    """Lets the user interrupt Jarvis: `monitor` (a BargeInMonitor) listens during playback. None turns it off."""
+    global _barge_in
+    _barge_in = monitor
+
+def play(audio, sample_rate, monitor=None):
+    """
+    Plays float32 audio in PLAYBACK_BLOCK_S blocks.
+
+    Returns:
+        bool: False if the monitor heard the user interrupt (the rest isn't played).
+    """
+    stream = get_output_stream(sample_rate)
+    block = int(PLAYBACK_BLOCK_S * sample_rate)
+    for i in range(0, len(audio), block):
+        if monitor is not None and monitor.interrupted.is_set():
+            return False
+        chunk = audio[i:i + block]
+        if monitor is not None: monitor.playing(chunk)
+        stream.write(chunk.tobytes())
+    return monitor is None or not monitor.interrupted.is_set()
+
+def close_output():
+    """Closes any output streams opened by speak()."""
+    global _output_pa
+    for stream in _output_streams.values():
+        stream.close()
+    _output_streams.clear()
+    if _output_pa is not None:
+        _output_pa.terminate()
+        _output_pa = None
+
+def speak(tts_instance, text, speaker_wav=None, interruptible=True):
+    """
+    Speaks a reply sentence by sentence.
+
+    A background thread synthesizes the next sentence while the current one is
+    playing, so the first audio is heard as soon as the first sentence is ready.
+
+    Returns:
+        bool: False if the user interrupted (see set_barge_in), True otherwise.
+    """
+    print(f"JARVIS: {text}")
+    return speak_sentences(tts_instance, split_sentences(clean_text_for_tts(text)), speaker_wav, interruptible)
+
+def speak_stream(tts_instance, chunks, speaker_wav=None):
+    """
+    Speaks a reply while it is still being generated.
+
+    Args:
+        tts_instance: A loaded Coqui TTS instance.
+        chunks (iterable): Text chunks as they arrive (e.g. LLMClient.stream_text()).
+        speaker_wav (str, optional): Speaker id for multi-speaker models.
+
+    Returns:
+        str | None: The full text that was spoken, or None if the stream broke off or was interrupted.
+    """
+    spoken, completed = [], False
+
+    def sentences():
+        nonlocal completed
+        try:
+            for sentence in iter_sentences(chunks):
+                print(f"JARVIS: {sentence}")
+                spoken.append(sentence)
+                yield clean_text_for_tts(sentence)
+            completed = True
+        finally:
+            close = getattr(chunks, "close", None) # Ends the LLM stream if the reply was cut off
+            if close is not None: close()
+
+    if not speak_sentences(tts_instance, sentences(), speaker_wav):
+        return None
+    return " ".join(spoken) if completed else None
+
+def wait_for_acknowledgement():
+    """Waits until an "overlap" acknowledgement still playing in the background has finished."""
+    thread = _acknowledgement
+    if thread is not None and thread is not threading.current_thread():
+        thread.join()
+
+def speak_sentences(tts_instance, sentences, speaker_wav=None, interruptible=True):
+    """
+    Plays sentences from any iterable (a list, or a generator still being filled)
+    while the following ones are synthesized on a background thread. With
+    barge-in on (and `interruptible`), playback stops as soon as the user talks over it.
+
+    Returns:
+        bool: False if the user interrupted, True otherwise.
+    """
+    audio_queue = queue.Queue(maxsize=SYNTH_QUEUE_DEPTH)
+    stop = threading.Event() # Set once nothing more will be played
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                audio_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def synthesize_all():
+        iterator = iter(sentences)
+        try:
+            while not stop.is_set(): # Checked before pulling, so an interrupted reply isn't read any further
+                sentence = next(iterator, None)
+                if sentence is None or stop.is_set(): break
+                with tracer.stage("synthesize"):
+                    wav = synthesize(tts_instance, sentence, speaker_wav)
+                put(wav)
+        except Exception as e:
+            print(f"Error during speech synthesis: {e}")
+        finally:
+            close = getattr(iterator, "close", None) # Only this thread may close a generator it is running
+            if close is not None: close()
+            put(None)
+
+    synthesizer = threading.Thread(target=synthesize_all, daemon=True)
+    synthesizer.start()
+
+    wait_for_acknowledgement() # One speaker at a time on the shared output stream and barge-in monitor
+    monitor = _barge_in if interruptible else None
+    if monitor is not None: monitor.begin()
+    playing = True
+    try:
+        while (wav := audio_queue.get()) is not None:
+            if not playing: continue # Keep draining so the synthesis thread can finish
+            tracer.observe_since("speech_end", "first_audio")
+            try:
+                if not play(wav, get_tts_sample_rate(tts_instance), monitor):
+                    tracer.observe("barge_in_stop", time.perf_counter() - monitor.detected_at)
+                    return False
+            except Exception as e:
+                print(f"Error during playback: {e}")
+                playing = False
+        return True
+    finally:
+        stop.set()
+        if monitor is not None: monitor.end()
+        # Its last synthesis belongs to this reply's trace, not the next turn's
+        synthesizer.join(timeout=SYNTH_JOIN_TIMEOUT_S)